@@ -0,0 +1,57 @@
+"""
+Benchmark: concurrent-thread throughput of the sync and async TaskMaistro nodes on a single worker
+
+Each turn asks for a ToDo update, so it runs task_mAIstro, update_todos and task_mAIstro again
+against a FakeChatModel that sleeps for --latency seconds per call. The sync nodes run in the
+event loop's default executor, which is limited to one thread to model a single server worker.
+
+Run from the langchain-template directory:
+    python -m benchmarks.bench_async_nodes [--threads 20] [--latency 0.05]
+"""
+
+import argparse
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.messages import HumanMessage
+
+from modules.task_maistro import TaskMaistro
+from modules.debug_langgraph import set_debug_mode
+from modules.maistro_cache import memory_cache
+from .fakes import CountingStore, FakeChatModel
+
+
+async def run_threads(graph, threads: int) -> float:
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=1))
+
+    async def turn(i: int):
+        config = {"configurable": {"user_id": f"user-{i}", "thread_id": f"thread-{i}", "update_reply": "agent"}}
+        await graph.ainvoke({"messages": [HumanMessage(content="Remind me to call mom")]}, config)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(turn(i) for i in range(threads)))
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--threads", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.05,
+                        help="simulated seconds per model call")
+    args = parser.parse_args()
+
+    for use_async in (False, True):
+        maistro = TaskMaistro(model=FakeChatModel(latency=args.latency), use_async=use_async)
+        set_debug_mode(False)
+        memory_cache.clear()
+        graph = maistro.graph.copy(update={"store": CountingStore()})
+
+        elapsed = asyncio.run(run_threads(graph, args.threads))
+        label = "async" if use_async else "sync"
+        print(f"{label:<6} {args.threads} threads in {elapsed:.2f}s  "
+              f"throughput: {args.threads / elapsed:.1f} turns/s")
+
+
+if __name__ == "__main__":
+    main()
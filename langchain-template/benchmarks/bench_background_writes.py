@@ -0,0 +1,92 @@
+"""
+Benchmark: time to reply and p99 turn latency with synchronous and background memory writes
+
+Runs --users concurrent conversations of --turns turns each on the async graph. Every turn
+asks for a ToDo update, so the synchronous path waits for the Trustcall extraction before
+replying, and the background path queues it to the memory writer. The FakeChatModel sleeps
+for --latency seconds per call.
+
+- reply: time until the graph emits the final AI message (what the user waits for)
+- turn: time until the graph run returns
+- drain: time after the last turn until every queued memory write is in the store
+
+Run from the langchain-template directory:
+    python -m benchmarks.bench_background_writes [--users 20] [--turns 5] [--latency 0.05]
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from modules.task_maistro import TaskMaistro
+from modules.debug_langgraph import set_debug_mode
+from modules.maistro_cache import memory_cache
+from modules.maistro_background import memory_writer
+from .fakes import CountingStore, FakeChatModel
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+async def run(graph, users: int, turns: int, config_extra: dict):
+    replies, totals = [], []
+
+    async def conversation(user: int):
+        config = {"configurable": {"user_id": f"user-{user}", **config_extra}}
+        for turn in range(turns):
+            start = time.perf_counter()
+            reply = None
+            async for update in graph.astream(
+                    {"messages": [HumanMessage(content=f"Remind me to call mom, take {turn}")]},
+                    config, stream_mode="updates"):
+                for node_update in update.values():
+                    for message in (node_update or {}).get("messages", []):
+                        if reply is None and isinstance(message, AIMessage) and not message.tool_calls:
+                            reply = time.perf_counter() - start
+            replies.append(reply)
+            totals.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(conversation(user) for user in range(users)))
+    return replies, totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--turns", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.05,
+                        help="simulated seconds per model call")
+    args = parser.parse_args()
+
+    print(f"{'memory_writes':<14}{'update_reply':<13}{'reply p50':>10}{'reply p99':>10}"
+          f"{'turn p99':>10}{'drain':>8}")
+    for memory_writes, update_reply in (("sync", "agent"), ("background", "agent"),
+                                        ("sync", "template"), ("background", "template")):
+        maistro = TaskMaistro(model=FakeChatModel(latency=args.latency), use_async=True)
+        set_debug_mode(False)
+        memory_cache.clear()
+        store = CountingStore()
+        graph = maistro.graph.copy(update={"store": store})
+
+        replies, totals = asyncio.run(run(graph, args.users, args.turns, {
+            "memory_writes": memory_writes, "update_reply": update_reply}))
+        start = time.perf_counter()
+        memory_writer.flush()
+        drain = time.perf_counter() - start
+        # The fake extractor inserts one ToDo per turn
+        todos = sum(len(store.search(("todo", "general", f"user-{user}"), limit=args.turns))
+                    for user in range(args.users))
+        assert todos == args.users * args.turns, f"expected {args.users * args.turns} todos, found {todos}"
+
+        print(f"{memory_writes:<14}{update_reply:<13}{statistics.median(replies) * 1000:>8.0f}ms"
+              f"{percentile(replies, 0.99) * 1000:>8.0f}ms{percentile(totals, 0.99) * 1000:>8.0f}ms"
+              f"{drain:>7.2f}s")
+
+
+if __name__ == "__main__":
+    main()
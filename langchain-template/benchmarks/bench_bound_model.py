@@ -0,0 +1,48 @@
+"""
+Benchmark: per-turn CPU spent binding the UpdateMemory tool in task_mAIstro
+
+Compares model.bind_tools([UpdateMemory], parallel_tool_calls=False) on every turn with the
+bound runnable TaskMaistro precomputes, and projects the CPU share at a given request rate.
+The chat model is the real ChatOpenAI client; no request is sent.
+
+Run from the langchain-template directory:
+    OPENAI_API_KEY=unused python -m benchmarks.bench_bound_model [--turns 2000] [--rps 500]
+"""
+
+import argparse
+import time
+
+from modules.maistro_schema import UpdateMemory
+from modules.task_maistro import TaskMaistro
+
+
+def rebind(maistro):
+    return maistro.model.bind_tools([UpdateMemory], parallel_tool_calls=False)
+
+
+def cached(maistro):
+    return maistro.memory_model
+
+
+def run(label, fetch, maistro, turns, rps):
+    start = time.process_time()
+    for _ in range(turns):
+        fetch(maistro)
+    per_turn = (time.process_time() - start) / turns
+    print(f"{label:<8} {per_turn * 1e6:10.1f} us CPU/turn  "
+          f"{per_turn * rps * 100:6.2f}% of a core at {rps} turns/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--turns", type=int, default=2000)
+    parser.add_argument("--rps", type=int, default=500)
+    args = parser.parse_args()
+
+    maistro = TaskMaistro(model="gpt-4o")
+    run("rebind", rebind, maistro, args.turns, args.rps)
+    run("cached", cached, maistro, args.turns, args.rps)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Load test: concurrent turns of the same user, with and without the namespace locks
+
+Sends --turns turns at once, each with a different preference, either all for the same user
+(a user double-texting) or one per user. Each turn asks for an instructions and a profile
+update. The FakeChatModel rewrites the instructions as the current ones plus the new
+preference, so a turn that reads the instructions before a concurrent turn has written them
+loses that turn's preference. A first profile extraction that misses a concurrent one inserts
+a second profile document. Runs the async nodes under asyncio.gather and the sync nodes on a
+thread pool.
+
+Run from the langchain-template directory:
+    python -m benchmarks.bench_concurrent_turns [--turns 8] [--latency 0.02]
+"""
+
+import argparse
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.messages import HumanMessage
+
+from modules.task_maistro import TaskMaistro
+from modules.debug_langgraph import set_debug_mode
+from modules.maistro_cache import memory_cache, instructions_cache
+from modules.maistro_locks import namespace_locks
+from modules.node_maistro.node_instructions import INSTRUCTIONS_KEY
+from .fakes import CountingStore, FakeChatModel
+
+
+def turn_inputs(turns: int, same_user: bool):
+    for turn in range(turns):
+        user_id = "user-0" if same_user else f"user-{turn}"
+        config = {"configurable": {"user_id": user_id, "update_reply": "template"}}
+        yield {"messages": [HumanMessage(content=f"Preference {turn}: tag items with #{turn}")]}, config
+
+
+def lost_updates(store: CountingStore, turns: int, same_user: bool) -> tuple[int, int]:
+    """Preferences missing from the stored instructions, and extra profile documents."""
+    users = ["user-0"] if same_user else [f"user-{turn}" for turn in range(turns)]
+    kept, profiles = 0, 0
+    for user_id in users:
+        item = store.get(("instructions", "general", user_id), INSTRUCTIONS_KEY)
+        kept += item.value["memory"].count("Preference") if item else 0
+        profiles += len(store.search(("profile", "general", user_id)))
+    return turns - kept, profiles - len(users)
+
+
+def run(mode: str, locks: bool, same_user: bool, args) -> str:
+    namespace_locks.enabled = locks
+    model = FakeChatModel(latency=args.latency, update_type="instructions,user", merge_instructions=True)
+    maistro = TaskMaistro(model=model, use_async=mode == "async")
+    memory_cache.clear()
+    instructions_cache.clear()
+    store = CountingStore()
+    graph = maistro.graph.copy(update={"store": store})
+    inputs = list(turn_inputs(args.turns, same_user))
+
+    start = time.perf_counter()
+    if mode == "async":
+        async def turns():
+            await asyncio.gather(*(graph.ainvoke(state, config) for state, config in inputs))
+        asyncio.run(turns())
+    else:
+        with ThreadPoolExecutor(args.turns) as pool:
+            list(pool.map(lambda item: graph.invoke(*item), inputs))
+    elapsed = time.perf_counter() - start
+
+    lost, duplicates = lost_updates(store, args.turns, same_user)
+    return (f"{mode:<7}{'same' if same_user else 'distinct':<10}{'on' if locks else 'off':<7}"
+            f"{lost:>6}{duplicates:>14}{elapsed * 1000:>10.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--turns", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.02,
+                        help="simulated seconds per model call")
+    args = parser.parse_args()
+    set_debug_mode(False)
+
+    print(f"{'nodes':<7}{'users':<10}{'locks':<7}{'lost':>6}{'dup profiles':>14}{'wall ms':>10}")
+    for mode in ("async", "sync"):
+        for same_user in (True, False):
+            for locks in (False, True):
+                print(run(mode, locks, same_user, args))
+    namespace_locks.enabled = True
+    print(f"namespace_locks: {namespace_locks.stats()}")
+
+
+if __name__ == "__main__":
+    main()
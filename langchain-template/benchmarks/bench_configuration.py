@@ -0,0 +1,86 @@
+"""
+Microbenchmark: cost of Configuration.from_runnable_config per turn
+
+Counts the from_runnable_config calls of a turn that updates a todo, then times one call:
+- per call: the previous implementation, which read os.environ and built a new instance on
+  every call (reimplemented here for comparison),
+- memoized: the current one, with the environment snapshot and the instance memoized on the
+  configurable's values,
+- pre-resolved: a config prepared once with Configuration.into_runnable_config().
+The overhead per turn is reported as CPU time, and as the share of one core at --rps turns per second.
+
+Run from the langchain-template directory:
+    python -m benchmarks.bench_configuration [--rps 1000] [--repeat 200000]
+"""
+
+import argparse
+import os
+import time
+from dataclasses import fields
+
+from langchain_core.messages import HumanMessage
+
+from modules.configuration import Configuration, _coerce
+from modules.task_maistro import TaskMaistro
+from modules.debug_langgraph import set_debug_mode
+from .fakes import CountingStore, FakeChatModel
+
+CONFIG = {"configurable": {"user_id": "user-1", "todo_category": "general", "update_reply": "template",
+                           "max_todos_in_context": "25", "thread_id": "thread-1"}}
+
+
+def per_call(config):
+    """from_runnable_config as it was: an environment lookup per field and a new instance per call."""
+    configurable = config["configurable"] if config and "configurable" in config else {}
+    values = {f.name: _coerce(os.environ.get(f.name.upper(), configurable.get(f.name)), f.type)
+              for f in fields(Configuration) if f.init}
+    return Configuration(**{k: v for k, v in values.items() if v is not None and v != ""})
+
+
+def calls_per_turn() -> int:
+    """Run one turn and count the from_runnable_config calls the nodes make."""
+    calls = 0
+    original = Configuration.__dict__["from_runnable_config"]
+
+    def counting(cls, config=None):
+        nonlocal calls
+        calls += 1
+        return original.__func__(cls, config)
+
+    Configuration.from_runnable_config = classmethod(counting)
+    try:
+        maistro = TaskMaistro(model=FakeChatModel(update_type="todo"))
+        graph = maistro.graph.copy(update={"store": CountingStore()})
+        graph.invoke({"messages": [HumanMessage(content="Remind me to call mom")]}, CONFIG)
+    finally:
+        Configuration.from_runnable_config = original
+    return calls
+
+
+def timed(fn, config, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(config)
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rps", type=int, default=1000, help="turns per second to project the overhead at")
+    parser.add_argument("--repeat", type=int, default=200_000)
+    args = parser.parse_args()
+    set_debug_mode(False)
+
+    calls = calls_per_turn()
+    print(f"from_runnable_config calls per turn: {calls}")
+    print(f"{'implementation':<15}{'us/call':>9}{'us/turn':>9}{f'core % at {args.rps} rps':>22}")
+    for label, fn, config in (("per call", per_call, CONFIG),
+                              ("memoized", Configuration.from_runnable_config, CONFIG),
+                              ("pre-resolved", Configuration.from_runnable_config,
+                               Configuration.into_runnable_config(CONFIG))):
+        us = timed(fn, config, args.repeat)
+        print(f"{label:<15}{us:>9.2f}{us * calls:>9.1f}{us * calls * args.rps / 1e4:>22.2f}")
+
+
+if __name__ == "__main__":
+    main()
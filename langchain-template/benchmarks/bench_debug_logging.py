@@ -0,0 +1,76 @@
+"""
+Benchmark: per-turn overhead of the debug_langgraph calls made by task_mAIstro
+
+Measures the time a node spends in its debug calls over a 200-message history with debug
+disabled, with debug enabled (lazy records, serialized on the listener thread), and with the
+previous eager behavior (serialize and print inline). Output goes to os.devnull.
+
+Run from the langchain-template directory:
+    python -m benchmarks.bench_debug_logging [--turns 50] [--history 200]
+"""
+
+import argparse
+import json
+import os
+import time
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from modules import debug_langgraph
+from modules.debug_langgraph import debug_messages, debug_response, safe_serialize_message, set_debug_mode
+
+
+def history(n: int):
+    return [HumanMessage(content=f"Please add task number {i} to my list " * 4) if i % 2 == 0
+            else AIMessage(content=f"Added task number {i} to your list " * 4)
+            for i in range(n)]
+
+
+def turn(messages):
+    debug_messages("task_mAIstro", {
+        "system_msg": "You are a helpful task management assistant.",
+        "state['messages']": messages,
+    })
+    debug_response("task_mAIstro", messages[-1])
+
+
+def eager_turn(messages, devnull):
+    for label, data in (("task_mAIstro() messages", {"system_msg": "You are a helpful task management assistant.",
+                                                     "state['messages']": messages}),
+                        ("task_mAIstro() response", messages[-1])):
+        print(f'\n\n---- {label} ----\n\n', file=devnull)
+        print(json.dumps(safe_serialize_message(data), indent=2, ensure_ascii=False, default=str),
+              '\n\n', sep='', file=devnull)
+
+
+def run(label, fn, turns):
+    start = time.perf_counter()
+    for _ in range(turns):
+        fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<16} {elapsed / turns * 1000:9.3f} ms/turn in the node")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--turns", type=int, default=50)
+    parser.add_argument("--history", type=int, default=200)
+    args = parser.parse_args()
+
+    messages = history(args.history)
+    with open(os.devnull, "w") as devnull:
+        set_debug_mode(False)
+        run("disabled", lambda: turn(messages), args.turns)
+
+        set_debug_mode(True, stream=devnull)
+        run("enabled (lazy)", lambda: turn(messages), args.turns)
+        start = time.perf_counter()
+        debug_langgraph._stop_listener()
+        print(f"{'':<16} listener drained in {time.perf_counter() - start:.2f}s off the node thread")
+        set_debug_mode(False)
+
+        run("eager (previous)", lambda: eager_turn(messages, devnull), args.turns)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Benchmark: per-call setup cost of the ToDo Trustcall extractor in update_todos
+
+Compares building the extractor on every call (create_extractor(...).with_listeners(...)) with
+attaching a per-call Spy to the extractor that TaskMaistro builds once.
+
+Run from the langchain-template directory:
+    python -m benchmarks.bench_extractor_setup [--calls 200]
+"""
+
+import argparse
+import time
+
+from trustcall import create_extractor
+
+from modules.maistro_schema import ToDo
+from modules.task_maistro import TaskMaistro
+from modules.utils_spy import Spy
+from .fakes import FakeChatModel
+
+
+def per_call_build(maistro):
+    return create_extractor(
+        maistro.model,
+        tools=[ToDo],
+        tool_choice="ToDo",
+        enable_inserts=True
+    ).with_listeners(on_end=Spy())
+
+
+def prebuilt(maistro):
+    return maistro.todo_extractor.with_listeners(on_end=Spy())
+
+
+def run(label, setup, maistro, calls):
+    start = time.perf_counter()
+    for _ in range(calls):
+        setup(maistro)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<15} {elapsed / calls * 1e6:10.1f} us/call")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=200)
+    args = parser.parse_args()
+
+    maistro = TaskMaistro(model=FakeChatModel())
+    run("per-call build", per_call_build, maistro, args.calls)
+    run("prebuilt", prebuilt, maistro, args.calls)
+
+
+if __name__ == "__main__":
+    main()
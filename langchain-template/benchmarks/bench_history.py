@@ -0,0 +1,70 @@
+"""
+Benchmark: prompt size and turn latency of long threads with and without history management
+
+Runs one thread for --turns turns with a checkpointer, as the LangGraph API server does,
+and reports the task_mAIstro prompt size, the number of messages in the state and the turn
+latency at turns 50, 200 and 1000. The FakeChatModel adds --prompt-latency seconds per 1000
+prompt characters, to model prefill cost.
+
+- off: history_token_budget=0, the history grows forever
+- trim: history_token_budget=--budget, trimmed turns are dropped
+- summarize: history_token_budget=--budget, trimmed turns are folded into a rolling summary
+
+Run from the langchain-template directory:
+    python -m benchmarks.bench_history [--turns 1000] [--budget 2000] [--prompt-latency 0.002]
+"""
+
+import argparse
+import statistics
+import time
+
+from langchain_core.messages import HumanMessage
+from langgraph.checkpoint.memory import InMemorySaver
+
+from modules.task_maistro import TaskMaistro
+from modules.debug_langgraph import set_debug_mode
+from modules.maistro_cache import memory_cache
+from .fakes import CountingStore, FakeChatModel
+
+CHECKPOINTS = (50, 200, 1000)
+
+# Turns averaged at each checkpoint
+WINDOW = 10
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--turns", type=int, default=1000)
+    parser.add_argument("--budget", type=int, default=2000)
+    parser.add_argument("--prompt-latency", type=float, default=0.002,
+                        help="simulated seconds per 1000 prompt characters")
+    args = parser.parse_args()
+
+    print(f"{'mode':<11}{'turn':>6}{'messages':>10}{'prompt chars':>14}{'ms/turn':>9}")
+    for mode, settings in (("off", {}),
+                           ("trim", {"history_token_budget": args.budget, "summarize_history": False}),
+                           ("summarize", {"history_token_budget": args.budget})):
+        model = FakeChatModel(update_type=None, prompt_latency=args.prompt_latency)
+        maistro = TaskMaistro(model=model)
+        set_debug_mode(False)
+        memory_cache.clear()
+        graph = maistro.graph.copy(update={"store": CountingStore(), "checkpointer": InMemorySaver()})
+        config = {"configurable": {"thread_id": mode, **settings}}
+
+        prompt_chars, latencies = [], []
+        for turn in range(1, args.turns + 1):
+            before = model.prompt_chars
+            start = time.perf_counter()
+            state = graph.invoke({"messages": [HumanMessage(
+                content=f"Turn {turn}: I talked to the contractor about the kitchen, "
+                        f"they can start next week if we confirm the tiles by Friday.")]}, config)
+            latencies.append(time.perf_counter() - start)
+            prompt_chars.append(model.prompt_chars - before)
+            if turn in CHECKPOINTS:
+                print(f"{mode:<11}{turn:>6}{len(state['messages']):>10}"
+                      f"{statistics.mean(prompt_chars[-WINDOW:]):>14.0f}"
+                      f"{statistics.mean(latencies[-WINDOW:]) * 1000:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
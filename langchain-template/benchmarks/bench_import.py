@@ -0,0 +1,47 @@
+"""
+Benchmark: cold-start cost of importing the modules package
+
+Each measurement runs in a fresh interpreter. "import" is what a worker or test pays now that
+TaskMaistro is built lazily; "import + graph" adds the first access to modules.graph, which is
+what every import cost before, when the instance was built at import time.
+
+Run from the langchain-template directory:
+    python -m benchmarks.bench_import [--runs 5]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+SNIPPETS = {
+    "import": "import modules",
+    "import + graph": "import modules; modules.graph",
+}
+
+
+def cold_start(snippet: str) -> float:
+    code = ("import time; start = time.perf_counter(); "
+            f"{snippet}; print(time.perf_counter() - start)")
+    env = dict(os.environ)
+    # The lazy import must not need an API key; building the client does
+    env.setdefault("OPENAI_API_KEY", "unused")
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                         env=env, check=True)
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    for label, snippet in SNIPPETS.items():
+        timings = [cold_start(snippet) for _ in range(args.runs)]
+        print(f"{label:<16} median {statistics.median(timings) * 1000:8.1f} ms  "
+              f"min {min(timings) * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
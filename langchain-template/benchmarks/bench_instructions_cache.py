@@ -0,0 +1,78 @@
+"""
+Benchmark: update_instructions model calls and store writes with and without the rewrite cache
+
+Each of --users users states the same ToDo preference --turns times, with small differences in
+case and punctuation, and the router asks for an instructions update every time. The
+FakeChatModel sleeps for --latency seconds per call. Without the cache every turn rewrites the
+instructions with a model call. With it, a user's repeat of a turn already rewritten against the
+same instructions is answered from maistro_cache.instructions_cache: the first two turns of each
+user still call the model (the second one against the instructions the first wrote), the later
+ones hit. Entries are per user, so users never share a rewrite, and writes of unchanged text are
+skipped.
+
+Run from the langchain-template directory:
+    python -m benchmarks.bench_instructions_cache [--users 10] [--turns 5] [--latency 0.05]
+"""
+
+import argparse
+import time
+
+from langchain_core.messages import HumanMessage
+
+from modules.task_maistro import TaskMaistro
+from modules.debug_langgraph import set_debug_mode, debug_stats
+from modules.maistro_cache import memory_cache, instructions_cache
+from .fakes import CountingStore, FakeChatModel
+
+PREFERENCES = (
+    "Always add a deadline to new ToDo items",
+    "always add a deadline to new todo items!",
+    "Always add a deadline to new ToDo items.",
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--turns", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.05,
+                        help="simulated seconds per model call")
+    args = parser.parse_args()
+
+    print(f"{'cache':<7}{'rewrite calls':>15}{'store puts':>12}{'ms/turn':>9}")
+    for cache in (False, True):
+        model = FakeChatModel(latency=args.latency, update_type="instructions")
+        maistro = TaskMaistro(model=model)
+        set_debug_mode(False)
+        memory_cache.clear()
+        instructions_cache.clear()
+        store = CountingStore()
+        graph = maistro.graph.copy(update={"store": store})
+
+        puts = 0
+        original_put = store.put
+
+        def counting_put(*put_args, **put_kwargs):
+            nonlocal puts
+            puts += 1
+            return original_put(*put_args, **put_kwargs)
+
+        store.put = counting_put
+
+        start = time.perf_counter()
+        for turn in range(args.turns):
+            for user in range(args.users):
+                config = {"configurable": {"user_id": f"user-{user}", "update_reply": "template",
+                                           "cache_instructions": cache}}
+                message = PREFERENCES[turn % len(PREFERENCES)]
+                graph.invoke({"messages": [HumanMessage(content=message)]}, config)
+        elapsed = time.perf_counter() - start
+
+        rewrites = sum(1 for tools in model.calls if not tools)
+        print(f"{'on' if cache else 'off':<7}{rewrites:>15}{puts:>12}"
+              f"{elapsed / (args.users * args.turns) * 1000:>9.1f}")
+    print(f"instructions_cache: {debug_stats()['instructions_cache']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Benchmark: per-turn cost of resolving the model resources of the configured model and temperature
+
+Counts the maistro_models() lookups of a turn that updates a todo with Configuration.model set,
+then times one lookup:
+- default: model unset, the resources of the TaskMaistro that built the graph,
+- pool hit: the pooled MaistroModels of a (model, temperature),
+- pool miss: a new ChatOpenAI client with its bound tools and Trustcall extractors,
+- per turn TaskMaistro: what a turn would cost without the pool, building a TaskMaistro
+  (model resources and compiled graph) for its model and temperature.
+Then replays --lookups turns of --tenants tenants, each with its own (model, temperature) and
+Zipf-distributed traffic, through a pool of --maxsize entries, and checks that the pooled
+clients and the default one share langchain_openai's HTTP connection pool. The clients are
+real ChatOpenAI clients; no request is sent.
+
+Run from the langchain-template directory:
+    OPENAI_API_KEY=unused python -m benchmarks.bench_maistro_pool [--tenants 32] [--maxsize 8]
+"""
+
+import argparse
+import itertools
+import random
+import time
+
+from langchain_core.messages import HumanMessage
+
+from modules.configuration import Configuration
+from modules.task_maistro import TaskMaistro
+from modules.debug_langgraph import set_debug_mode
+from modules.maistro_pool import ModelPool, model_pool, maistro_models
+from .fakes import CountingStore, FakeChatModel
+
+MODELS = ("gpt-4o", "gpt-4o-mini", "gpt-4.1", "gpt-4.1-mini")
+
+
+def lookups_per_turn() -> int:
+    """Run one turn with a configured model, served by the shared pool, and count its lookups."""
+    factory = model_pool.factory
+    model_pool.factory = lambda model, temperature: FakeChatModel(update_type="todo")
+    try:
+        model_pool.clear()
+        before = model_pool.stats()
+        graph = TaskMaistro(model=FakeChatModel()).graph.copy(update={"store": CountingStore()})
+        graph.invoke({"messages": [HumanMessage(content="Remind me to call mom")]},
+                     {"configurable": {"user_id": "user-1", "model": "fake", "temperature": "0.2"}})
+        after = model_pool.stats()
+    finally:
+        model_pool.factory = factory
+        model_pool.clear()
+    return after["hits"] + after["misses"] - before["hits"] - before["misses"]
+
+
+def timed(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def tenants(count: int) -> list[Configuration]:
+    return [Configuration(user_id=f"user-{i}", model=MODELS[i % len(MODELS)], temperature=i // len(MODELS) / 10)
+            for i in range(count)]
+
+
+def churn(args) -> tuple[float, dict]:
+    """Zipf-distributed turns of the tenants through a pool smaller than their number."""
+    pool = ModelPool(args.maxsize)
+    configs = tenants(args.tenants)
+    rng = random.Random(0)
+    weights = [1 / (rank + 1) for rank in range(len(configs))]
+    turns = rng.choices(configs, weights, k=args.lookups)
+    start = time.perf_counter()
+    for configurable in turns:
+        pool.get(configurable.model, configurable.temperature)
+    return (time.perf_counter() - start) / len(turns) * 1e6, pool.stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tenants", type=int, default=32, help="distinct (model, temperature) pairs")
+    parser.add_argument("--maxsize", type=int, default=8, help="pool size of the churn run")
+    parser.add_argument("--lookups", type=int, default=2000, help="turns of the churn run")
+    parser.add_argument("--repeat", type=int, default=100_000)
+    parser.add_argument("--builds", type=int, default=10, help="repeats of the miss and per-turn builds")
+    args = parser.parse_args()
+    set_debug_mode(False)
+
+    calls = lookups_per_turn()
+    print(f"maistro_models() lookups per turn: {calls}")
+
+    maistro = TaskMaistro(model="gpt-4o")
+    default, pooled = Configuration(), Configuration(model="gpt-4o-mini", temperature=0.5)
+    maistro_models(pooled)
+    counter = itertools.count()
+    cold = ModelPool(1)
+    rows = (("default", lambda: maistro_models(default, maistro), args.repeat),
+            ("pool hit", lambda: maistro_models(pooled), args.repeat),
+            ("pool miss", lambda: cold.get(f"gpt-4o-{next(counter)}", 0.5), args.builds),
+            ("per turn TaskMaistro", lambda: TaskMaistro(model="gpt-4o-mini", temperature=0.5), args.builds))
+    print(f"{'resolution':<22}{'us/lookup':>12}{'us/turn':>12}")
+    for label, fn, repeat in rows:
+        us = timed(fn, repeat)
+        print(f"{label:<22}{us:>12.2f}{us * calls:>12.1f}")
+
+    us, stats = churn(args)
+    print(f"churn: {args.tenants} tenants, pool of {args.maxsize}: {us:.2f} us/lookup, {stats}")
+
+    default_model = maistro_models(default, maistro).model
+    shared = all(models.model.root_client._client is default_model.root_client._client
+                 and models.model.root_async_client._client is default_model.root_async_client._client
+                 for models in (maistro_models(pooled), cold.get("gpt-4o", 0)))
+    print(f"pooled clients share the HTTP connection pool: {shared}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Benchmark: store round trips per turn for the task_mAIstro memory load
+
+Compares the legacy three sequential store.search() calls with the batched load_memory(),
+and with load_memory() served through the per-user memory_cache.
+
+Run from the langchain-template directory:
+    python -m benchmarks.bench_memory_load [--turns 200] [--latency 0.002]
+"""
+
+import argparse
+import time
+
+from modules.maistro_memory import SEARCH_LIMIT, load_memory, memory_namespace
+from modules.maistro_cache import MemorySnapshotCache
+from .fakes import CountingStore
+
+
+def legacy_load(store, todo_category, user_id):
+    """The memory load as task_mAIstro did it before batching."""
+    profile = store.search(memory_namespace("profile", todo_category, user_id))
+    todos = store.search(memory_namespace("todo", todo_category, user_id))
+    instructions = store.search(memory_namespace("instructions", todo_category, user_id))
+    return profile, todos, instructions
+
+
+def seed(store, todo_category, user_id, n_todos):
+    store.put(memory_namespace("profile", todo_category, user_id), "profile", {"name": "Sam"})
+    store.put(memory_namespace("instructions", todo_category, user_id),
+              "user_instructions", {"memory": "Always add a deadline"})
+    for i in range(n_todos):
+        store.put(memory_namespace("todo", todo_category, user_id), f"todo-{i}",
+                  {"task": f"Task {i}", "status": "not started"})
+
+
+def run(label, load, store, turns):
+    store.reset_counters()
+    start = time.perf_counter()
+    for _ in range(turns):
+        load(store, "general", "bench-user")
+    elapsed = time.perf_counter() - start
+    print(f"{label:<10} round trips/turn: {store.round_trips / turns:.1f}  "
+          f"ops/turn: {store.ops / turns:.1f}  "
+          f"ms/turn: {elapsed / turns * 1000:.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--turns", type=int, default=200)
+    parser.add_argument("--todos", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.002,
+                        help="simulated seconds per store round trip")
+    args = parser.parse_args()
+
+    store = CountingStore(latency=args.latency)
+    seed(store, "general", "bench-user", args.todos)
+
+    run("legacy", legacy_load, store, args.turns)
+    run("batched", load_memory, store, args.turns)
+
+    cache = MemorySnapshotCache(maxsize=16, ttl=60)
+
+    def cached_load(store, todo_category, user_id):
+        return cache.get_or_load(store, todo_category, user_id, SEARCH_LIMIT,
+                                 lambda: load_memory(store, todo_category, user_id, SEARCH_LIMIT))
+
+    run("cached", cached_load, store, args.turns)
+    print(f"cache stats: {cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Benchmark: wall-clock per turn when one message asks for several memory updates
+
+"I'm Sam from Boston, remind me to call mom" asks for a profile and a ToDo update. With
+parallel_tool_calls=False (the previous binding), task_mAIstro requests one update per
+cycle, so the graph loops task_mAIstro -> update node -> task_mAIstro once per update type.
+With parallel tool calls, route_message sends every update type to its node in the same
+superstep. The FakeChatModel sleeps for --latency seconds per call.
+
+Run from the langchain-template directory:
+    python -m benchmarks.bench_parallel_updates [--turns 10] [--latency 0.05]
+"""
+
+import argparse
+import asyncio
+import time
+
+from langchain_core.messages import HumanMessage
+
+from modules.task_maistro import TaskMaistro
+from modules.debug_langgraph import set_debug_mode
+from modules.maistro_cache import memory_cache
+from modules.maistro_schema import UpdateMemory
+from .fakes import CountingStore, FakeChatModel
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--turns", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.05,
+                        help="simulated seconds per model call")
+    args = parser.parse_args()
+
+    print(f"{'updates':<24}{'tool calls':<12}{'model calls/turn':>17}{'ms/turn':>9}")
+    for update_type in ("todo", "user,todo", "user,todo,instructions"):
+        for parallel in (False, True):
+            model = FakeChatModel(latency=args.latency, update_type=update_type)
+            maistro = TaskMaistro(model=model, use_async=True)
+            # parallel=False reproduces the previous binding of the memory model
+            maistro._memory_model = maistro.bind_tools([UpdateMemory], parallel_tool_calls=parallel)
+            set_debug_mode(False)
+            memory_cache.clear()
+            graph = maistro.graph.copy(update={"store": CountingStore()})
+
+            async def turns():
+                for turn in range(args.turns):
+                    config = {"configurable": {"user_id": f"user-{turn}", "update_reply": "agent"}}
+                    message = HumanMessage(content="I'm Sam from Boston, remind me to call mom")
+                    await graph.ainvoke({"messages": [message]}, config)
+
+            start = time.perf_counter()
+            asyncio.run(turns())
+            elapsed = time.perf_counter() - start
+
+            print(f"{update_type:<24}{'parallel' if parallel else 'one by one':<12}"
+                  f"{len(model.calls) / args.turns:>17.1f}{elapsed / args.turns * 1000:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Benchmark: store latency percentiles of each persistence backend under N users x M turns
+
+Runs --users simulated users for --turns turns each, one thread per user at a time up to
+--concurrency, against the memory, sqlite and (with --postgres-uri) postgres backends of
+maistro_persistence. The FakeChatModel answers instantly and asks for a todo and a profile
+update on every turn, so the timings are those of the store and checkpointer. Every
+store round trip is timed, as is each whole turn.
+
+Run from the langchain-template directory:
+    python -m benchmarks.bench_persistence [--users 20] [--turns 10] [--concurrency 4]
+        [--backends memory,sqlite,postgres] [--postgres-uri postgresql://...]
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.messages import HumanMessage
+from langgraph.store.base import BaseStore
+
+from modules.task_maistro import TaskMaistro
+from modules.debug_langgraph import set_debug_mode
+from modules.maistro_cache import memory_cache
+from modules.maistro_persistence import create_persistence
+from .fakes import FakeChatModel
+
+
+def percentiles(samples: list[float]) -> str:
+    if len(samples) < 2:
+        return "n/a"
+    q = statistics.quantiles(samples, n=100)
+    return f"{q[49] * 1000:>7.2f}{q[94] * 1000:>7.2f}{q[98] * 1000:>7.2f}"
+
+
+class TimedStore(BaseStore):
+    """Store that forwards to another one and records the duration of every batch call."""
+
+    def __init__(self, store: BaseStore):
+        self.store = store
+        self.samples: list[float] = []
+        self._lock = threading.Lock()
+
+    def batch(self, ops):
+        start = time.perf_counter()
+        try:
+            return self.store.batch(ops)
+        finally:
+            with self._lock:
+                self.samples.append(time.perf_counter() - start)
+
+    async def abatch(self, ops):
+        start = time.perf_counter()
+        try:
+            return await self.store.abatch(ops)
+        finally:
+            with self._lock:
+                self.samples.append(time.perf_counter() - start)
+
+
+def run(backend: str, args, directory: str):
+    persistence = create_persistence(backend, path=os.path.join(directory, "bench.sqlite"),
+                                     uri=args.postgres_uri)
+    store = TimedStore(persistence.store)
+    maistro = TaskMaistro(model=FakeChatModel(update_type="todo,user"), persistence=persistence, store=store)
+    memory_cache.clear()
+
+    turns = []
+
+    def user_session(user: int):
+        config = {"configurable": {"user_id": f"user-{user}", "thread_id": f"thread-{user}",
+                                   "update_reply": "template"}}
+        for turn in range(args.turns):
+            start = time.perf_counter()
+            maistro.graph.invoke({"messages": [HumanMessage(content=f"Turn {turn}: call mom")]}, config)
+            turns.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(args.concurrency) as pool:
+        list(pool.map(user_session, range(args.users)))
+    elapsed = time.perf_counter() - start
+    maistro.close()
+    return store.samples, turns, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--turns", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--backends", default="memory,sqlite,postgres")
+    parser.add_argument("--postgres-uri", default=os.environ.get("MAISTRO_POSTGRES_URI", ""))
+    args = parser.parse_args()
+    set_debug_mode(False)
+
+    print(f"{'backend':<10}{'batches':>9}{'  batch ms p50 p95 p99':>22}{'   turn ms p50 p95 p99':>22}{'turns/s':>9}")
+    with tempfile.TemporaryDirectory() as directory:
+        for backend in args.backends.split(","):
+            if backend == "postgres" and not args.postgres_uri:
+                print(f"{backend:<10}skipped, no --postgres-uri")
+                continue
+            try:
+                batches, turns, elapsed = run(backend, args, directory)
+            except ImportError as e:
+                print(f"{backend:<10}skipped, {e}")
+                continue
+            print(f"{backend:<10}{len(batches):>9}{percentiles(batches):>22}{percentiles(turns):>22}"
+                  f"{len(turns) / elapsed:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Benchmark: size and build time of the task_mAIstro prompt with bloated memory
+
+The user has --todos todos, instructions of --instructions characters, a profile with a few
+hundred interests and --history chat messages. Compares the unbounded prompt with the
+PromptBuilder at --budget tokens, both on the first build for a snapshot (cold) and on the
+following ones (static sections cached).
+
+Run from the langchain-template directory:
+    python -m benchmarks.bench_prompt_builder [--budget 4000] [--todos 1000] [--history 400]
+"""
+
+import argparse
+import time
+from datetime import datetime, timezone
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from langgraph.store.base import Item
+
+from modules.maistro_memory import MemorySnapshot
+from modules.maistro_prompt import MODEL_SYSTEM_MESSAGE
+from modules.maistro_prompt_builder import PromptBuilder
+from modules.utils_token import approx_tokens
+
+ROLE = "You are a helpful task management assistant. You help you create, organize, and manage the user's ToDo list."
+
+
+def bloated_memory(todos: int, instructions: int) -> MemorySnapshot:
+    now = datetime.now(timezone.utc)
+    items = [Item(namespace=("todo", "general", "bench-user"), key=f"todo-{i}",
+                  value={"task": f"Task {i}: follow up on the quarterly planning item {i}",
+                         "time_to_complete": 30, "deadline": None,
+                         "solutions": ["Email the team", "Book a slot in the calendar"],
+                         "status": "not started"},
+                  created_at=now, updated_at=now) for i in range(todos)]
+    profile = {"name": "Sam", "location": "Boston", "job": "Engineer",
+               "connections": [f"friend {i}" for i in range(100)],
+               "interests": [f"interest number {i}" for i in range(300)]}
+    text = ("Always add a deadline and at least two concrete solutions to every new ToDo. " * 1000)[:instructions]
+    return MemorySnapshot("general", "bench-user", profile=profile, todos=items, instructions={"memory": text})
+
+
+def history(n: int):
+    return [HumanMessage(content=f"Message {i}: can you move the kitchen tiles task to next week?")
+            if i % 2 == 0 else AIMessage(content=f"Reply {i}: sure, I have moved it.") for i in range(n)]
+
+
+def timed(fn, repeat: int):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return result, (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--budget", type=int, default=4000)
+    parser.add_argument("--todos", type=int, default=1000)
+    parser.add_argument("--instructions", type=int, default=40_000)
+    parser.add_argument("--history", type=int, default=400)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    memory = bloated_memory(args.todos, args.instructions)
+    messages = history(args.history)
+
+    def unbounded():
+        system_msg = MODEL_SYSTEM_MESSAGE.format(task_maistro_role=ROLE, user_profile=memory.profile,
+                                                 todo=memory.format_todos(), instructions=memory.instructions)
+        return [SystemMessage(content=system_msg)] + messages
+
+    builder = PromptBuilder()
+
+    def budgeted():
+        system_msg, kept = builder.build(memory, memory.todos, messages, ROLE, args.budget)
+        return [SystemMessage(content=system_msg)] + kept
+
+    def cold():
+        builder.clear()
+        return budgeted()
+
+    print(f"{'prompt':<18}{'tokens':>8}{'messages':>10}{'build ms':>10}")
+    for label, fn in (("unbounded", unbounded), ("budgeted, cold", cold), ("budgeted, cached", budgeted)):
+        prompt, ms = timed(fn, args.repeat)
+        print(f"{label:<18}{approx_tokens(prompt):>8}{len(prompt) - 1:>10}{ms:>10.2f}")
+    print(f"cache: {builder.stats()}")
+
+
+if __name__ == "__main__":
+    main()
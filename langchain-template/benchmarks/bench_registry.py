@@ -0,0 +1,92 @@
+"""
+Benchmark: InstanceRegistry lookups per second
+
+Compares the previous registry lookup path (layered try/except, caller introspection on every
+miss) with the plain-dict get_instance() and a pre-resolved InstanceHandle, for hits and misses.
+
+Run from the langchain-template directory:
+    python -m benchmarks.bench_registry [--lookups 200000]
+"""
+
+import argparse
+import inspect
+import logging
+import time
+
+from modules.core_instance import InstanceRegistry, get_handle, get_instance, logger
+
+
+class LegacyRegistry:
+    """The lookup path of InstanceRegistry.get() + get_instance() before the redesign."""
+
+    _instances = {}
+
+    @staticmethod
+    def _caller():
+        caller_frame = inspect.currentframe().f_back
+        caller_module = "unknown"
+        caller_function = "unknown"
+        if caller_frame:
+            module = inspect.getmodule(caller_frame)
+            if module:
+                caller_module = module.__name__
+            caller_function = caller_frame.f_code.co_name
+        return caller_module, caller_function
+
+    @classmethod
+    def get(cls, key):
+        try:
+            if key not in cls._instances:
+                cls._caller()
+                raise KeyError(key)
+            return cls._instances[key]
+        except Exception as e:
+            cls._caller()
+            logger.error(f"Failed to get instance '{key}': {e}")
+            raise
+
+
+def legacy_get_instance(key):
+    try:
+        return LegacyRegistry.get(key)
+    except Exception as e:
+        LegacyRegistry._caller()
+        logger.error(f"Failed to get instance '{key}' via convenience function: {e}")
+        raise
+
+
+def run(label, lookup, lookups):
+    start = time.perf_counter()
+    for _ in range(lookups):
+        try:
+            lookup()
+        except KeyError:
+            pass
+    elapsed = time.perf_counter() - start
+    print(f"{label:<22} {lookups / elapsed:14,.0f} lookups/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--lookups", type=int, default=200_000)
+    args = parser.parse_args()
+
+    # Misses log at ERROR level; keep the benchmark output readable
+    logger.setLevel(logging.CRITICAL)
+
+    instance = object()
+    LegacyRegistry._instances["bench"] = instance
+    InstanceRegistry.register("bench", instance)
+    handle = get_handle("bench")
+
+    run("legacy hit", lambda: legacy_get_instance("bench"), args.lookups)
+    run("get_instance hit", lambda: get_instance("bench"), args.lookups)
+    run("handle hit", handle, args.lookups)
+
+    misses = max(args.lookups // 100, 1)
+    run("legacy miss", lambda: legacy_get_instance("missing"), misses)
+    run("get_instance miss", lambda: get_instance("missing"), misses)
+
+
+if __name__ == "__main__":
+    main()
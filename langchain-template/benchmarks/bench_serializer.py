@@ -0,0 +1,89 @@
+"""
+Benchmark: safe_serialize_message on large synthetic histories
+
+Compares the iterative, memoized serializer with the previous recursive one on a message
+history whose messages share one large metadata object, and on a cyclic object graph.
+
+Run from the langchain-template directory:
+    python -m benchmarks.bench_serializer [--history 1000]
+"""
+
+import argparse
+import json
+import time
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from modules.debug_langgraph import safe_serialize_message
+
+
+def recursive_serialize(msg):
+    """safe_serialize_message() as it was before it became iterative."""
+    if hasattr(msg, "model_dump"):
+        return msg.model_dump()
+    elif hasattr(msg, "dict"):
+        return msg.dict()
+    elif isinstance(msg, list):
+        return [recursive_serialize(m) for m in msg]
+    elif isinstance(msg, dict):
+        return {k: recursive_serialize(v) for k, v in msg.items()}
+    elif isinstance(msg, Exception):
+        return {"error_type": type(msg).__name__, "error_message": str(msg)}
+    elif hasattr(msg, "__dict__"):
+        return {k: recursive_serialize(v) for k, v in msg.__dict__.items()}
+    return str(msg)
+
+
+class Node:
+    """Object with a back-reference to its parent, like many LangChain runtime objects."""
+
+    def __init__(self, parent=None):
+        self.parent = parent
+        self.children = []
+
+
+def history(n: int):
+    shared = {"todos": [{"task": f"Task {i}", "solutions": ["a", "b"]} for i in range(200)]}
+    messages = []
+    for i in range(n):
+        cls = HumanMessage if i % 2 == 0 else AIMessage
+        messages.append(cls(content=f"message {i} " * 2000 if i % 50 == 0 else f"message {i}",
+                            additional_kwargs={"context": shared}))
+    return {"messages": messages, "context": shared}
+
+
+def cyclic():
+    root = Node()
+    for _ in range(10):
+        root.children.append(Node(root))
+    return root
+
+
+def run(label, serialize, data):
+    start = time.perf_counter()
+    try:
+        size = len(json.dumps(serialize(data), default=str))
+    except RecursionError:
+        print(f"{label:<10} RecursionError after {time.perf_counter() - start:.3f}s")
+        return
+    print(f"{label:<10} {time.perf_counter() - start:8.3f}s  output: {size / 1e6:8.2f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--history", type=int, default=1000)
+    args = parser.parse_args()
+
+    data = history(args.history)
+    print(f"history of {args.history} messages")
+    run("recursive", recursive_serialize, data)
+    run("iterative", safe_serialize_message, data)
+
+    data = cyclic()
+    print("cyclic object graph")
+    run("recursive", recursive_serialize, data)
+    run("iterative", safe_serialize_message, data)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Benchmark: MaistroSqliteStore against LangGraph's SqliteStore with many users
+
+Loads --users users with --todos todos and a profile each, then times the store operations
+of a turn on random users: get of the instructions, search of the user's todos and profile,
+and a batch of puts of a turn's writes. With --baseline the same is run on
+langgraph.store.sqlite.SqliteStore, which keeps the namespace as one text column. Both run on a
+WAL-mode database file in a temporary directory.
+
+Run from the langchain-template directory (the default 100k users x 50 todos writes about
+5M rows per store and takes a few minutes):
+    python -m benchmarks.bench_sqlite_store [--users 100000] [--todos 50] [--samples 2000] [--baseline]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from langgraph.store.base import GetOp, PutOp, SearchOp
+
+from modules.maistro_persistence import sqlite_connection
+from modules.maistro_sqlite_store import MaistroSqliteStore
+
+# Users written per store.batch call while loading
+LOAD_CHUNK = 500
+
+
+def todo(user: int, i: int) -> dict:
+    return {"task": f"Task {i} of user {user}: follow up on the planning item", "time_to_complete": 30,
+            "deadline": None, "solutions": ["Email the team", "Book a slot"], "status": "not started"}
+
+
+def load(store, users: int, todos: int) -> float:
+    start = time.perf_counter()
+    for first in range(0, users, LOAD_CHUNK):
+        ops = []
+        for user in range(first, min(first + LOAD_CHUNK, users)):
+            ops.append(PutOp(("profile", "general", f"user-{user}"), "profile", {"name": f"User {user}"}))
+            ops += [PutOp(("todo", "general", f"user-{user}"), f"todo-{i}", todo(user, i)) for i in range(todos)]
+        store.batch(ops)
+    return time.perf_counter() - start
+
+
+def timed(fn, samples: int) -> tuple[float, float]:
+    durations = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        fn()
+        durations.append(time.perf_counter() - start)
+    q = statistics.quantiles(durations, n=100)
+    return q[49] * 1000, q[94] * 1000
+
+
+def run(label: str, store, path: str, args):
+    rows = args.users * (args.todos + 1)
+    load_seconds = load(store, args.users, args.todos)
+    rng = random.Random(0)
+
+    def user() -> str:
+        return f"user-{rng.randrange(args.users)}"
+
+    def get():
+        store.batch([GetOp(("instructions", "general", user()), "user_instructions")])
+
+    def search():
+        uid = user()
+        store.batch([SearchOp(("todo", "general", uid), limit=1000), SearchOp(("profile", "general", uid))])
+
+    def write():
+        uid = user()
+        store.batch([PutOp(("todo", "general", uid), f"todo-{rng.randrange(args.todos)}", todo(0, 0)),
+                     PutOp(("todo", "general", uid), f"new-{rng.random()}", todo(0, 1)),
+                     PutOp(("profile", "general", uid), "profile", {"name": "Sam", "location": "Boston"})])
+
+    size = sum(os.path.getsize(path + suffix) for suffix in ("", "-wal") if os.path.exists(path + suffix))
+    results = [timed(fn, args.samples) for fn in (get, search, write)]
+    print(f"{label:<20}{rows / load_seconds:>10.0f}{size / 2 ** 20:>9.0f}"
+          + "".join(f"{p50:>8.3f}{p95:>8.3f}" for p50, p95 in results))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--todos", type=int, default=50)
+    parser.add_argument("--samples", type=int, default=2000)
+    parser.add_argument("--baseline", action="store_true", help="also run LangGraph's SqliteStore")
+    args = parser.parse_args()
+
+    print(f"{'store':<20}{'rows/s':>10}{'MiB':>9}{'get p50':>8}{'p95':>8}{'search':>8}{'p95':>8}"
+          f"{'write':>8}{'p95':>8}  (ms)")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "maistro.sqlite")
+        store = MaistroSqliteStore(sqlite_connection(path))
+        store.setup()
+        run("MaistroSqliteStore", store, path, args)
+        store.close()
+
+        if args.baseline:
+            from langgraph.store.sqlite import SqliteStore
+
+            path = os.path.join(directory, "langgraph.sqlite")
+            baseline = SqliteStore(sqlite_connection(path))
+            baseline.setup()
+            run("SqliteStore", baseline, path, args)
+
+
+if __name__ == "__main__":
+    main()
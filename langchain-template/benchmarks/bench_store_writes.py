@@ -0,0 +1,73 @@
+"""
+Benchmark: store writes per turn of update_todos and update_profile
+
+Each of --users users has --todos todos and a profile, and asks for a todo and a profile
+update on each of --turns turns. With --scenario noop the FakeChatModel answers Trustcall
+with empty PatchDoc calls, as a model does when nothing changed; with insert it adds a new
+todo every turn. The CountingStore sleeps --latency seconds per round trip. "put before" is
+the number of individual puts the nodes made before write planning: one per response.
+
+Run from the langchain-template directory:
+    python -m benchmarks.bench_store_writes [--users 10] [--turns 5] [--todos 10] [--latency 0.002]
+"""
+
+import argparse
+import time
+
+from langchain_core.messages import HumanMessage
+
+from modules.task_maistro import TaskMaistro
+from modules.debug_langgraph import set_debug_mode
+from modules.maistro_cache import memory_cache
+from modules.utils_store import write_counters
+from .fakes import CountingStore, FakeChatModel
+
+
+def seeded_store(users: int, todos: int, latency: float) -> CountingStore:
+    store = CountingStore(latency=latency)
+    for user in range(users):
+        store.put(("profile", "general", f"user-{user}"), "profile", {"name": "Sam", "location": "Boston"})
+        for i in range(todos):
+            store.put(("todo", "general", f"user-{user}"), f"todo-{i}",
+                      {"task": f"Existing task number {i}", "time_to_complete": 30, "deadline": None,
+                       "solutions": ["first idea", "second idea"], "status": "not started"})
+    store.reset_counters()
+    return store
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--turns", type=int, default=5)
+    parser.add_argument("--todos", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.002,
+                        help="simulated seconds per store round trip")
+    args = parser.parse_args()
+
+    turns = args.users * args.turns
+    print(f"{'scenario':<10}{'put before':>11}{'written':>9}{'skipped':>9}{'batches':>9}"
+          f"{'store trips/turn':>18}{'ms/turn':>9}")
+    for scenario in ("insert", "noop"):
+        model = FakeChatModel(update_type="todo,user", patch_existing=scenario == "noop")
+        maistro = TaskMaistro(model=model)
+        set_debug_mode(False)
+        memory_cache.clear()
+        write_counters.clear()
+        store = seeded_store(args.users, args.todos, args.latency)
+        graph = maistro.graph.copy(update={"store": store})
+
+        start = time.perf_counter()
+        for turn in range(args.turns):
+            for user in range(args.users):
+                config = {"configurable": {"user_id": f"user-{user}", "update_reply": "template"}}
+                graph.invoke({"messages": [HumanMessage(content="Remind me to call mom tomorrow")]}, config)
+        elapsed = time.perf_counter() - start
+
+        stats = write_counters.stats()
+        print(f"{scenario:<10}{(stats['written'] + stats['skipped']) / turns:>11.1f}"
+              f"{stats['written'] / turns:>9.1f}{stats['skipped'] / turns:>9.1f}{stats['batches'] / turns:>9.1f}"
+              f"{store.round_trips / turns:>18.1f}{elapsed / turns * 1000:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Benchmark: time to first token of the task_mAIstro reply
+
+local mode (default) runs the graph in process against a FakeChatModel that waits --latency
+seconds before its first token and --token-latency seconds per token. It compares the time
+until the first reply token arrives through stream_mode="messages" with the time until the
+complete reply arrives through stream_mode="updates". The nodes call the model with a plain
+invoke(); under stream_mode="messages" the graph's callbacks make it stream, so the first
+tokens reach the client long before the node returns.
+
+server mode is an example client for a deployed task_maistro graph (langgraph dev or the
+API server container). It streams one run with stream_mode="messages-tuple" and prints the
+time to first token and the total run time.
+
+Run from the langchain-template directory:
+    python -m benchmarks.bench_streaming [--turns 10] [--latency 0.3] [--token-latency 0.02]
+    python -m benchmarks.bench_streaming --mode server --url http://localhost:8123 [--user-id Test]
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+# Nodes whose model output is the reply shown to the user
+REPLY_NODES = ("task_mAIstro", "confirm_update")
+
+USER_INPUT = "Add a ToDo to call parents back about Thanksgiving plans."
+
+
+async def local_turn(graph, config, stream_mode: str) -> tuple[float, float]:
+    """Return (seconds to the first reply content, seconds to the end of the run)."""
+    start = time.perf_counter()
+    first = None
+    async for event in graph.astream({"messages": [HumanMessage(content=USER_INPUT)]}, config,
+                                     stream_mode=stream_mode):
+        if first is not None:
+            continue
+        if stream_mode == "messages":
+            chunk, metadata = event
+            if metadata.get("langgraph_node") in REPLY_NODES and chunk.content:
+                first = time.perf_counter() - start
+        else:
+            for node, update in event.items():
+                for message in (update or {}).get("messages", []):
+                    if node in REPLY_NODES and isinstance(message, AIMessage) and message.content:
+                        first = time.perf_counter() - start
+    return first, time.perf_counter() - start
+
+
+def run_local(args):
+    from modules.task_maistro import TaskMaistro
+    from modules.debug_langgraph import set_debug_mode
+    from modules.maistro_cache import memory_cache
+    from .fakes import CountingStore, FakeChatModel
+
+    model = FakeChatModel(latency=args.latency, token_latency=args.token_latency, update_type=None)
+    maistro = TaskMaistro(model=model, use_async=True)
+    set_debug_mode(False)
+    memory_cache.clear()
+    graph = maistro.graph.copy(update={"store": CountingStore()})
+
+    print(f"{'stream_mode':<12}{'first token p50':>16}{'run p50':>10}")
+    for stream_mode in ("updates", "messages"):
+        results = [asyncio.run(local_turn(graph, {"configurable": {"user_id": f"user-{turn}"}}, stream_mode))
+                   for turn in range(args.turns)]
+        print(f"{stream_mode:<12}{statistics.median(r[0] for r in results) * 1000:>14.0f}ms"
+              f"{statistics.median(r[1] for r in results) * 1000:>8.0f}ms")
+
+
+async def run_server(args):
+    from langgraph_sdk import get_client
+
+    client = get_client(url=args.url)
+    thread = await client.threads.create()
+    start = time.perf_counter()
+    first = None
+    async for chunk in client.runs.stream(thread["thread_id"], args.graph,
+                                          input={"messages": [{"role": "user", "content": USER_INPUT}]},
+                                          config={"configurable": {"user_id": args.user_id}},
+                                          stream_mode="messages-tuple"):
+        if chunk.event != "messages":
+            continue
+        message, metadata = chunk.data
+        if metadata.get("langgraph_node") in REPLY_NODES and message.get("content"):
+            if first is None:
+                first = time.perf_counter() - start
+                print(f"first token after {first * 1000:.0f}ms")
+            print(message["content"], end="", flush=True)
+    print(f"\nrun finished after {(time.perf_counter() - start) * 1000:.0f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--mode", choices=("local", "server"), default="local")
+    parser.add_argument("--turns", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.3,
+                        help="simulated seconds before the first token")
+    parser.add_argument("--token-latency", type=float, default=0.02,
+                        help="simulated seconds per token")
+    parser.add_argument("--url", default="http://localhost:8123")
+    parser.add_argument("--graph", default="task_maistro")
+    parser.add_argument("--user-id", default="Test")
+    args = parser.parse_args()
+
+    if args.mode == "server":
+        asyncio.run(run_server(args))
+    else:
+        run_local(args)
+
+
+if __name__ == "__main__":
+    main()
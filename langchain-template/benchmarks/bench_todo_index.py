@@ -0,0 +1,133 @@
+"""
+Benchmark: recall and latency of the local TodoIndex at 10k todos per user
+
+Each query is a shuffled, partial rewording of one synthetic todo (some words dropped, one
+unrelated word added); recall@k is the share of queries whose todo is among the top k.
+The BM25 ranking from utils_todo.lexical_scores() over all todos is the brute-force baseline.
+
+Then runs the task_mAIstro node over a store holding the same todos, with the default
+todo_fetch_limit, and reports how often each query's todo reaches the prompt, the node's
+latency and its store round trips per turn, with semantic_todo_top_k off and set to k. The
+first turn with the index on loads it with a paged scan of all the todos; later turns query it
+and fetch only the hits missing from the memory snapshot.
+
+Run from the langchain-template directory:
+    python -m benchmarks.bench_todo_index [--todos 10000] [--queries 200] [--k 10] [--turns 50]
+"""
+
+import argparse
+import random
+import statistics
+import time
+from datetime import datetime, timezone
+
+from langchain_core.messages import HumanMessage
+from langgraph.store.base import Item, PutOp
+
+from modules.maistro_cache import memory_cache
+from modules.node_maistro import task_mAIstro
+from modules.task_maistro import TaskMaistro
+from modules.todo_index import TodoIndex
+from modules.utils_todo import lexical_scores, todo_text, tokenize
+from .fakes import CountingStore, FakeChatModel
+
+VERBS = "book call email buy renew schedule cancel pay plan fix clean order return review prepare send".split()
+OBJECTS = ("dentist appointment", "passport", "car insurance", "flight tickets", "birthday gift",
+           "electricity bill", "team meeting", "grocery delivery", "gym membership", "tax return",
+           "kitchen sink", "hotel room", "library books", "doctor visit", "moving boxes")
+PEOPLE = "mom dad alex priya sam jordan chen maria lee omar".split()
+PLACES = "boston tokyo berlin lisbon toronto denver austin paris seoul lima".split()
+
+
+def make_todos(n: int, rng: random.Random) -> list[Item]:
+    now = datetime.now(timezone.utc)
+    items = []
+    for i in range(n):
+        task = f"{rng.choice(VERBS)} {rng.choice(OBJECTS)} for {rng.choice(PEOPLE)} in {rng.choice(PLACES)}"
+        items.append(Item(namespace=("todo", "general", "bench-user"), key=f"todo-{i}",
+                          value={"task": task, "solutions": [f"ask {rng.choice(PEOPLE)}"],
+                                 "status": "not started", "time_to_complete": i},
+                          created_at=now, updated_at=now))
+    return items
+
+
+def make_query(item: Item, rng: random.Random) -> str:
+    words = tokenize(todo_text(item.value))
+    kept = rng.sample(words, max(2, int(len(words) * 0.7)))
+    return " ".join(kept + [rng.choice(["tomorrow", "urgent", "soon", "today"])])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--todos", type=int, default=10_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--turns", type=int, default=50, help="task_mAIstro turns of the node path")
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    items = make_todos(args.todos, rng)
+    targets = rng.sample(items, args.queries)
+    queries = [make_query(item, rng) for item in targets]
+
+    index = TodoIndex()
+    start = time.perf_counter()
+    index.sync(items)
+    print(f"build:  {time.perf_counter() - start:.2f}s for {len(index)} todos")
+
+    start = time.perf_counter()
+    for item in items[:100]:
+        index.upsert(item.key, dict(item.value, task=item.value["task"] + " asap"))
+    print(f"upsert: {(time.perf_counter() - start) * 10:.3f} ms/todo")
+    index.sync(items)
+
+    def index_search(query):
+        return [key for key, _ in index.query(query, args.k)]
+
+    def bm25_search(query):
+        scores = lexical_scores(items, query)
+        return [items[i].key for i in sorted(range(len(items)), key=scores.__getitem__, reverse=True)[:args.k]]
+
+    for label, search in (("index", index_search), ("bm25", bm25_search)):
+        hits, latencies = 0, []
+        for item, query in zip(targets, queries):
+            start = time.perf_counter()
+            keys = search(query)
+            latencies.append(time.perf_counter() - start)
+            hits += item.key in keys
+        latencies.sort()
+        print(f"{label:<6} recall@{args.k}: {hits / len(queries):.2f}  "
+              f"p50 {statistics.median(latencies) * 1000:7.2f} ms  "
+              f"p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:7.2f} ms")
+
+    node_path(items, targets, queries, args.k, args.turns)
+
+
+def node_path(items: list[Item], targets: list[Item], queries: list[str], k: int, turns: int) -> None:
+    """Run task_mAIstro for each query and check whether its todo is in the system prompt."""
+    store = CountingStore()
+    store.batch([PutOp(item.namespace, item.key, item.value) for item in items])
+    model = FakeChatModel(update_type=None, record_prompts=True)
+    maistro = TaskMaistro(model=model)
+    for top_k in (0, k):
+        memory_cache.clear()
+        config = {"configurable": {"user_id": "bench-user", "semantic_todo_top_k": top_k}}
+        hits, latencies, round_trips = 0, [], 0
+        for turn, (item, query) in enumerate(zip(targets[:turns + 1], queries[:turns + 1])):
+            store.reset_counters()
+            start = time.perf_counter()
+            task_mAIstro({"messages": [HumanMessage(content=query)]}, config, store, maistro)
+            elapsed = time.perf_counter() - start
+            if turn == 0:
+                print(f"node   top_k={top_k:<3} first turn {elapsed * 1000:7.2f} ms, {store.round_trips} round trips")
+                continue
+            latencies.append(elapsed)
+            round_trips += store.round_trips
+            hits += str(item.value) in model.prompts[-1][0].content
+        print(f"node   top_k={top_k:<3} in prompt: {hits / len(latencies):.2f}  "
+              f"p50 {statistics.median(latencies) * 1000:7.2f} ms  "
+              f"round trips/turn {round_trips / len(latencies):.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Benchmark: task_mAIstro system prompt size against ToDo list size
+
+Renders MODEL_SYSTEM_MESSAGE with every todo (the previous behavior) and with the todos chosen
+by select_todos() under the default Configuration, for growing ToDo lists. A quarter of the
+synthetic todos are done or archived.
+
+Run from the langchain-template directory:
+    python -m benchmarks.bench_todo_selection [--sizes 10 100 500 1000]
+"""
+
+import argparse
+import time
+from datetime import datetime, timedelta, timezone
+
+from langchain_core.messages import HumanMessage
+from langgraph.store.base import Item
+
+from modules.configuration import Configuration
+from modules.maistro_memory import MemorySnapshot
+from modules.maistro_prompt import MODEL_SYSTEM_MESSAGE
+from modules.utils_todo import todos_in_context
+
+STATUSES = ("not started", "in progress", "not started", "done")
+
+
+def todos(n: int) -> list[Item]:
+    now = datetime.now(timezone.utc)
+    return [Item(namespace=("todo", "general", "bench-user"), key=f"todo-{i}",
+                 value={"task": f"Task {i}: book dentist appointment number {i}",
+                        "time_to_complete": 30,
+                        "deadline": (now + timedelta(days=i % 30)).isoformat() if i % 3 else None,
+                        "solutions": [f"Call clinic {i}", "Use the online booking form"],
+                        "status": "archived" if i % 8 == 0 else STATUSES[i % 4]},
+                 created_at=now, updated_at=now - timedelta(minutes=i))
+            for i in range(n)]
+
+
+def render(configurable, memory, selected) -> str:
+    return MODEL_SYSTEM_MESSAGE.format(task_maistro_role=configurable.task_maistro_role,
+                                       user_profile=memory.profile,
+                                       todo=memory.format_todos(selected),
+                                       instructions=memory.instructions)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 500, 1000])
+    args = parser.parse_args()
+
+    messages = [HumanMessage(content="Did I already book the dentist appointment number 42?")]
+    configs = {
+        "all todos": None,
+        "selected": Configuration(),
+        "selected+lexical": Configuration(rank_todos_by_similarity=True),
+    }
+    print(f"{'todos':>6}  " + "  ".join(f"{label:>24}" for label in configs))
+    for n in args.sizes:
+        memory = MemorySnapshot("general", "bench-user", profile={"name": "Sam"}, todos=todos(n))
+        cells = []
+        for configurable in configs.values():
+            start = time.perf_counter()
+            if configurable is None:
+                prompt = render(Configuration(), memory, None)
+            else:
+                prompt = render(configurable, memory, todos_in_context(memory.todos, configurable, messages))
+            elapsed = (time.perf_counter() - start) * 1000
+            cells.append(f"{len(prompt) // 4:>8} tok {elapsed:7.2f} ms")
+        print(f"{n:>6}  " + "  ".join(f"{cell:>24}" for cell in cells))
+
+
+if __name__ == "__main__":
+    main()
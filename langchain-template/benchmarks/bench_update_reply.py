@@ -0,0 +1,68 @@
+"""
+Benchmark: model calls, prompt size and latency per turn for each update_reply mode
+
+A turn that updates memory runs task_mAIstro, the update node, and then either confirm_update
+with a fixed reply ("template", the default), task_mAIstro again ("agent"), or confirm_update
+with a short model call ("confirm"). Only "template" saves a model call; "confirm" makes as
+many as "agent" and only shrinks the prompt of the reply. The FakeChatModel is scripted
+to request one update of the given type and sleeps for --latency seconds per call; the user
+already has --todos todos, which is what makes the second task_mAIstro prompt large.
+
+Run from the langchain-template directory:
+    python -m benchmarks.bench_update_reply [--turns 20] [--latency 0.05] [--todos 25]
+"""
+
+import argparse
+import time
+
+from langchain_core.messages import HumanMessage
+
+from modules.task_maistro import TaskMaistro
+from modules.debug_langgraph import set_debug_mode
+from modules.maistro_cache import memory_cache
+from .fakes import CountingStore, FakeChatModel
+
+
+def seeded_store(users: int, todos: int) -> CountingStore:
+    store = CountingStore()
+    for user in range(users):
+        for i in range(todos):
+            store.put(("todo", "general", f"user-{user}"), f"todo-{i}",
+                      {"task": f"Existing task number {i} with some detail", "time_to_complete": 30,
+                       "solutions": ["first idea", "second idea"], "status": "not started"})
+    store.reset_counters()
+    return store
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.05,
+                        help="simulated seconds per model call")
+    parser.add_argument("--todos", type=int, default=25)
+    args = parser.parse_args()
+
+    print(f"{'update':<13}{'mode':<9}{'calls/turn':>11}{'prompt chars/turn':>19}"
+          f"{'store trips/turn':>18}{'ms/turn':>9}")
+    for update_type in ("todo", "user", "instructions"):
+        for mode in ("template", "agent", "confirm"):
+            model = FakeChatModel(latency=args.latency, update_type=update_type)
+            maistro = TaskMaistro(model=model)
+            set_debug_mode(False)
+            memory_cache.clear()
+            store = seeded_store(args.turns, args.todos)
+            graph = maistro.graph.copy(update={"store": store})
+
+            start = time.perf_counter()
+            for turn in range(args.turns):
+                config = {"configurable": {"user_id": f"user-{turn}", "update_reply": mode}}
+                graph.invoke({"messages": [HumanMessage(content="Remind me to call mom tomorrow")]}, config)
+            elapsed = time.perf_counter() - start
+
+            print(f"{update_type:<13}{mode:<9}{len(model.calls) / args.turns:>11.1f}"
+                  f"{model.prompt_chars / args.turns:>19.0f}{store.round_trips / args.turns:>18.1f}"
+                  f"{elapsed / args.turns * 1000:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Check: the system prompts share a byte-identical prefix across turns and users
+
+Providers cache prompts by prefix, so the static part of each system prompt has to come first
+and must not vary with the user, the turn or the clock. This runs --users users for --turns
+turns each through the graph, with memory updates of every type, records the prompts the
+FakeChatModel receives and checks that:
+
+- every task_mAIstro and confirm_update system prompt starts with the static part of its
+  template, up to the first per-user field,
+- every Trustcall system prompt starts with the static part of TRUSTCALL_INSTRUCTION, up to
+  the time (Trustcall appends the user's existing memories after it),
+- every update_instructions system prompt starts with the static part of CREATE_INSTRUCTIONS.
+
+It also reports how much of each system prompt is shared by all calls. Exits with status 1 on a mismatch.
+
+Run from the langchain-template directory:
+    python -m benchmarks.check_prompt_prefix [--users 5] [--turns 4]
+"""
+
+import argparse
+import os
+import sys
+from collections import defaultdict
+
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from modules.task_maistro import TaskMaistro
+from modules.debug_langgraph import set_debug_mode
+from modules.maistro_cache import memory_cache
+from modules.maistro_prompt import (
+    MODEL_SYSTEM_MESSAGE, CONFIRM_UPDATE_MESSAGE, CREATE_INSTRUCTIONS, TRUSTCALL_INSTRUCTION
+)
+from modules.configuration import Configuration
+from .fakes import CountingStore, FakeChatModel
+
+
+def static_prefix(template: str, first_field: str, **fields) -> str:
+    """The template up to `first_field`, with the fields before it filled in."""
+    head, _, _ = template.partition("{" + first_field + "}")
+    return head.format(**fields)
+
+
+def shared_prefix(texts: list[str]) -> int:
+    """Length of the longest common prefix of the texts."""
+    return len(os.path.commonprefix(texts)) if texts else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=5)
+    parser.add_argument("--turns", type=int, default=4)
+    args = parser.parse_args()
+
+    model = FakeChatModel(update_type="todo,user,instructions", record_prompts=True)
+    maistro = TaskMaistro(model=model)
+    set_debug_mode(False)
+    memory_cache.clear()
+    graph = maistro.graph.copy(update={"store": CountingStore()})
+
+    role = Configuration.task_maistro_role
+    for turn in range(args.turns):
+        for user in range(args.users):
+            # Alternate the reply mode, so that both task_mAIstro and confirm_update reply after updates
+            mode = "agent" if turn % 2 == 0 else "confirm"
+            config = {"configurable": {"user_id": f"user-{user}", "update_reply": mode,
+                                       "thread_id": f"thread-{user}"}}
+            graph.invoke({"messages": [HumanMessage(content=f"Turn {turn}: remind me to call mom")]}, config)
+
+    expected = {
+        "task_mAIstro": static_prefix(MODEL_SYSTEM_MESSAGE, "user_profile", task_maistro_role=role),
+        "confirm_update": static_prefix(CONFIRM_UPDATE_MESSAGE, "updates", task_maistro_role=role),
+        "update_instructions": static_prefix(CREATE_INSTRUCTIONS, "current_instructions"),
+        "trustcall": static_prefix(TRUSTCALL_INSTRUCTION, "time"),
+    }
+    prompts = defaultdict(list)
+    for messages in model.prompts:
+        if not messages or not isinstance(messages[0], SystemMessage):
+            continue
+        content = messages[0].content
+        kind = next((kind for kind in ("trustcall", "update_instructions")
+                     if content.startswith(expected[kind][:40])), None)
+        if kind is None:
+            kind = "confirm_update" if "<updates>" in content else "task_mAIstro"
+        prompts[kind].append(content)
+
+    failures = 0
+    print(f"{'prompt':<21}{'calls':>7}{'static chars':>14}{'shared chars':>14}{'avg chars':>11}{'ok':>5}")
+    for kind, prefix in expected.items():
+        texts = prompts[kind]
+        ok = bool(texts) and all(text.startswith(prefix) for text in texts)
+        failures += not ok
+        average = sum(map(len, texts)) / len(texts) if texts else 0
+        print(f"{kind:<21}{len(texts):>7}{len(prefix):>14}{shared_prefix(texts):>14}{average:>11.0f}"
+              f"{'yes' if ok else 'NO':>5}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""
+Instrumented fakes shared by the benchmarks
+"""
+
+import ast
+import asyncio
+import json
+import re
+import time
+import uuid
+from typing import Any, AsyncIterator, Iterator, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from langgraph.store.memory import InMemoryStore
+
+
+class CountingStore(InMemoryStore):
+    """In-memory store that counts batch round trips, as a networked store would see them.
+
+    Args:
+        latency: Seconds to sleep per round trip, to simulate a network hop
+    """
+
+    def __init__(self, latency: float = 0.0, **kwargs):
+        super().__init__(**kwargs)
+        self.latency = latency
+        self.round_trips = 0
+        self.ops = 0
+
+    def reset_counters(self) -> None:
+        self.round_trips = 0
+        self.ops = 0
+
+    def batch(self, ops):
+        ops = list(ops)
+        self.round_trips += 1
+        self.ops += len(ops)
+        if self.latency:
+            time.sleep(self.latency)
+        return super().batch(ops)
+
+    async def abatch(self, ops):
+        ops = list(ops)
+        self.round_trips += 1
+        self.ops += len(ops)
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return await super().abatch(ops)
+
+
+# Arguments the fake model fills in when Trustcall asks for a tool call
+TOOL_ARGS = {
+    "ToDo": {"task": "Call mom", "time_to_complete": 15, "solutions": ["Call after dinner"]},
+    "Profile": {"name": "Sam", "location": "Boston"},
+}
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Scripted chat model that answers like gpt-4o would for the TaskMaistro graph, after a delay.
+
+    - Bound to UpdateMemory: asks for a memory update of `update_type`, then replies in text
+      once the update nodes have answered the tool calls. With parallel_tool_calls=False, it
+      asks for one update type per call, like the OpenAI API does.
+    - Bound to a Trustcall schema (ToDo, Profile): calls it with TOOL_ARGS.
+    - Without tools (update_instructions): replies in text.
+
+    Args:
+        latency: Seconds before the first token of each call
+        token_latency: Seconds per streamed chunk (a word, or a piece of tool-call arguments)
+        prompt_latency: Extra seconds before the first token per 1000 prompt characters, for prefill
+        update_type: Memory type requested through UpdateMemory, None to never update; several
+                     comma-separated types are requested as parallel tool calls
+        patch_existing: Answer Trustcall with an empty PatchDoc for each existing document, as a
+                        model does when the conversation changes nothing, instead of an insert
+        merge_instructions: Rewrite the instructions as the current ones plus the last user
+                            message, so that every rewrite builds on the one before
+
+    calls records the tool names bound for each call, and prompt_chars the prompt size sent so far.
+    With record_prompts, prompts keeps the messages of each call.
+    """
+
+    latency: float = 0.0
+    token_latency: float = 0.0
+    prompt_latency: float = 0.0
+    update_type: Optional[str] = "todo"
+    calls: list = []
+    prompt_chars: int = 0
+    record_prompts: bool = False
+    patch_existing: bool = False
+    merge_instructions: bool = False
+    prompts: list = []
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat-model"
+
+    def bind_tools(self, tools, *, tool_choice=None, **kwargs):
+        formatted = [convert_to_openai_tool(tool) for tool in tools]
+        if tool_choice is not None:
+            kwargs["tool_choice"] = tool_choice
+        return self.bind(tools=formatted, **kwargs)
+
+    def _prefill(self, messages: list[BaseMessage]) -> float:
+        return self.latency + self.prompt_latency * sum(len(str(m.content)) for m in messages) / 1000
+
+    def _respond(self, messages: list[BaseMessage], tools: Optional[list[dict]],
+                 parallel_tool_calls: bool = True) -> AIMessage:
+        tool_names = [tool["function"]["name"] for tool in tools or []]
+        self.calls.append(tool_names)
+        self.prompt_chars += sum(len(str(message.content)) for message in messages)
+        if self.record_prompts:
+            self.prompts.append(list(messages))
+        if "UpdateMemory" in tool_names:
+            # Update types still to request this turn: all at once, or one per cycle without parallel calls
+            answered = 0
+            for message in reversed(messages):
+                if isinstance(message, HumanMessage):
+                    break
+                answered += isinstance(message, ToolMessage)
+            pending = self.update_type.split(",")[answered:] if self.update_type else []
+            if pending and (not parallel_tool_calls or answered == 0):
+                return AIMessage(content="", tool_calls=[{
+                    "name": "UpdateMemory",
+                    "args": {"update_type": update_type},
+                    "id": f"call_{uuid.uuid4().hex[:12]}",
+                } for update_type in (pending if parallel_tool_calls else pending[:1])])
+            return AIMessage(content="Done, I have updated your ToDo list.")
+        existing = re.findall(r"<instance id=(\S+) ", str(messages[0].content)) if messages else []
+        if self.patch_existing and "PatchDoc" in tool_names and existing:
+            return AIMessage(content="", tool_calls=[{
+                "name": "PatchDoc",
+                "args": {"json_doc_id": doc_id, "planned_edits": "Nothing to change.", "patches": []},
+                "id": f"call_{uuid.uuid4().hex[:12]}",
+            } for doc_id in existing])
+        for name in tool_names:
+            if name in TOOL_ARGS:
+                return AIMessage(content="", tool_calls=[{
+                    "name": name,
+                    "args": dict(TOOL_ARGS[name]),
+                    "id": f"call_{uuid.uuid4().hex[:12]}",
+                }])
+        current = re.search(r"<current_instructions>\n(.*)\n</current_instructions>",
+                            str(messages[0].content), re.S) if messages else None
+        if self.merge_instructions and current:
+            last = next(m for m in reversed(messages[:-1]) if isinstance(m, HumanMessage))
+            existing = ast.literal_eval(current.group(1)).get("memory", "") if current.group(1) != "None" else ""
+            return AIMessage(content="\n".join(filter(None, [existing, f"- {last.content}"])))
+        return AIMessage(content="Always add a deadline to new ToDo items.")
+
+    @staticmethod
+    def _chunks(message: AIMessage) -> list[AIMessageChunk]:
+        """Split a reply into the chunks an OpenAI stream would deliver: words, or pieces of tool-call arguments."""
+        chunks = [AIMessageChunk(content=word) for word in re.findall(r"\S+\s*", message.content)]
+        for index, tool_call in enumerate(message.tool_calls):
+            args = json.dumps(tool_call["args"])
+            chunks.append(AIMessageChunk(content="", tool_call_chunks=[
+                {"name": tool_call["name"], "args": "", "id": tool_call["id"], "index": index}]))
+            chunks += [AIMessageChunk(content="", tool_call_chunks=[
+                {"name": None, "args": args[i:i + 8], "id": None, "index": index}])
+                for i in range(0, len(args), 8)]
+        return chunks or [AIMessageChunk(content="")]
+
+    def _generate(self, messages, stop=None, run_manager=None, tools=None,
+                  parallel_tool_calls=True, **kwargs: Any) -> ChatResult:
+        message = self._respond(messages, tools, parallel_tool_calls)
+        time.sleep(self._prefill(messages) + self.token_latency * len(self._chunks(message)))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, tools=None,
+                         parallel_tool_calls=True, **kwargs: Any) -> ChatResult:
+        message = self._respond(messages, tools, parallel_tool_calls)
+        await asyncio.sleep(self._prefill(messages) + self.token_latency * len(self._chunks(message)))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages, stop=None, run_manager=None, tools=None,
+                parallel_tool_calls=True, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        time.sleep(self._prefill(messages))
+        for chunk in self._chunks(self._respond(messages, tools, parallel_tool_calls)):
+            time.sleep(self.token_latency)
+            yield ChatGenerationChunk(message=chunk)
+
+    async def _astream(self, messages, stop=None, run_manager=None, tools=None,
+                       parallel_tool_calls=True, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        await asyncio.sleep(self._prefill(messages))
+        for chunk in self._chunks(self._respond(messages, tools, parallel_tool_calls)):
+            await asyncio.sleep(self.token_latency)
+            yield ChatGenerationChunk(message=chunk)
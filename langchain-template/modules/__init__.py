@@ -19,43 +19,69 @@ Key Features:
 - Modular architecture with clear separation of concerns
 """
 
+import importlib
+
 # Core Classes and Instances
-from .task_maistro import TaskMaistro, task_maistro, graph, model
+from .task_maistro import TaskMaistro
+# In this package, task_maistro names the default instance rather than the submodule; the instance,
+# graph and model are built on first access through __getattr__ below
+del task_maistro
 from .maistro_abstract import AbstractMaistro
 from .core_instance import (
     InstanceRegistry,
+    InstanceHandle,
     register_instance,
+    register_factory,
     get_instance,
+    get_handle,
     has_instance,
     safe_get_instance
 )
 
 # Schema Definitions
-from .maistro_schema import Profile, ToDo, UpdateMemory
+from .maistro_schema import Profile, ToDo, UpdateMemory, TaskMaistroState
 
 # Configuration
-from .configuration import Configuration
+from .configuration import Configuration, reload_env
+
+# Memory
+from .maistro_memory import MemorySnapshot, load_memory, aload_memory
+from .maistro_cache import MemorySnapshotCache, memory_cache, InstructionsCache, instructions_cache
+from .todo_index import TodoIndex, todo_indexes, load_index, retrieve_todos, aretrieve_todos
+from .maistro_prompt_builder import PromptBuilder, prompt_builder
+from .maistro_background import MemoryWriter, memory_writer
+from .maistro_locks import NamespaceLocks, namespace_locks
+from .maistro_persistence import Persistence, create_persistence
+from .maistro_sqlite_store import MaistroSqliteStore
+from .maistro_pool import MaistroModels, ModelPool, model_pool, maistro_models
 
 # Prompts
 from .maistro_prompt import (
     MODEL_SYSTEM_MESSAGE,
     TRUSTCALL_INSTRUCTION,
-    CREATE_INSTRUCTIONS
+    CREATE_INSTRUCTIONS,
+    CONFIRM_UPDATE_MESSAGE,
+    prompt_time
 )
 
 # Utility Functions
 from .utils_tool import extract_tool_info
+from .utils_todo import select_todos
+from .utils_token import approx_tokens
+from .utils_store import plan_writes, apply_writes, aapply_writes
 from .utils_spy import Spy
 
 # Debug and Development
-from .debug_langgraph import set_debug_mode
+from .debug_langgraph import set_debug_mode, debug_stats
 
 # Node Components (from node_maistro subpackage)
-from .node_maistro.node_task_mAIstro import task_mAIstro
-from .node_maistro.node_update_todos import update_todos
-from .node_maistro.node_update_profile import update_profile
-from .node_maistro.node_instructions import update_instructions
-from .node_maistro.cedge_route_message import route_message
+from .node_maistro.node_manage_history import manage_history, amanage_history
+from .node_maistro.node_task_mAIstro import task_mAIstro, atask_mAIstro
+from .node_maistro.node_update_todos import update_todos, aupdate_todos
+from .node_maistro.node_update_profile import update_profile, aupdate_profile
+from .node_maistro.node_instructions import update_instructions, aupdate_instructions
+from .node_maistro.node_confirm_update import confirm_update, aconfirm_update
+from .node_maistro.cedge_route_message import route_message, aroute_message, route_update
 
 __all__ = [
     # Main Classes
@@ -69,8 +95,11 @@ __all__ = [
 
     # Core Registry
     'InstanceRegistry',
+    'InstanceHandle',
     'register_instance',
+    'register_factory',
     'get_instance',
+    'get_handle',
     'has_instance',
     'safe_get_instance',
 
@@ -78,40 +107,107 @@ __all__ = [
     'Profile',
     'ToDo',
     'UpdateMemory',
+    'TaskMaistroState',
 
     # Configuration
     'Configuration',
+    'reload_env',
+
+    # Memory
+    'MemorySnapshot',
+    'load_memory',
+    'aload_memory',
+    'MemorySnapshotCache',
+    'memory_cache',
+    'InstructionsCache',
+    'instructions_cache',
+    'TodoIndex',
+    'todo_indexes',
+    'load_index',
+    'retrieve_todos',
+    'aretrieve_todos',
+    'PromptBuilder',
+    'prompt_builder',
+    'MemoryWriter',
+    'memory_writer',
+    'NamespaceLocks',
+    'namespace_locks',
+    'Persistence',
+    'create_persistence',
+    'MaistroSqliteStore',
+    'MaistroModels',
+    'ModelPool',
+    'model_pool',
+    'maistro_models',
 
     # Prompts
     'MODEL_SYSTEM_MESSAGE',
     'TRUSTCALL_INSTRUCTION',
     'CREATE_INSTRUCTIONS',
+    'CONFIRM_UPDATE_MESSAGE',
+    'prompt_time',
 
     # Utilities
     'extract_tool_info',
+    'select_todos',
+    'approx_tokens',
+    'plan_writes',
+    'apply_writes',
+    'aapply_writes',
     'Spy',
 
     # Debug
     'set_debug_mode',
+    'debug_stats',
 
     # Nodes
+    'manage_history',
     'task_mAIstro',
     'update_todos',
     'update_profile',
     'update_instructions',
     'route_message',
+    'route_update',
+    'confirm_update',
+    'amanage_history',
+    'atask_mAIstro',
+    'aupdate_todos',
+    'aupdate_profile',
+    'aupdate_instructions',
+    'aconfirm_update',
+    'aroute_message',
 ]
 
+
+def __getattr__(name: str):
+    """Lazily resolve the default task_maistro instance, graph and model"""
+    if name in ("task_maistro", "graph", "model"):
+        return getattr(importlib.import_module(".task_maistro", __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 # Module Descriptions
 __module_descriptions__ = {
     'task_maistro': 'Main TaskMaistro class that orchestrates the chatbot workflow',
     'maistro_abstract': 'Abstract base classes defining the Maistro interface',
     'core_instance': 'Instance registry for dependency injection and service management',
-    'maistro_schema': 'Pydantic models for structured data (Profile, ToDo, UpdateMemory)',
+    'maistro_schema': 'Pydantic models for structured data (Profile, ToDo, UpdateMemory) and the graph state',
     'configuration': 'Configuration management for customizable chatbot behavior',
+    'maistro_memory': 'Batched loading of the user profile, todos and instructions into a memory snapshot',
+    'maistro_cache': 'Per-user LRU cache of memory snapshots with TTL and write-through invalidation, and content-addressed cache of instruction rewrites',
+    'maistro_background': 'Per-user ordered worker pool that runs memory writes off the response path',
+    'todo_index': 'Local vector index of each user\'s todos for semantic retrieval',
+    'maistro_locks': 'Per-namespace locks that serialize concurrent memory writes of the same user',
+    'maistro_persistence': 'Store and checkpointer backends (memory, SQLite in WAL mode, pooled Postgres) for TaskMaistro',
+    'maistro_sqlite_store': 'SQLite store indexed on the (memory_type, todo_category, user_id) namespace columns',
+    'maistro_pool': 'LRU pool of model clients, bound tools and extractors per configured model and temperature',
+    'maistro_prompt_builder': 'Token-budgeted task_mAIstro prompt assembly with per-user caching of static sections',
     'maistro_prompt': 'System prompts and instructions for the chatbot',
     'utils_tool': 'Utility functions for extracting information from tool calls',
     'utils_spy': 'Debug utilities for function monitoring',
+    'utils_todo': 'Filtering and ranking of the todos sent to the model',
+    'utils_token': 'Approximate token counts for prompt and history budgets',
+    'utils_store': 'Write planning that skips unchanged Trustcall documents and batches the rest',
     'debug_langgraph': 'Debug utilities for LangGraph workflow inspection',
     'debug_langgraph_example': 'Example debug implementations',
     'node_maistro': 'LangGraph nodes for processing user interactions and updating memory',
@@ -1,29 +1,162 @@
+import logging
 import os
 from dataclasses import dataclass, field, fields
-from typing import Any, Optional
+from typing import Any, Dict, Optional, Tuple
 
 from langchain_core.runnables import RunnableConfig
 from typing_extensions import Annotated
 from dataclasses import dataclass
 
-@dataclass(kw_only=True)
+logger = logging.getLogger(__name__)
+
+# Prefix of the environment variables that override the fields, e.g. TASK_MAISTRO_MODEL
+ENV_PREFIX = "TASK_MAISTRO_"
+
+# Number of distinct configurables whose resolved Configuration is kept
+RESOLVED_CACHE_MAXSIZE = 1024
+
+# Configurable key under which a caller can pass a Configuration it has already resolved
+RESOLVED_CONFIGURATION_KEY = "maistro_configuration"
+
+
+# Frozen, so that one resolved instance can be shared by every node and run with the same settings
+@dataclass(kw_only=True, frozen=True)
 class Configuration:
     """The configurable fields for the chatbot."""
     user_id: str = "default-user"
     todo_category: str = "general" 
     task_maistro_role: str = "You are a helpful task management assistant. You help you create, organize, and manage the user's ToDo list."
+    # OpenAI model and temperature of the run, served from maistro_pool.model_pool; an empty
+    # model uses the model of the TaskMaistro that built the graph
+    model: str = ""
+    temperature: float = 0.0
+    # ToDo selection: how many todos are loaded, and which of them are sent to the model
+    todo_fetch_limit: int = 1000
+    max_todos_in_context: int = 25
+    include_done_todos: bool = False
+    rank_todos_by_similarity: bool = False
+    # Retrieve this many todos through the local vector index first (0 disables it)
+    semantic_todo_top_k: int = 0
+    # Who replies after a memory update. "template" (the default) ends the turn in confirm_update
+    # with a fixed reply, saving the model call of the reply. "agent" goes back to task_mAIstro
+    # with the full prompt, and "confirm" ends the turn with one short confirm_update model call:
+    # both make as many model calls, "confirm" only sends a smaller prompt
+    update_reply: str = "template"
+    # "sync" runs the memory extraction before replying, "background" queues it to the
+    # maistro_background.memory_writer and replies right away
+    memory_writes: str = "sync"
+    # Approximate token budget of the chat history (0 disables trimming). Once it is exceeded,
+    # the oldest turns are removed down to half the budget and, with summarize_history, folded
+    # into a rolling summary
+    history_token_budget: int = 0
+    summarize_history: bool = True
+    # Approximate token budget of the whole task_mAIstro prompt, split across its sections by
+    # maistro_prompt_builder (0 sends every section and the full history as they are)
+    prompt_token_budget: int = 0
+    # Reuse the instructions rewrite cached by maistro_cache.instructions_cache when the user's
+    # current instructions and latest turn are the same as for an earlier rewrite
+    cache_instructions: bool = True
 
     @classmethod
     def from_runnable_config(
         cls, config: Optional[RunnableConfig] = None
     ) -> "Configuration":
-        """Create a Configuration instance from a RunnableConfig."""
+        """Create a Configuration instance from a RunnableConfig.
+
+        Environment variables (the upper-cased field names prefixed with TASK_MAISTRO_, e.g.
+        TASK_MAISTRO_MODEL, read once by reload_env()) take precedence over the configurable.
+        The result is memoized on the configurable's values, so the nodes of a run, and runs
+        with the same settings, share one instance.
+        """
         configurable = (
             config["configurable"] if config and "configurable" in config else {}
         )
+        resolved = configurable.get(RESOLVED_CONFIGURATION_KEY)
+        if isinstance(resolved, cls):
+            return resolved
+
+        names = _field_names(cls)
+        key = (cls, _env_version, tuple(configurable.get(name) for name in names))
+        try:
+            cached = _resolved.get(key)
+        except TypeError:
+            # An unhashable value: resolve without the cache
+            return cls._resolve(configurable)
+        if cached is None:
+            if len(_resolved) >= RESOLVED_CACHE_MAXSIZE:
+                _resolved.clear()
+            cached = _resolved[key] = cls._resolve(configurable)
+        return cached
+
+    @classmethod
+    def _resolve(cls, configurable: dict) -> "Configuration":
+        types = {f.name: f.type for f in fields(cls) if f.init}
         values: dict[str, Any] = {
-            f.name: os.environ.get(f.name.upper(), configurable.get(f.name))
-            for f in fields(cls)
-            if f.init
+            name: _coerce(configurable.get(name), field_type) for name, field_type in types.items()
         }
-        return cls(**{k: v for k, v in values.items() if v})
\ No newline at end of file
+        values.update({name: value for name, value in _env.items() if name in types})
+        return cls(**{k: v for k, v in values.items() if v is not None and v != ""})
+
+    @classmethod
+    def into_runnable_config(cls, config: Optional[RunnableConfig] = None) -> RunnableConfig:
+        """Return a copy of the config carrying its resolved Configuration, for callers that reuse it across runs."""
+        config = dict(config or {})
+        configurable = dict(config.get("configurable") or {})
+        configurable[RESOLVED_CONFIGURATION_KEY] = cls.from_runnable_config({"configurable": configurable})
+        config["configurable"] = configurable
+        return config
+
+
+# Environment overrides read by reload_env(), and the resolved instances they were applied to
+_env: Dict[str, Any] = {}
+_env_version = 0
+_resolved: Dict[Tuple, Configuration] = {}
+_names: Dict[type, Tuple[str, ...]] = {}
+
+
+def _field_names(cls: type) -> Tuple[str, ...]:
+    names = _names.get(cls)
+    if names is None:
+        names = _names[cls] = tuple(f.name for f in fields(cls) if f.init)
+    return names
+
+
+def env_name(name: str) -> str:
+    """Environment variable that overrides a field."""
+    return ENV_PREFIX + name.upper()
+
+
+def reload_env() -> None:
+    """
+    Read the environment overrides again, e.g. after changing os.environ in a running process.
+
+    A value that does not convert to its field's type is logged and ignored, so that the field
+    keeps its configurable or default value.
+    """
+    global _env, _env_version
+    env = {}
+    for f in fields(Configuration):
+        name = env_name(f.name)
+        if not f.init or name not in os.environ:
+            continue
+        try:
+            env[f.name] = _coerce(os.environ[name], f.type)
+        except ValueError:
+            logger.error(f"Ignoring {name}={os.environ[name]!r}: not a valid {f.type.__name__}")
+    _env = env
+    _env_version += 1
+    _resolved.clear()
+
+
+def _coerce(value: Any, field_type: Any) -> Any:
+    """Convert string values from the environment or an API request to the field's type."""
+    if not isinstance(value, str) or field_type is str:
+        return value
+    if field_type is bool:
+        return value.strip().lower() in ("1", "true", "yes", "on")
+    if field_type in (int, float):
+        return field_type(value)
+    return value
+
+
+reload_env()
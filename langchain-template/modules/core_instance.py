@@ -4,290 +4,214 @@ Core module for instance registry: used to register and get instances of modules
 
 import logging
 import inspect
-from typing import Dict, Any, Optional
+import os
+import threading
+from typing import Dict, Any, Callable, Generic, Optional, Type, TypeVar
 
 # Configure logging
 logging.basicConfig(level=logging.ERROR)
 logger = logging.getLogger(__name__)
 
+# Set DEBUG_INSTANCE_REGISTRY=true to log the calling module and function of failed lookups.
+# Caller introspection is slow, so it is off by default.
+DEBUG_INSTANCE_REGISTRY = os.environ.get(
+    "DEBUG_INSTANCE_REGISTRY", "False").lower() == "true"
+
+T = TypeVar("T")
+
+# Sentinel for "no instance registered", since None is a valid instance
+_MISSING: Any = object()
+
+
+def _caller() -> str:
+    """Describe the first caller outside this module, only when registry debugging is enabled."""
+    if not DEBUG_INSTANCE_REGISTRY:
+        return ""
+    frame = inspect.currentframe()
+    while frame is not None and frame.f_globals.get("__name__") == __name__:
+        frame = frame.f_back
+    if frame is None:
+        return " - Requested by unknown.unknown"
+    module = inspect.getmodule(frame)
+    return f" - Requested by {module.__name__ if module else 'unknown'}.{frame.f_code.co_name}"
+
+
+class InstanceHandle(Generic[T]):
+    """
+    Typed reference to a registry key.
+
+    A handle is resolved once, e.g. at import or graph-build time, and the registry keeps it
+    pointing at the instance currently registered under its key, so calling it is a single
+    attribute read.
+    """
+
+    __slots__ = ("key", "_instance")
+
+    def __init__(self, key: str, instance: Any = _MISSING):
+        self.key = key
+        self._instance = instance
+
+    def __call__(self) -> T:
+        """Return the registered instance"""
+        instance = self._instance
+        if instance is _MISSING:
+            return InstanceRegistry.get(self.key)
+        return instance
+
+    get = __call__
+
+    def is_bound(self) -> bool:
+        """Check if an instance is currently registered under the handle's key"""
+        return self._instance is not _MISSING
+
+    def __repr__(self) -> str:
+        return f"InstanceHandle({self.key!r}, bound={self.is_bound()})"
+
 
 class InstanceRegistry:
+    # Reads are plain dict lookups without locking; writers take _lock so that concurrent
+    # register/unregister calls keep _instances and the handles consistent
     _instances: Dict[str, Any] = {}
+    _factories: Dict[str, Callable[[], Any]] = {}
+    _handles: Dict[str, InstanceHandle] = {}
+    _lock = threading.RLock()
+    # Per-key locks of the factories being run, so that a slow factory never holds _lock
+    _build_locks: Dict[str, threading.Lock] = {}
 
     @classmethod
     def register(cls, key: str, instance: Any) -> None:
         """Register an instance with a string key"""
-        try:
+        with cls._lock:
             cls._instances[key] = instance
+            handle = cls._handles.get(key)
+            if handle is not None:
+                handle._instance = instance
 
-        except Exception as e:
-            # Get caller information
-            caller_frame = inspect.currentframe().f_back
-            caller_module = "unknown"
-            caller_function = "unknown"
-
-            if caller_frame:
-                module = inspect.getmodule(caller_frame)
-                if module:
-                    caller_module = module.__name__
-                caller_function = caller_frame.f_code.co_name
-
-            logger.error(
-                f"Failed to register instance '{key}' from {caller_module}.{caller_function}: {str(e)}")
-            raise
+    @classmethod
+    def register_factory(cls, key: str, factory: Callable[[], Any]) -> None:
+        """Register a factory that builds the instance for a key on first get()"""
+        with cls._lock:
+            cls._factories[key] = factory
 
     @classmethod
     def get(cls, key: str) -> Any:
         """Get an instance by key"""
-        try:
-            if key not in cls._instances:
-                error_msg = f"Instance with key '{key}' not found in registry"
-                # Get caller information
-                caller_frame = inspect.currentframe().f_back
-                caller_module = "unknown"
-                caller_function = "unknown"
-
-                if caller_frame:
-                    module = inspect.getmodule(caller_frame)
-                    if module:
-                        caller_module = module.__name__
-                    caller_function = caller_frame.f_code.co_name
-
-                logger.error(
-                    f"{error_msg} - Requested by {caller_module}.{caller_function}")
-                raise KeyError(error_msg)
-
-            return cls._instances[key]
-
-        except Exception as e:
-            # Get caller information
-            caller_frame = inspect.currentframe().f_back
-            caller_module = "unknown"
-            caller_function = "unknown"
-
-            if caller_frame:
-                module = inspect.getmodule(caller_frame)
-                if module:
-                    caller_module = module.__name__
-                caller_function = caller_frame.f_code.co_name
-
-            logger.error(
-                f"Failed to get instance '{key}' from {caller_module}.{caller_function}: {str(e)}")
-            raise
+        instance = cls._instances.get(key, _MISSING)
+        if instance is not _MISSING:
+            return instance
+        if key in cls._factories:
+            return cls._build(key)
+        error_msg = f"Instance with key '{key}' not found in registry"
+        logger.error(f"{error_msg}{_caller()}")
+        raise KeyError(error_msg)
 
     @classmethod
-    def has(cls, key: str) -> bool:
-        """Check if an instance exists with the given key"""
-        try:
-            return key in cls._instances
+    def _build(cls, key: str) -> Any:
+        """
+        Build and register an instance from its factory, once even under concurrent gets.
+
+        The factory runs under a lock of its key only, so that registering, looking up or
+        building other keys does not wait for it; its exceptions propagate to the caller.
+        """
+        with cls._lock:
+            build_lock = cls._build_locks.setdefault(key, threading.Lock())
+        with build_lock:
+            instance = cls._instances.get(key, _MISSING)
+            if instance is _MISSING:
+                instance = cls._factories[key]()
+                with cls._lock:
+                    # An instance registered while the factory ran wins over the built one
+                    instance = cls._instances.get(key, instance)
+                    cls.register(key, instance)
+            return instance
 
-        except Exception as e:
-            # Get caller information
-            caller_frame = inspect.currentframe().f_back
-            caller_module = "unknown"
-            caller_function = "unknown"
-
-            if caller_frame:
-                module = inspect.getmodule(caller_frame)
-                if module:
-                    caller_module = module.__name__
-                caller_function = caller_frame.f_code.co_name
+    @classmethod
+    def handle(cls, key: str, instance_type: Optional[Type[T]] = None) -> InstanceHandle[T]:
+        """Get the handle for a key; the instance does not have to be registered yet"""
+        handle = cls._handles.get(key)
+        if handle is None:
+            with cls._lock:
+                handle = cls._handles.get(key)
+                if handle is None:
+                    handle = InstanceHandle(key, cls._instances.get(key, _MISSING))
+                    cls._handles[key] = handle
+        return handle
 
-            logger.error(
-                f"Failed to check instance '{key}' existence from {caller_module}.{caller_function}: {str(e)}")
-            raise
+    @classmethod
+    def has(cls, key: str) -> bool:
+        """Check if an instance exists, or can be built, with the given key"""
+        return key in cls._instances or key in cls._factories
 
     @classmethod
     def unregister(cls, key: str) -> None:
         """Remove an instance from the registry"""
-        try:
-            if key in cls._instances:
-                del cls._instances[key]
-
-        except Exception as e:
-            # Get caller information
-            caller_frame = inspect.currentframe().f_back
-            caller_module = "unknown"
-            caller_function = "unknown"
-
-            if caller_frame:
-                module = inspect.getmodule(caller_frame)
-                if module:
-                    caller_module = module.__name__
-                caller_function = caller_frame.f_code.co_name
-
-            logger.error(
-                f"Failed to unregister instance '{key}' from {caller_module}.{caller_function}: {str(e)}")
-            raise
+        with cls._lock:
+            cls._instances.pop(key, None)
+            handle = cls._handles.get(key)
+            if handle is not None:
+                handle._instance = _MISSING
 
     @classmethod
     def clear(cls) -> None:
         """Clear all registered instances"""
-        try:
+        with cls._lock:
             cls._instances.clear()
-
-        except Exception as e:
-            # Get caller information
-            caller_frame = inspect.currentframe().f_back
-            caller_module = "unknown"
-            caller_function = "unknown"
-
-            if caller_frame:
-                module = inspect.getmodule(caller_frame)
-                if module:
-                    caller_module = module.__name__
-                caller_function = caller_frame.f_code.co_name
-
-            logger.error(
-                f"Failed to clear registry from {caller_module}.{caller_function}: {str(e)}")
-            raise
+            for handle in cls._handles.values():
+                handle._instance = _MISSING
 
     @classmethod
     def list_keys(cls) -> list:
         """Get list of all registered keys"""
-        try:
+        with cls._lock:
             return list(cls._instances.keys())
 
-        except Exception as e:
-            # Get caller information
-            caller_frame = inspect.currentframe().f_back
-            caller_module = "unknown"
-            caller_function = "unknown"
-
-            if caller_frame:
-                module = inspect.getmodule(caller_frame)
-                if module:
-                    caller_module = module.__name__
-                caller_function = caller_frame.f_code.co_name
-
-            logger.error(
-                f"Failed to list registry keys from {caller_module}.{caller_function}: {str(e)}")
-            raise
-
     @classmethod
     def get_all(cls) -> Dict[str, Any]:
         """Get all registered instances"""
-        try:
+        with cls._lock:
             return cls._instances.copy()
 
-        except Exception as e:
-            # Get caller information
-            caller_frame = inspect.currentframe().f_back
-            caller_module = "unknown"
-            caller_function = "unknown"
-
-            if caller_frame:
-                module = inspect.getmodule(caller_frame)
-                if module:
-                    caller_module = module.__name__
-                caller_function = caller_frame.f_code.co_name
-
-            logger.error(
-                f"Failed to get all registry instances from {caller_module}.{caller_function}: {str(e)}")
-            raise
-
 
 # Convenience functions with error-only logging
 
 def register_instance(key: str, instance: Any) -> None:
     """Register an instance with a key"""
-    try:
-        InstanceRegistry.register(key, instance)
-
-    except Exception as e:
-        # Get caller information
-        caller_frame = inspect.currentframe().f_back
-        caller_module = "unknown"
-        caller_function = "unknown"
+    InstanceRegistry.register(key, instance)
 
-        if caller_frame:
-            module = inspect.getmodule(caller_frame)
-            if module:
-                caller_module = module.__name__
-            caller_function = caller_frame.f_code.co_name
 
-        logger.error(
-            f"Failed to register instance '{key}' via convenience function from {caller_module}.{caller_function}: {str(e)}")
-        raise
+def register_factory(key: str, factory: Callable[[], Any]) -> None:
+    """Register a factory that builds the instance for a key on first use"""
+    InstanceRegistry.register_factory(key, factory)
 
 
 def get_instance(key: str) -> Any:
     """Get an instance by key"""
-    try:
-        return InstanceRegistry.get(key)
+    return InstanceRegistry.get(key)
 
-    except Exception as e:
-        # Get caller information
-        caller_frame = inspect.currentframe().f_back
-        caller_module = "unknown"
-        caller_function = "unknown"
 
-        if caller_frame:
-            module = inspect.getmodule(caller_frame)
-            if module:
-                caller_module = module.__name__
-            caller_function = caller_frame.f_code.co_name
-
-        logger.error(
-            f"Failed to get instance '{key}' via convenience function from {caller_module}.{caller_function}: {str(e)}")
-        raise
+def get_handle(key: str, instance_type: Optional[Type[T]] = None) -> InstanceHandle[T]:
+    """Get a handle that resolves to the instance registered with a key"""
+    return InstanceRegistry.handle(key, instance_type)
 
 
 def has_instance(key: str) -> bool:
     """Check if an instance exists"""
-    try:
-        return InstanceRegistry.has(key)
-
-    except Exception as e:
-        # Get caller information
-        caller_frame = inspect.currentframe().f_back
-        caller_module = "unknown"
-        caller_function = "unknown"
-
-        if caller_frame:
-            module = inspect.getmodule(caller_frame)
-            if module:
-                caller_module = module.__name__
-            caller_function = caller_frame.f_code.co_name
-
-        logger.error(
-            f"Failed to check instance '{key}' existence via convenience function from {caller_module}.{caller_function}: {str(e)}")
-        raise
+    return InstanceRegistry.has(key)
 
 
 # Additional utility function with error-only logging
 def safe_get_instance(key: str, default=None):
-    """Safely get an instance with a default value"""
-    try:
-        return get_instance(key)
-
-    except KeyError:
-        # Get caller information
-        caller_frame = inspect.currentframe().f_back
-        caller_module = "unknown"
-        caller_function = "unknown"
-
-        if caller_frame:
-            module = inspect.getmodule(caller_frame)
-            if module:
-                caller_module = module.__name__
-            caller_function = caller_frame.f_code.co_name
-
-        logger.error(
-            f"Instance '{key}' not found, using default value for {caller_module}.{caller_function}")
-        return default
-    except Exception as e:
-        # Get caller information
-        caller_frame = inspect.currentframe().f_back
-        caller_module = "unknown"
-        caller_function = "unknown"
-
-        if caller_frame:
-            module = inspect.getmodule(caller_frame)
-            if module:
-                caller_module = module.__name__
-            caller_function = caller_frame.f_code.co_name
-
-        logger.error(
-            f"Unexpected error getting instance '{key}' from {caller_module}.{caller_function}: {str(e)}")
-        return default
+    """Safely get an instance with a default value, also when its factory fails"""
+    instance = InstanceRegistry._instances.get(key, _MISSING)
+    if instance is not _MISSING:
+        return instance
+    if key in InstanceRegistry._factories:
+        try:
+            return InstanceRegistry._build(key)
+        except Exception:
+            logger.exception(
+                f"Factory of instance '{key}' failed, using default value{_caller()}")
+            return default
+    logger.error(
+        f"Instance '{key}' not found, using default value{_caller()}")
+    return default
@@ -3,11 +3,23 @@ Debug Logger Module
 
 This module provides utilities for safely serializing and logging LangChain objects
 and other complex data structures for debugging purposes.
+
+Debug records go through the standard logging module and are lazy: a record holds a
+reference to the data, which is only serialized when a handler emits it. Records are
+handed to a background QueueListener, so serialization and stdout I/O happen off the
+graph's worker threads, and a disabled logger costs a single flag check per call.
+Because serialization is deferred, a record shows the data as it is when emitted,
+which may include changes made after the debug call.
 """
 
+import atexit
 import json
+import logging
+import logging.handlers
 import os
-from typing import Any, Dict, Optional
+import queue
+import sys
+from typing import Any, Callable, Dict, Optional
 
 # Handle common LangChain message types
 try:
@@ -19,88 +31,246 @@ except ImportError:
 DEBUG_LANGGRAPH_MESSAGES = os.environ.get(
     "DEBUG_LANGGRAPH_MESSAGES", "False").lower() == "true"
 
+# Lowest level that is emitted once debug mode is enabled (DEBUG, INFO, ...)
+DEBUG_LANGGRAPH_LEVEL = logging.getLevelName(
+    os.environ.get("DEBUG_LANGGRAPH_LEVEL", "DEBUG").upper())
+
+logger = logging.getLogger(__name__)
+logger.propagate = False
+logger.setLevel(logging.CRITICAL + 1)
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+# Limits applied by safe_serialize_message()
+SERIALIZE_MAX_DEPTH = 32
+SERIALIZE_MAX_ITEMS = 1000
+SERIALIZE_MAX_STRING = 4000
+SERIALIZE_MAX_NODES = 100_000
+
+_PRIMITIVES = (bool, int, float, type(None))
 
-def safe_serialize_message(msg: Any) -> Any:
+
+def _truncate(text: str, max_string: int) -> str:
+    if len(text) <= max_string:
+        return text
+    return f"{text[:max_string]}... <truncated {len(text) - max_string} chars>"
+
+
+def safe_serialize_message(msg: Any,
+                           max_depth: int = SERIALIZE_MAX_DEPTH,
+                           max_items: int = SERIALIZE_MAX_ITEMS,
+                           max_string: int = SERIALIZE_MAX_STRING,
+                           max_nodes: int = SERIALIZE_MAX_NODES) -> Any:
     """
     Safely serialize messages and objects for JSON printing.
 
     This function handles various types of objects including:
+    - LangChain message objects (type, content and tool call fields only)
     - Pydantic models (v1 and v2)
-    - LangChain message objects
-    - Lists and dictionaries
+    - Lists, tuples, sets and dictionaries
     - Exceptions
     - Objects with __dict__ attribute
 
+    The walk is iterative, so deep structures cannot hit the recursion limit. Objects are
+    memoized by identity: a shared sub-object is serialized once, and a reference back to an
+    object still being serialized becomes a "<cycle: ...>" marker. Output size is bounded by
+    the limits below, with markers where anything was cut.
+
     Args:
         msg: The message or object to serialize
+        max_depth: Nesting depth below which objects are replaced by a marker
+        max_items: Maximum number of items kept per list or dict
+        max_string: Maximum length of a string, including message contents
+        max_nodes: Maximum number of objects serialized in total
 
     Returns:
         Serialized representation of the message
     """
+    memo: Dict[int, Any] = {}
+    in_progress: set = set()
+    # Keep every visited object alive so that its id() cannot be reused during the walk
+    visited: list = []
+    nodes = 0
+    root: list = [None]
+
+    # Work items are (obj, depth, target container, target key); a None obj with an id in the
+    # depth slot marks the end of that object's children
+    stack: list = [(msg, 0, root, 0)]
+    while stack:
+        obj, depth, target, slot = stack.pop()
+        if target is None:
+            in_progress.discard(depth)
+            continue
+
+        if isinstance(obj, str):
+            target[slot] = _truncate(obj, max_string)
+            continue
+        if isinstance(obj, _PRIMITIVES):
+            target[slot] = obj
+            continue
+
+        obj_id = id(obj)
+        if obj_id in in_progress:
+            target[slot] = f"<cycle: {type(obj).__name__}>"
+            continue
+        if obj_id in memo:
+            target[slot] = memo[obj_id]
+            continue
+        if depth >= max_depth:
+            target[slot] = f"<max depth: {type(obj).__name__}>"
+            continue
+        nodes += 1
+        if nodes > max_nodes:
+            target[slot] = "<truncated: max nodes reached>"
+            continue
+
+        # Pick the fields to serialize: a dict of children, a list of children, or a final value
+        children: Any = None
+        if BaseMessage and isinstance(obj, BaseMessage):
+            children = {"type": type(obj).__name__, "content": obj.content}
+            if getattr(obj, "tool_calls", None):
+                children["tool_calls"] = obj.tool_calls
+            if getattr(obj, "tool_call_id", None):
+                children["tool_call_id"] = obj.tool_call_id
+        elif isinstance(obj, Exception):
+            result: Any = {"error_type": type(obj).__name__, "error_message": _truncate(str(obj), max_string)}
+        elif isinstance(obj, dict):
+            children = obj
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            children = list(obj)
+        elif hasattr(type(obj), "model_fields"):
+            # Pydantic v2 models
+            children = {name: getattr(obj, name, None) for name in type(obj).model_fields}
+        elif callable(getattr(obj, "dict", None)):
+            # Pydantic v1 models and other objects that describe themselves as a dict
+            children = obj.dict()
+        elif hasattr(obj, "__dict__"):
+            children = vars(obj)
+        else:
+            result = _truncate(str(obj), max_string)
+
+        if children is None:
+            target[slot] = result
+            continue
+
+        visited.append(obj)
+        if isinstance(children, dict):
+            items = list(children.items())
+            out: Any = {str(k): None for k, _ in items[:max_items]}
+            if len(items) > max_items:
+                out["..."] = f"<truncated {len(items) - max_items} keys>"
+            entries = [(str(k), v) for k, v in items[:max_items]]
+        else:
+            out = [None] * min(len(children), max_items)
+            if len(children) > max_items:
+                out.append(f"<truncated {len(children) - max_items} items>")
+            entries = list(enumerate(children[:max_items]))
+
+        target[slot] = memo[obj_id] = out
+        in_progress.add(obj_id)
+        stack.append((None, obj_id, None, None))
+        for key, value in reversed(entries):
+            stack.append((value, depth + 1, out, key))
+
+    return root[0]
+
+
+class LazySerialized:
+    """
+    Log message that serializes its data only when it is rendered.
+
+    Args:
+        label: Label of the data being debugged
+        data: Data to serialize
+        indent: JSON indentation level
+        ensure_ascii: Whether to ensure ASCII output
+    """
+
+    __slots__ = ("label", "data", "indent", "ensure_ascii")
+
+    def __init__(self, label: str, data: Any, indent: int = 2, ensure_ascii: bool = False):
+        self.label = label
+        self.data = data
+        self.indent = indent
+        self.ensure_ascii = ensure_ascii
+
+    def __str__(self) -> str:
+        serialized_data = json.dumps(safe_serialize_message(self.data), indent=self.indent,
+                                     ensure_ascii=self.ensure_ascii, default=str)
+        return f'\n\n---- {self.label} ----\n\n{serialized_data}\n\n'
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that enqueues records unformatted, so the listener thread does the serialization."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def _start_listener(stream=None) -> None:
+    """Route the debug logger through a queue to a stdout handler running on a background thread."""
+    global _listener
+    if _listener is not None:
+        return
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    stream_handler = logging.StreamHandler(stream or sys.stdout)
+    stream_handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(DeferredQueueHandler(log_queue))
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler)
+    _listener.start()
+
+
+def _stop_listener() -> None:
+    """Flush pending records and stop the background listener."""
+    global _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    _listener = None
+    for handler in list(logger.handlers):
+        if isinstance(handler, DeferredQueueHandler):
+            logger.removeHandler(handler)
+
+
+atexit.register(_stop_listener)
 
-    # Handle Pydantic v2 and v1 models
-    if hasattr(msg, "model_dump"):
-        return msg.model_dump()
-    elif hasattr(msg, "dict"):
-        return msg.dict()
-    # Handle list of messages recursively
-    elif isinstance(msg, list):
-        return [safe_serialize_message(m) for m in msg]
-    # Handle dicts, but recursively serialize values
-    elif isinstance(msg, dict):
-        return {k: safe_serialize_message(v) for k, v in msg.items()}
-    # Handle common error types
-    elif isinstance(msg, Exception):
-        return {"error_type": type(msg).__name__, "error_message": str(msg)}
-    # Handle objects with __dict__ attribute
-    elif hasattr(msg, "__dict__"):
-        return {k: safe_serialize_message(v) for k, v in msg.__dict__.items()}
-    # Handle LangChain message objects
-    if AIMessage and isinstance(msg, AIMessage):
-        return {"type": "AIMessage", "content": msg.content}
-    elif HumanMessage and isinstance(msg, HumanMessage):
-        return {"type": "HumanMessage", "content": msg.content}
-    elif SystemMessage and isinstance(msg, SystemMessage):
-        return {"type": "SystemMessage", "content": msg.content}
-    elif BaseMessage and isinstance(msg, BaseMessage):
-        # fallback for other message types
-        return {"type": msg.__class__.__name__, "content": getattr(msg, "content", str(msg))}
-    # Fallback to string
-    return str(msg)
-
-
-def serialized_print(label: str, data: Dict[str, Any], indent: int = 2, ensure_ascii: bool = False) -> None:
-    """
-    Print serialized data with function name prefix for debugging.
+
+def serialized_print(label: str, data: Any, indent: int = 2, ensure_ascii: bool = False,
+                     level: int = logging.DEBUG) -> None:
+    """
+    Log serialized data with function name prefix for debugging.
 
     Args:
         label: Label of the data being debugged
-        data: Dictionary of data to serialize and print
+        data: Data to serialize and print, serialized only if the record is emitted
         indent: JSON indentation level (default: 2)
         ensure_ascii: Whether to ensure ASCII output (default: False)
+        level: Logging level of the record (default: DEBUG)
     """
-    if not DEBUG_LANGGRAPH_MESSAGES:
+    if not DEBUG_LANGGRAPH_MESSAGES or not logger.isEnabledFor(level):
         return
 
-    # Serialize the data
-    serialized_data = safe_serialize_message(data)
-
-    # Print with function name prefix
-    print(f'\n\n---- {label} ----\n\n')
-    # print(serialized_data, '\n\n', sep='')
-    print(json.dumps(serialized_data, indent=indent,
-                     ensure_ascii=ensure_ascii), '\n\n', sep='')
+    logger.log(level, LazySerialized(label, data, indent, ensure_ascii))
 
 
-def set_debug_mode(enabled: bool) -> None:
+def set_debug_mode(enabled: bool, level: Optional[int] = None, stream=None) -> None:
     """
     Set the debug mode globally.
 
     Args:
         enabled: Whether to enable debug logging
+        level: Lowest level to emit (default: DEBUG_LANGGRAPH_LEVEL)
+        stream: Stream the records are written to (default: sys.stdout)
     """
     global DEBUG_LANGGRAPH_MESSAGES
     DEBUG_LANGGRAPH_MESSAGES = enabled
+    if enabled:
+        logger.setLevel(level if level is not None else DEBUG_LANGGRAPH_LEVEL)
+        _start_listener(stream)
+    else:
+        logger.setLevel(logging.CRITICAL + 1)
+        _stop_listener()
 
 
 def is_debug_enabled() -> bool:
@@ -122,7 +292,7 @@ def debug_response(fn_name: str, response: Any) -> None:
         fn_name: Name of the function/routine
         response: Response object to debug
     """
-    serialized_print(f"{fn_name}() response", safe_serialize_message(response))
+    serialized_print(f"{fn_name}() response", response)
 
 
 def debug_messages(fn_name: str, messages: Any) -> None:
@@ -133,7 +303,7 @@ def debug_messages(fn_name: str, messages: Any) -> None:
         fn_name: Name of the function/routine
         messages: Messages to debug
     """
-    serialized_print(f"{fn_name}() messages", safe_serialize_message(messages))
+    serialized_print(f"{fn_name}() messages", messages)
 
 
 def debug_state(fn_name: str, state: Any) -> None:
@@ -144,7 +314,7 @@ def debug_state(fn_name: str, state: Any) -> None:
         fn_name: Name of the function/routine
         state: State to debug
     """
-    serialized_print(f"{fn_name}() state", safe_serialize_message(state))
+    serialized_print(f"{fn_name}() state", state)
 
 
 def debug_result(fn_name: str, fn_sub_name: str, result: Any) -> None:
@@ -156,13 +326,12 @@ def debug_result(fn_name: str, fn_sub_name: str, result: Any) -> None:
         fn_sub_name: Name of the sub-function/routine
         result: Result object to debug
     """
-    serialized_print(f"{fn_name}() -> {fn_sub_name}() result",
-                     safe_serialize_message(result))
+    serialized_print(f"{fn_name}() -> {fn_sub_name}() result", result)
 
 
 def debug_conditional_edge(fn_name: str, next_node: str, message: Any) -> None:
     """
-    Debug print a conditional edge object.
+    Debug print a conditional edge object, at INFO level.
 
     Args:
         fn_name: Name of the function/routine
@@ -170,4 +339,40 @@ def debug_conditional_edge(fn_name: str, next_node: str, message: Any) -> None:
         message: Message object to debug
     """
     serialized_print(f"Conditional edge: {fn_name}() -> next_node: {next_node}()",
-                     safe_serialize_message(message))
+                     message, level=logging.INFO)
+
+
+# Counters of the process-local caches and workers, by name
+_stats_providers: Dict[str, Callable[[], Dict[str, Any]]] = {}
+
+
+def register_stats(name: str, provider: Callable[[], Dict[str, Any]]) -> None:
+    """
+    Register a counters provider, shown by debug_stats() under `name`.
+
+    Args:
+        name: Name of the component, e.g. "memory_cache"
+        provider: Callable returning the component's counters
+    """
+    _stats_providers[name] = provider
+
+
+def debug_stats(log: bool = False) -> Dict[str, Dict[str, Any]]:
+    """
+    Return the counters of every registered component, and optionally log them at INFO level.
+
+    Args:
+        log: Whether to also log the counters when debug mode is enabled
+
+    Returns:
+        The counters by component name
+    """
+    stats = {name: provider() for name, provider in _stats_providers.items()}
+    if log:
+        serialized_print("debug_stats()", stats, level=logging.INFO)
+    return stats
+
+
+# Honor DEBUG_LANGGRAPH_MESSAGES=true from the environment
+if DEBUG_LANGGRAPH_MESSAGES:
+    set_debug_mode(True)
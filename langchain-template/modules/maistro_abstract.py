@@ -20,3 +20,13 @@ class AbstractMaistro(ABC):
     @abstractmethod
     def profile_extractor(self):
         pass
+
+    @property
+    @abstractmethod
+    def todo_extractor(self):
+        pass
+
+    @property
+    @abstractmethod
+    def memory_model(self):
+        pass
@@ -0,0 +1,122 @@
+"""
+Background memory writes: run memory extraction jobs off the response path, in order per user
+"""
+
+import asyncio
+import logging
+import os
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+from .debug_langgraph import register_stats
+
+logger = logging.getLogger(__name__)
+
+# Number of worker threads, overridable through the environment
+MEMORY_WRITER_WORKERS = int(os.environ.get("MAISTRO_MEMORY_WRITER_WORKERS", "4"))
+
+# Tool message content returned by the update nodes when the write is queued
+MEMORY_UPDATE_QUEUED = "memory update queued"
+
+
+class MemoryWriter:
+    """
+    In-process worker pool for memory writes, ordered per (todo_category, user_id).
+
+    Jobs of the same user run one after the other in submission order, so the extraction of
+    a later turn always sees the writes of the earlier ones. Jobs of different users run
+    concurrently on up to `workers` threads. Pending jobs still run at interpreter exit.
+
+    Args:
+        workers: Maximum number of jobs running at the same time
+    """
+
+    def __init__(self, workers: int = MEMORY_WRITER_WORKERS):
+        self.workers = workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._queues: Dict[Tuple[str, str], Deque[Tuple[Future, Callable, tuple]]] = {}
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._pending = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+
+    def submit(self, todo_category: str, user_id: str, fn: Callable[..., Any], *args) -> Future:
+        """Queue fn(*args) behind the user's earlier jobs and return its future."""
+        key = (todo_category, user_id)
+        future: Future = Future()
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="memory-writer")
+            self._pending += 1
+            self.submitted += 1
+            queue = self._queues.get(key)
+            if queue is None:
+                # No job of this user is running: start a drain for its queue
+                queue = self._queues[key] = deque()
+                self._executor.submit(self._drain, key)
+            queue.append((future, fn, args))
+        return future
+
+    def _drain(self, key: Tuple[str, str]) -> None:
+        """Run the user's jobs until the queue is empty; the queue stays registered while one runs."""
+        while True:
+            with self._lock:
+                queue = self._queues[key]
+                if not queue:
+                    del self._queues[key]
+                    return
+                future, fn, args = queue.popleft()
+            failed = False
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(fn(*args))
+                except Exception as exc:
+                    failed = True
+                    logger.exception("Background memory write for %s failed", key)
+                    future.set_exception(exc)
+            with self._lock:
+                self._pending -= 1
+                self.completed += 1
+                self.failed += failed
+                if self._pending == 0:
+                    self._idle.notify_all()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every queued job has run; return False on timeout."""
+        with self._lock:
+            return self._idle.wait_for(lambda: self._pending == 0, timeout)
+
+    async def aflush(self, timeout: Optional[float] = None) -> bool:
+        """Async version of flush()."""
+        return await asyncio.to_thread(self.flush, timeout)
+
+    def stats(self) -> Dict[str, int]:
+        """Return the job counters."""
+        with self._lock:
+            return {
+                "pending": self._pending,
+                "users": len(self._queues),
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+            }
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop the worker threads, after the queued jobs when wait is set."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            if wait:
+                self.flush()
+            executor.shutdown(wait=wait)
+
+
+# Shared writer used by the node_maistro nodes
+memory_writer = MemoryWriter()
+
+register_stats("memory_writer", memory_writer.stats)
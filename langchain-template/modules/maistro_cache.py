@@ -0,0 +1,262 @@
+"""
+Process-local LRU caches: memory snapshots keyed by (store, todo_category, user_id), and
+instruction rewrites keyed by a hash of their inputs
+"""
+
+import hashlib
+import itertools
+import json
+import os
+import re
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Sequence, Tuple
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+
+from .debug_langgraph import register_stats
+from .maistro_memory import MemorySnapshot
+
+# Cache size and staleness bound, overridable through the environment
+MEMORY_CACHE_MAXSIZE = int(os.environ.get("MAISTRO_MEMORY_CACHE_MAXSIZE", "1024"))
+MEMORY_CACHE_TTL = float(os.environ.get("MAISTRO_MEMORY_CACHE_TTL", "30"))
+INSTRUCTIONS_CACHE_MAXSIZE = int(os.environ.get("MAISTRO_INSTRUCTIONS_CACHE_MAXSIZE", "4096"))
+# Number of most recent turns (a human message and the AI text before it) an instruction rewrite is keyed on
+INSTRUCTIONS_CACHE_CONTEXT = int(os.environ.get("MAISTRO_INSTRUCTIONS_CACHE_CONTEXT", "1"))
+
+
+class MemorySnapshotCache:
+    """
+    Size-bounded LRU cache of MemorySnapshot objects with a TTL.
+
+    Entries are keyed by the store they were loaded from and the user's namespace, and only
+    served for the todo fetch limit they were loaded with, so graphs with different stores or
+    settings never share snapshots. The
+    update nodes invalidate a user's entries whenever they write to the store, so a single
+    process always sees its own writes. The TTL bounds how stale an entry can get when
+    another replica writes to the same user's memory.
+
+    Each user has their own epoch, bumped on invalidation, so that a load racing a write of
+    that user is not cached; loads of other users are unaffected. Epochs are forgotten once
+    they are older than the TTL.
+
+    Args:
+        maxsize: Maximum number of cached snapshots (0 disables the cache)
+        ttl: Seconds an entry is served before it is reloaded from the store
+    """
+
+    def __init__(self, maxsize: int = MEMORY_CACHE_MAXSIZE, ttl: float = MEMORY_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        # (store token, todo_category, user_id) -> (time stored, fetch limit, snapshot)
+        self._entries: "OrderedDict[Tuple, Tuple[float, int, MemorySnapshot]]" = OrderedDict()
+        # (store token, todo_category, user_id) -> (epoch, monotonic time of the invalidation)
+        self._epochs: "OrderedDict[Tuple, Tuple[int, float]]" = OrderedDict()
+        self._next_epoch = 0
+        # Bumped by clear(), so that no load in flight at that time is cached
+        self._generation = 0
+        # Store -> token, so that keys neither keep stores alive nor match a new store at a reused id()
+        self._stores: "weakref.WeakKeyDictionary[Any, int]" = weakref.WeakKeyDictionary()
+        self._store_tokens = itertools.count(1)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _user(self, store: Any, todo_category: str, user_id: str) -> Tuple:
+        """Key of a user's entry; called with the lock held."""
+        token = self._stores.get(store)
+        if token is None:
+            token = self._stores[store] = next(self._store_tokens)
+        return token, todo_category, user_id
+
+    def _epoch(self, user: Tuple) -> Tuple[int, int]:
+        return self._generation, self._epochs[user][0] if user in self._epochs else 0
+
+    def _lookup(self, store: Any, todo_category: str, user_id: str,
+                fetch_limit: int) -> Tuple[Tuple, Optional[MemorySnapshot], Tuple[int, int]]:
+        with self._lock:
+            user = self._user(store, todo_category, user_id)
+            epoch = self._epoch(user)
+            entry = self._entries.get(user)
+            if entry is not None:
+                stored_at, limit, snapshot = entry
+                if time.monotonic() - stored_at < self.ttl:
+                    if limit == fetch_limit:
+                        self._entries.move_to_end(user)
+                        self.hits += 1
+                        return user, snapshot, epoch
+                else:
+                    del self._entries[user]
+                    self.expirations += 1
+            self.misses += 1
+            return user, None, epoch
+
+    def _store(self, user: Tuple, fetch_limit: int, snapshot: MemorySnapshot, epoch: Tuple[int, int]) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            if self._epoch(user) != epoch:
+                return
+            self._entries[user] = (time.monotonic(), fetch_limit, snapshot)
+            self._entries.move_to_end(user)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_load(self, store: Any, todo_category: str, user_id: str, fetch_limit: int,
+                    load: Callable[[], MemorySnapshot]) -> MemorySnapshot:
+        """Return the cached snapshot, or call load() and cache its result."""
+        user, snapshot, epoch = self._lookup(store, todo_category, user_id, fetch_limit)
+        if snapshot is None:
+            snapshot = load()
+            self._store(user, fetch_limit, snapshot, epoch)
+        return snapshot
+
+    async def aget_or_load(self, store: Any, todo_category: str, user_id: str, fetch_limit: int,
+                           load: Callable[[], Awaitable[MemorySnapshot]]) -> MemorySnapshot:
+        """Async version of get_or_load()."""
+        user, snapshot, epoch = self._lookup(store, todo_category, user_id, fetch_limit)
+        if snapshot is None:
+            snapshot = await load()
+            self._store(user, fetch_limit, snapshot, epoch)
+        return snapshot
+
+    def invalidate(self, store: Any, todo_category: str, user_id: str) -> None:
+        """Drop a user's entry after a write to any of their memory namespaces in the store."""
+        with self._lock:
+            user = self._user(store, todo_category, user_id)
+            now = time.monotonic()
+            self._next_epoch += 1
+            self._epochs.pop(user, None)
+            self._epochs[user] = (self._next_epoch, now)
+            # Loads older than the TTL would be served stale for at most the TTL anyway
+            while self._epochs and now - next(iter(self._epochs.values()))[1] > self.ttl:
+                self._epochs.popitem(last=False)
+            self._entries.pop(user, None)
+
+    def clear(self) -> None:
+        """Drop all entries and reset the counters."""
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Return the cache counters."""
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+def _normalize(content: Any) -> str:
+    """Message text with case, runs of whitespace and surrounding punctuation ignored."""
+    text = content if isinstance(content, str) else json.dumps(content, sort_keys=True, default=str)
+    return re.sub(r"\s+", " ", text).strip(" .!?,;:").casefold()
+
+
+class InstructionsCache:
+    """
+    Size-bounded LRU cache of update_instructions rewrites, keyed by the hash of their inputs.
+
+    The key is the user's namespace, the current instructions text and the normalized text of
+    the most recent turns: each human message with the AI text that came before it, e.g. the
+    question a "yes" answers. A user repeating a preference, in any case or spacing, after the
+    same reply maps to the rewrite already made for it. Entries are never shared between users,
+    since the rewrite is generated from their own conversation, and need no invalidation: a new
+    rewrite changes the current instructions, and with them the key.
+
+    Args:
+        maxsize: Maximum number of cached rewrites (0 disables the cache)
+        context: Number of most recent turns the key is made of
+    """
+
+    def __init__(self, maxsize: int = INSTRUCTIONS_CACHE_MAXSIZE, context: int = INSTRUCTIONS_CACHE_CONTEXT):
+        self.maxsize = maxsize
+        self.context = context
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.unchanged = 0
+
+    def key(self, todo_category: str, user_id: str, current_instructions: Optional[str],
+            messages: Sequence[BaseMessage]) -> str:
+        """Hash of the user, the instructions and the text messages of the most recent turns."""
+        recent: list = []
+        humans = 0
+        for message in reversed(messages):
+            if isinstance(message, HumanMessage):
+                if humans == self.context:
+                    break
+                humans += 1
+            elif not isinstance(message, AIMessage):
+                continue
+            # Tool calls carry per-turn ids; only the text the user saw and wrote is part of the key
+            text = _normalize(message.content)
+            if text:
+                recent.append([message.type, text])
+        payload = json.dumps([todo_category, user_id, current_instructions or "", recent[::-1]],
+                             ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached rewrite, or None."""
+        with self._lock:
+            instructions = self._entries.get(key)
+            if instructions is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return instructions
+
+    def put(self, key: str, instructions: str) -> None:
+        """Cache a rewrite under its key."""
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = instructions
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def record_unchanged(self) -> None:
+        """Count a store write skipped because the rewrite equals the stored instructions."""
+        with self._lock:
+            self.unchanged += 1
+
+    def clear(self) -> None:
+        """Drop all entries and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.unchanged = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the cache counters; saved_calls counts the model calls the hits avoided."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "saved_calls": self.hits,
+                "unchanged_writes_skipped": self.unchanged,
+            }
+
+
+# Shared caches used by the node_maistro nodes
+memory_cache = MemorySnapshotCache()
+instructions_cache = InstructionsCache()
+
+register_stats("memory_cache", memory_cache.stats)
+register_stats("instructions_cache", instructions_cache.stats)
@@ -0,0 +1,148 @@
+"""
+Per-namespace locks, so that concurrent turns of one user do not overwrite each other's memory writes
+"""
+
+import asyncio
+import os
+import threading
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Dict, Iterator, List, Tuple
+
+from .debug_langgraph import register_stats
+
+# Switch to turn the locks off, overridable through the environment
+NAMESPACE_LOCKS_ENABLED = os.environ.get("MAISTRO_NAMESPACE_LOCKS", "True").lower() == "true"
+
+
+class NamespaceLocks:
+    """
+    Serializes the read-extract-write cycles of each memory namespace, e.g. ("todo", category, user_id).
+
+    Each namespace gets its own thread lock, created on first use and evicted as soon as nobody
+    holds or waits for it, so unrelated namespaces, including the todo, profile and instructions
+    updates of one user, never wait on each other. Coroutines first queue on an asyncio.Lock of
+    the namespace, so that only one of them at a time waits for the thread lock, and the event
+    loop never blocks. Taking the thread lock orders coroutines against the sync nodes and the
+    background memory writer.
+
+    A coroutine cancelled while a worker thread waits for the lock on its behalf (a double-text
+    interrupt, a client disconnect) marks the wait as abandoned; whichever of the two sides
+    sees the lock acquired releases it.
+
+    Args:
+        enabled: Whether hold() and ahold() lock at all
+    """
+
+    def __init__(self, enabled: bool = NAMESPACE_LOCKS_ENABLED):
+        self.enabled = enabled
+        # Namespace -> [thread lock, asyncio lock or None, number of holders and waiters]
+        self._locks: Dict[Tuple[str, ...], List] = {}
+        self._lock = threading.Lock()
+        self.acquired = 0
+        self.contended = 0
+        self.evicted = 0
+
+    def _enter(self, namespace: Tuple[str, ...], async_lock: bool = False) -> List:
+        with self._lock:
+            entry = self._locks.get(namespace)
+            if entry is None:
+                entry = self._locks[namespace] = [threading.Lock(), None, 0]
+            if async_lock and entry[1] is None:
+                entry[1] = asyncio.Lock()
+            entry[2] += 1
+            return entry
+
+    def _exit(self, namespace: Tuple[str, ...], entry: List) -> None:
+        with self._lock:
+            entry[2] -= 1
+            if entry[2] == 0 and self._locks.get(namespace) is entry:
+                del self._locks[namespace]
+                self.evicted += 1
+
+    def _count(self, contended: bool) -> None:
+        with self._lock:
+            self.acquired += 1
+            self.contended += contended
+
+    @contextmanager
+    def hold(self, namespace: Tuple[str, ...]) -> Iterator[None]:
+        """Hold the namespace's lock for the duration of the block."""
+        if not self.enabled:
+            yield
+            return
+        namespace = tuple(namespace)
+        entry = self._enter(namespace)
+        try:
+            lock = entry[0]
+            contended = not lock.acquire(blocking=False)
+            if contended:
+                lock.acquire()
+            self._count(contended)
+            try:
+                yield
+            finally:
+                lock.release()
+        finally:
+            self._exit(namespace, entry)
+
+    async def _aacquire(self, lock: threading.Lock) -> None:
+        """Acquire a thread lock from a coroutine, on a worker thread if it is busy."""
+        if lock.acquire(blocking=False):
+            self._count(False)
+            return
+        wait = {"acquired": False, "abandoned": False}
+
+        def acquire() -> None:
+            lock.acquire()
+            with self._lock:
+                if wait["abandoned"]:
+                    lock.release()
+                else:
+                    wait["acquired"] = True
+
+        try:
+            await asyncio.to_thread(acquire)
+        except asyncio.CancelledError:
+            # The worker thread keeps waiting: release the lock here if it already got it,
+            # otherwise it releases the lock itself once it does
+            with self._lock:
+                wait["abandoned"] = True
+                acquired = wait["acquired"]
+            if acquired:
+                lock.release()
+            raise
+        self._count(True)
+
+    @asynccontextmanager
+    async def ahold(self, namespace: Tuple[str, ...]) -> AsyncIterator[None]:
+        """Async version of hold()."""
+        if not self.enabled:
+            yield
+            return
+        namespace = tuple(namespace)
+        entry = self._enter(namespace, async_lock=True)
+        try:
+            async with entry[1]:
+                await self._aacquire(entry[0])
+                try:
+                    yield
+                finally:
+                    entry[0].release()
+        finally:
+            self._exit(namespace, entry)
+
+    def stats(self) -> Dict[str, int]:
+        """Return the lock counters; contended counts acquisitions that had to wait."""
+        with self._lock:
+            return {
+                "namespaces": len(self._locks),
+                "acquired": self.acquired,
+                "contended": self.contended,
+                "evicted": self.evicted,
+            }
+
+
+# Shared locks used by the update nodes' write functions
+namespace_locks = NamespaceLocks()
+
+register_stats("namespace_locks", namespace_locks.stats)
@@ -0,0 +1,65 @@
+"""
+Memory loading for the Maistro chatbot: fetch the profile, ToDo list and instructions in one store round trip
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+from langgraph.store.base import BaseStore, Item, SearchOp
+
+# Memory types, used as the first element of every memory namespace
+MEMORY_TYPES = ("profile", "todo", "instructions")
+
+# Same default page size as BaseStore.search(); ToDo lists are loaded with a larger limit and
+# trimmed by utils_todo.select_todos() before they reach the model
+SEARCH_LIMIT = 10
+
+
+@dataclass
+class MemorySnapshot:
+    """The user's long-term memory as loaded at the start of a turn."""
+    todo_category: str
+    user_id: str
+    profile: Optional[dict[str, Any]] = None
+    todos: list[Item] = field(default_factory=list)
+    instructions: Any = ""
+
+    def format_todos(self, todos: Optional[list[Item]] = None) -> str:
+        """Render the ToDo list (or a selection of it) the way it is shown in the system prompt."""
+        return "\n".join(f"{item.value}" for item in (self.todos if todos is None else todos))
+
+
+def memory_namespace(memory_type: str, todo_category: str, user_id: str) -> tuple[str, str, str]:
+    """Namespace of a memory type for a user."""
+    return (memory_type, todo_category, user_id)
+
+
+def _memory_ops(todo_category: str, user_id: str, todo_limit: int) -> list[SearchOp]:
+    return [SearchOp(memory_namespace(memory_type, todo_category, user_id),
+                     limit=todo_limit if memory_type == "todo" else SEARCH_LIMIT)
+            for memory_type in MEMORY_TYPES]
+
+
+def _to_snapshot(todo_category: str, user_id: str, results: list[list[Item]]) -> MemorySnapshot:
+    profile_items, todo_items, instruction_items = results
+    return MemorySnapshot(
+        todo_category=todo_category,
+        user_id=user_id,
+        profile=profile_items[0].value if profile_items else None,
+        todos=list(todo_items),
+        instructions=instruction_items[0].value if instruction_items else "",
+    )
+
+
+def load_memory(store: BaseStore, todo_category: str, user_id: str,
+                todo_limit: int = SEARCH_LIMIT) -> MemorySnapshot:
+    """Load all memory types for a user with a single store.batch() call."""
+    results = store.batch(_memory_ops(todo_category, user_id, todo_limit))
+    return _to_snapshot(todo_category, user_id, results)
+
+
+async def aload_memory(store: BaseStore, todo_category: str, user_id: str,
+                       todo_limit: int = SEARCH_LIMIT) -> MemorySnapshot:
+    """Async version of load_memory(), using a single store.abatch() call."""
+    results = await store.abatch(_memory_ops(todo_category, user_id, todo_limit))
+    return _to_snapshot(todo_category, user_id, results)
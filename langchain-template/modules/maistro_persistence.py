@@ -0,0 +1,129 @@
+"""
+Long-term store and checkpointer backends for running the TaskMaistro graph outside the LangGraph API server
+"""
+
+import os
+import sqlite3
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional
+
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.store.base import BaseStore
+from langgraph.store.memory import InMemoryStore
+
+from .maistro_sqlite_store import MaistroSqliteStore
+
+# Backend used when TaskMaistro is given none; unset means no store or checkpointer is compiled
+# in, and the LangGraph API server injects its own
+MAISTRO_PERSISTENCE = os.environ.get("MAISTRO_PERSISTENCE", "")
+
+# Backend settings, overridable through the environment
+MAISTRO_SQLITE_PATH = os.environ.get("MAISTRO_SQLITE_PATH", "maistro.sqlite")
+MAISTRO_POSTGRES_URI = os.environ.get("MAISTRO_POSTGRES_URI", "")
+MAISTRO_POSTGRES_POOL_SIZE = int(os.environ.get("MAISTRO_POSTGRES_POOL_SIZE", "10"))
+
+# Prepared statements kept per SQLite connection (sqlite3 caches them by SQL text)
+SQLITE_STATEMENT_CACHE_SIZE = 256
+
+PERSISTENCE_BACKENDS = ("memory", "sqlite", "postgres")
+
+
+@dataclass
+class Persistence:
+    """
+    A store and a checkpointer, with the connections they hold.
+
+    Args:
+        backend: Name of the backend, one of PERSISTENCE_BACKENDS
+        store: Long-term memory store passed to the graph's nodes
+        checkpointer: Saver of the per-thread graph state
+        supports_async: Whether the store and checkpointer implement the async API used by
+                        the async nodes (ainvoke/astream)
+    """
+    backend: str
+    store: BaseStore
+    checkpointer: BaseCheckpointSaver
+    supports_async: bool = True
+    _closers: List[Callable[[], None]] = field(default_factory=list, repr=False)
+
+    def close(self) -> None:
+        """Close the connections of the backend."""
+        while self._closers:
+            self._closers.pop()()
+
+
+def sqlite_connection(path: str) -> sqlite3.Connection:
+    """
+    Long-lived connection to a SQLite database in WAL mode, shared by the threads of the process.
+
+    WAL lets readers proceed while a write is in progress, and synchronous=NORMAL only syncs at
+    checkpoints, which is safe with WAL. The store and checkpointer each serialize their use of
+    the connection with their own lock.
+    """
+    conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30,
+                           cached_statements=SQLITE_STATEMENT_CACHE_SIZE)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA busy_timeout=30000")
+    return conn
+
+
+def _memory() -> Persistence:
+    return Persistence("memory", InMemoryStore(), InMemorySaver())
+
+
+def _sqlite(path: str) -> Persistence:
+    from langgraph.checkpoint.sqlite import SqliteSaver
+
+    # One connection each, so that a store write never waits on the checkpointer's lock
+    store_conn, checkpoint_conn = sqlite_connection(path), sqlite_connection(path)
+    store, checkpointer = MaistroSqliteStore(store_conn), SqliteSaver(checkpoint_conn)
+    store.setup()
+    checkpointer.setup()
+    return Persistence("sqlite", store, checkpointer, supports_async=False,
+                       _closers=[store_conn.close, checkpoint_conn.close])
+
+
+def _postgres(uri: str, pool_size: int) -> Persistence:
+    try:
+        from psycopg.rows import dict_row
+        from psycopg_pool import ConnectionPool
+        from langgraph.checkpoint.postgres import PostgresSaver
+        from langgraph.store.postgres import PostgresStore
+    except ImportError as e:
+        raise ImportError("The postgres backend needs langgraph-checkpoint-postgres and psycopg[pool]: "
+                          "pip install langgraph-checkpoint-postgres 'psycopg[binary,pool]'") from e
+    if not uri:
+        raise ValueError("The postgres backend needs a connection URI (MAISTRO_POSTGRES_URI)")
+
+    # Settings required by the LangGraph Postgres savers: autocommit, dict rows and no
+    # prepared statements, which also keeps the pool usable behind PgBouncer
+    pool = ConnectionPool(uri, min_size=1, max_size=pool_size, open=True,
+                          kwargs={"autocommit": True, "prepare_threshold": None, "row_factory": dict_row})
+    store, checkpointer = PostgresStore(pool), PostgresSaver(pool)
+    store.setup()
+    checkpointer.setup()
+    return Persistence("postgres", store, checkpointer, supports_async=False, _closers=[pool.close])
+
+
+def create_persistence(backend: str, *, path: Optional[str] = None, uri: Optional[str] = None,
+                       pool_size: Optional[int] = None) -> Persistence:
+    """
+    Create the store and checkpointer of a backend.
+
+    Args:
+        backend: "memory" (process-local, lost on exit), "sqlite" (a WAL-mode database file, with
+                 the memories in a MaistroSqliteStore) or "postgres" (a connection pool to a
+                 Postgres-compatible server)
+        path: SQLite database file (default: MAISTRO_SQLITE_PATH)
+        uri: Postgres connection URI (default: MAISTRO_POSTGRES_URI)
+        pool_size: Maximum number of pooled Postgres connections (default: MAISTRO_POSTGRES_POOL_SIZE)
+    """
+    if backend == "memory":
+        return _memory()
+    if backend == "sqlite":
+        return _sqlite(path or MAISTRO_SQLITE_PATH)
+    if backend == "postgres":
+        return _postgres(uri or MAISTRO_POSTGRES_URI, pool_size or MAISTRO_POSTGRES_POOL_SIZE)
+    raise ValueError(f"Unknown persistence backend {backend!r}, expected one of {PERSISTENCE_BACKENDS}")
@@ -0,0 +1,175 @@
+"""
+Bounded pool of the model resources of each model and temperature selected through the Configuration
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+
+from trustcall import create_extractor
+from langchain_core.language_models import BaseChatModel
+from langchain_core.runnables import Runnable
+from langchain_openai import ChatOpenAI
+
+from .core_instance import get_handle
+from .debug_langgraph import register_stats
+from .maistro_abstract import AbstractMaistro
+from .maistro_schema import Profile, ToDo, UpdateMemory
+
+# Number of (model, temperature) resource sets kept, overridable through the environment
+MAISTRO_POOL_MAXSIZE = int(os.environ.get("MAISTRO_POOL_MAXSIZE", "8"))
+
+
+def chat_model(model: str, temperature: float = 0) -> BaseChatModel:
+    """
+    OpenAI chat model client. langchain_openai shares one process-wide HTTP connection pool
+    between all the clients with the same base URL and timeout, so every model and temperature
+    reuses the same connections.
+    """
+    # Under the graph's "messages" stream mode the model streams its replies; stream_usage keeps
+    # token usage in the streamed message
+    return ChatOpenAI(model=model, temperature=temperature, stream_usage=True)
+
+
+class MaistroModels:
+    """
+    A chat model with the runnables the nodes build on it: the model bound to the UpdateMemory
+    tool, and the Trustcall extractors of the profile and the ToDo list.
+
+    Args:
+        model: Chat model to use as is
+    """
+
+    _model: BaseChatModel
+    _profile_extractor: Runnable
+    _todo_extractor: Runnable
+    _memory_model: Runnable
+    _bound_models: dict
+
+    def __init__(self, model: BaseChatModel):
+        self._model = model
+
+        # Bind the tools used by task_mAIstro once, instead of on every turn. Parallel tool calls let
+        # one message request several memory updates, which route_message fans out together
+        self._bound_models = {}
+        self._memory_model = self.bind_tools(
+            [UpdateMemory], parallel_tool_calls=True)
+
+        # Create the Trustcall extractors for updating the user profile and ToDo list
+        self._profile_extractor = create_extractor(
+            self._model,
+            tools=[Profile],
+            tool_choice="Profile",
+        )
+        self._todo_extractor = create_extractor(
+            self._model,
+            tools=[ToDo],
+            tool_choice="ToDo",
+            enable_inserts=True,
+        )
+
+    @property
+    def model(self):
+        return self._model
+
+    @property
+    def profile_extractor(self):
+        return self._profile_extractor
+
+    @property
+    def todo_extractor(self):
+        return self._todo_extractor
+
+    @property
+    def memory_model(self):
+        return self._memory_model
+
+    def bind_tools(self, tools: list, **kwargs) -> Runnable:
+        """Return the model bound to a tool set, binding it only the first time it is requested."""
+        key = (tuple(tools), tuple(sorted(kwargs.items())))
+        bound = self._bound_models.get(key)
+        if bound is None:
+            bound = self._bound_models[key] = self._model.bind_tools(tools, **kwargs)
+        return bound
+
+
+class ModelPool:
+    """
+    Size-bounded LRU pool of MaistroModels, keyed by model name and temperature.
+
+    A miss builds the model client and its extractors outside the pool's lock; when two
+    threads build the same entry at once, the first one inserted is kept. Evicted entries are
+    simply dropped: their clients share langchain_openai's HTTP connection pool, which stays
+    open.
+
+    Args:
+        maxsize: Maximum number of resource sets kept
+        factory: Builds the chat model of a (model, temperature), chat_model() by default
+    """
+
+    def __init__(self, maxsize: int = MAISTRO_POOL_MAXSIZE,
+                 factory: Optional[Callable[[str, float], BaseChatModel]] = None):
+        self.maxsize = max(maxsize, 1)
+        self.factory = factory or chat_model
+        self._entries: "OrderedDict[Tuple[str, float], MaistroModels]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, model: str, temperature: float = 0) -> MaistroModels:
+        """Return the resources of a model and temperature, building them on a miss."""
+        key = (model, float(temperature))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+
+        built = MaistroModels(self.factory(model, float(temperature)))
+        with self._lock:
+            entry = self._entries.setdefault(key, built)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            return entry
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the pool counters."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "evictions": self.evictions,
+            }
+
+
+# Shared pool used by the node_maistro nodes
+model_pool = ModelPool()
+
+register_stats("model_pool", model_pool.stats)
+
+task_maistro_handle = get_handle("task_maistro", AbstractMaistro)
+
+
+def maistro_models(configurable, maistro: Optional[AbstractMaistro] = None) -> Union[MaistroModels, AbstractMaistro]:
+    """
+    The model resources a node uses for a run: the pooled ones of the model and temperature the
+    Configuration selects, else those of the TaskMaistro that built the graph. Nodes wired into
+    a graph of their own, without a TaskMaistro, fall back to the registered task_maistro.
+    """
+    if configurable.model:
+        return model_pool.get(configurable.model, configurable.temperature)
+    return maistro if maistro is not None else task_maistro_handle()
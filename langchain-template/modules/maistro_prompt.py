@@ -2,7 +2,24 @@
 Prompts for the Maistro chatbot
 """
 
-# Chatbot instruction for choosing what to update and what tools to call
+from datetime import datetime
+from typing import Optional
+
+# Granularity of the time shown in prompts, in seconds. Trustcall computes relative deadlines
+# ("in 30 minutes") from it, so it has to stay fine
+PROMPT_TIME_RESOLUTION = 60
+
+
+def prompt_time(now: Optional[datetime] = None, resolution: int = PROMPT_TIME_RESOLUTION) -> str:
+    """Current server local time rounded down to the resolution, with its UTC offset, e.g. 2025-01-31T14:07+01:00."""
+    now = now or datetime.now().astimezone()
+    timestamp = int(now.timestamp()) // resolution * resolution
+    return datetime.fromtimestamp(timestamp, now.tzinfo).isoformat(timespec="minutes")
+
+# Chatbot instruction for choosing what to update and what tools to call.
+# The static instructions come first and the per-user memory last, ordered from the least to the
+# most frequently changing section, so that every user and turn shares the same prompt prefix
+# for provider-side prompt caching.
 MODEL_SYSTEM_MESSAGE = """{task_maistro_role} 
 
 You have a long term memory which keeps track of three things:
@@ -10,21 +27,6 @@ You have a long term memory which keeps track of three things:
 2. The user's ToDo list
 3. General instructions for updating the ToDo list
 
-Here is the current User Profile (may be empty if no information has been collected yet):
-<user_profile>
-{user_profile}
-</user_profile>
-
-Here is the current ToDo List (may be empty if no tasks have been added yet):
-<todo>
-{todo}
-</todo>
-
-Here are the current user-specified preferences for updating the ToDo list (may be empty if no preferences have been specified yet):
-<instructions>
-{instructions}
-</instructions>
-
 Here are your instructions for reasoning about the user's messages:
 
 1. Reason carefully about the user's messages as presented below. 
@@ -41,9 +43,25 @@ Here are your instructions for reasoning about the user's messages:
 
 4. Err on the side of updating the todo list. No need to ask for explicit permission.
 
-5. Respond naturally to user user after a tool call was made to save memories, or if no tool call was made."""
+5. Respond naturally to user user after a tool call was made to save memories, or if no tool call was made.
+
+Here is the current User Profile (may be empty if no information has been collected yet):
+<user_profile>
+{user_profile}
+</user_profile>
+
+Here are the current user-specified preferences for updating the ToDo list (may be empty if no preferences have been specified yet):
+<instructions>
+{instructions}
+</instructions>
 
-# Trustcall instruction
+Here is the current ToDo List (may be empty if no tasks have been added yet):
+<todo>
+{todo}
+</todo>"""
+
+# Trustcall instruction. The time goes last and is formatted by prompt_time(), so that only the
+# conversation after it misses the provider's prompt cache
 TRUSTCALL_INSTRUCTION = """Reflect on following interaction. 
 
 Use the provided tools to retain any necessary memories about the user. 
@@ -62,3 +80,37 @@ Your current instructions are:
 <current_instructions>
 {current_instructions}
 </current_instructions>"""
+
+# Short prompt for confirm_update, which replies after the memory updates instead of task_mAIstro
+CONFIRM_UPDATE_MESSAGE = """{task_maistro_role}
+
+You have just saved changes to your long term memory of the user.
+
+Respond naturally to the user's last message in one or two sentences:
+- Tell the user when you updated the ToDo list
+- Do not tell the user you have updated the user's profile
+- Do not tell the user that you have updated instructions
+
+Here are the changes you saved:
+<updates>
+{updates}
+</updates>"""
+
+# Fixed replies used by confirm_update when update_reply is "template" (no model call)
+CONFIRM_TODO_REPLY = "Got it, I've updated your ToDo list."
+CONFIRM_MEMORY_REPLY = "Got it, thanks for letting me know."
+
+# Summary of the trimmed chat history, appended to the task_mAIstro system message
+CONVERSATION_SUMMARY = """
+
+Here is a summary of the earlier conversation with the user:
+<summary>
+{summary}
+</summary>"""
+
+# Instructions for manage_history, which folds trimmed messages into the rolling summary
+CREATE_SUMMARY = "Create a summary of the conversation above:"
+
+EXTEND_SUMMARY = """This is summary of the conversation to date: {summary}
+
+Extend the summary by taking into account the new messages above:"""
@@ -0,0 +1,188 @@
+"""
+Token-budgeted assembly of the task_mAIstro prompt: system message sections plus chat history
+"""
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from langchain_core.messages import BaseMessage, HumanMessage, trim_messages
+from langgraph.store.base import Item
+
+from .debug_langgraph import register_stats
+from .maistro_memory import MemorySnapshot
+from .maistro_prompt import MODEL_SYSTEM_MESSAGE, CONVERSATION_SUMMARY
+from .utils_token import approx_tokens, truncate_to_tokens
+
+# Share of the budget left after the prompt template, per section, in allocation order.
+# Tokens a section does not use are passed on to the next one.
+SECTION_SHARES = (
+    ("role", 0.05),
+    ("profile", 0.10),
+    ("instructions", 0.10),
+    ("todos", 0.35),
+    ("history", 0.40),
+)
+
+# Number of users whose rendered static sections are kept
+PROMPT_CACHE_MAXSIZE = 1024
+
+# Tokens of MODEL_SYSTEM_MESSAGE with every section empty
+_TEMPLATE_TOKENS = approx_tokens(MODEL_SYSTEM_MESSAGE.format(
+    task_maistro_role="", user_profile="", todo="", instructions=""))
+
+
+@dataclass
+class StaticSections:
+    """Rendered role, profile and instructions of one user, which only change with their memory."""
+    role: str
+    profile: str
+    instructions: str
+    # Budget left over for the todos and the history
+    carry: int
+
+
+def render_profile(profile: Optional[dict]) -> str:
+    """Profile without empty fields, in the dict notation the prompt has always used."""
+    if not profile:
+        return "None"
+    return str({key: value for key, value in profile.items() if value not in (None, "", [], {})})
+
+
+def render_instructions(instructions) -> str:
+    """Instructions text, without the {"memory": ...} wrapper update_instructions stores it in."""
+    if isinstance(instructions, dict):
+        return str(instructions.get("memory", ""))
+    return str(instructions or "")
+
+
+def _allocate(budget: int) -> Dict[str, int]:
+    available = max(budget - _TEMPLATE_TOKENS, 0)
+    return {section: int(available * share) for section, share in SECTION_SHARES}
+
+
+def _fit(text: str, budget: int) -> Tuple[str, int]:
+    """Truncate text to the budget and return it with the unused part of the budget."""
+    text = truncate_to_tokens(text, budget)
+    return text, budget - approx_tokens(text)
+
+
+def _render_todos(todos: List[Item], budget: int) -> Tuple[str, int]:
+    """Render todos in the given (ranked) order until the budget runs out, noting how many were left out."""
+    lines, used = [], 0
+    for i, item in enumerate(todos):
+        line = f"{item.value}"
+        tokens = approx_tokens(line) + 1
+        note = f"(+{len(todos) - i} more todos not shown)"
+        # Keep room for the note unless this is the last todo
+        reserve = approx_tokens(note) + 1 if i < len(todos) - 1 else 0
+        if used + tokens + reserve > budget:
+            if approx_tokens(note) + used <= budget:
+                lines.append(note)
+                used += approx_tokens(note) + 1
+            break
+        lines.append(line)
+        used += tokens
+    return "\n".join(lines), max(budget - used, 0)
+
+
+def _trim_history(messages: List[BaseMessage], summary: str, budget: int) -> Tuple[str, List[BaseMessage]]:
+    """Keep the newest messages that fit the budget, starting on a human message, and always the latest one."""
+    summary_text = ""
+    if summary:
+        summary_text = CONVERSATION_SUMMARY.format(summary=truncate_to_tokens(summary, budget // 4))
+        budget -= approx_tokens(summary_text)
+    kept = trim_messages(messages, max_tokens=max(budget, 0), token_counter=approx_tokens,
+                         strategy="last", start_on="human")
+    if not kept:
+        last_human = max((i for i, m in enumerate(messages) if isinstance(m, HumanMessage)), default=0)
+        kept = messages[last_human:]
+    return summary_text, kept
+
+
+class PromptBuilder:
+    """
+    Builds the task_mAIstro system message and history within a token budget.
+
+    The budget is split across the role, profile, instructions, todos and history (see
+    SECTION_SHARES), and each section is cut deterministically: text at a word boundary,
+    todos by dropping the lowest ranked ones, history by dropping the oldest turns. The
+    rendered role, profile and instructions are cached per user and reused for as long as
+    the memory snapshot and settings are the same.
+
+    Args:
+        maxsize: Maximum number of users whose static sections are cached
+    """
+
+    def __init__(self, maxsize: int = PROMPT_CACHE_MAXSIZE):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[MemorySnapshot, str, int, StaticSections]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _static(self, memory: MemorySnapshot, role: str, budget: int) -> StaticSections:
+        key = (memory.todo_category, memory.user_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            # The snapshot is compared by identity: memory_cache hands out the same object until a write
+            if entry is not None and entry[0] is memory and entry[1] == role and entry[2] == budget:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[3]
+            self.misses += 1
+
+        allocation = _allocate(budget)
+        role_text, carry = _fit(role, allocation["role"])
+        profile_text, carry = _fit(render_profile(memory.profile), allocation["profile"] + carry)
+        instructions_text, carry = _fit(render_instructions(memory.instructions),
+                                        allocation["instructions"] + carry)
+        sections = StaticSections(role_text, profile_text, instructions_text, carry)
+
+        if self.maxsize > 0:
+            with self._lock:
+                self._entries[key] = (memory, role, budget, sections)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+        return sections
+
+    def build(self, memory: MemorySnapshot, todos: List[Item], messages: List[BaseMessage],
+              role: str, budget: int, summary: str = "") -> Tuple[str, List[BaseMessage]]:
+        """
+        Return the system message and the history messages to send, within about `budget` tokens.
+
+        Args:
+            memory: The user's memory snapshot
+            todos: The todos to show, most important first (see utils_todo.todos_in_context)
+            messages: The chat history
+            role: The task_maistro_role setting
+            budget: Token budget of the whole prompt
+            summary: Summary of the trimmed history, if any
+        """
+        static = self._static(memory, role, budget)
+        allocation = _allocate(budget)
+        todo_text, carry = _render_todos(todos, allocation["todos"] + static.carry)
+        summary_text, history = _trim_history(messages, summary, allocation["history"] + carry)
+        system_msg = MODEL_SYSTEM_MESSAGE.format(
+            task_maistro_role=static.role, user_profile=static.profile, todo=todo_text,
+            instructions=static.instructions) + summary_text
+        return system_msg, history
+
+    def clear(self) -> None:
+        """Drop all cached sections and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Return the cache counters."""
+        with self._lock:
+            return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+# Shared builder used by task_mAIstro
+prompt_builder = PromptBuilder()
+
+register_stats("prompt_builder", prompt_builder.stats)
@@ -5,6 +5,7 @@ Schema definitions for the Maistro chatbot
 from typing import Optional, Literal, TypedDict
 from datetime import datetime
 from pydantic import BaseModel, Field
+from langgraph.graph import MessagesState
 
 
 class Profile(BaseModel):
@@ -51,3 +52,11 @@ class ToDo(BaseModel):
 class UpdateMemory(TypedDict):
     """ Decision on what memory type to update """
     update_type: Literal['user', 'todo', 'instructions']
+
+
+# Graph state
+
+
+class TaskMaistroState(MessagesState):
+    """ Chat history, plus a rolling summary of the messages trimmed from it """
+    summary: str
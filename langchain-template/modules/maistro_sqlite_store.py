@@ -0,0 +1,210 @@
+"""
+SQLite store for the Maistro memory namespaces: (memory_type, todo_category, user_id)
+"""
+
+import asyncio
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+try:
+    import orjson
+
+    def _dumps(value: dict) -> str:
+        """Compact JSON text of a value."""
+        return orjson.dumps(value).decode("utf-8")
+
+    _loads = orjson.loads
+except ImportError:
+    import json
+
+    def _dumps(value: dict) -> str:
+        """Compact JSON text of a value."""
+        return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+    _loads = json.loads
+
+from langgraph.store.base import (
+    BaseStore, GetOp, Item, ListNamespacesOp, MatchCondition, Op, PutOp, Result, SearchItem, SearchOp
+)
+
+# Namespace columns, in the order of the namespace tuple
+NAMESPACE_COLUMNS = ("memory_type", "todo_category", "user_id")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS maistro_items (
+    memory_type TEXT NOT NULL,
+    todo_category TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (memory_type, todo_category, user_id, key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS maistro_items_recent
+    ON maistro_items (memory_type, todo_category, user_id, updated_at DESC);
+"""
+
+_GET = ("SELECT key, value, created_at, updated_at FROM maistro_items "
+        "WHERE memory_type = ? AND todo_category = ? AND user_id = ? AND key = ?")
+_UPSERT = ("INSERT INTO maistro_items (memory_type, todo_category, user_id, key, value, created_at, updated_at) "
+           "VALUES (?, ?, ?, ?, ?, ?, ?) "
+           "ON CONFLICT (memory_type, todo_category, user_id, key) "
+           "DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at")
+_DELETE = "DELETE FROM maistro_items WHERE memory_type = ? AND todo_category = ? AND user_id = ? AND key = ?"
+_NAMESPACES = "SELECT DISTINCT memory_type, todo_category, user_id FROM maistro_items"
+
+# Search by namespace prefix: the conditions on the namespace columns, per prefix length
+_SEARCH = ("SELECT memory_type, todo_category, user_id, key, value, created_at, updated_at FROM maistro_items "
+           "WHERE {where} ORDER BY updated_at DESC LIMIT ? OFFSET ?")
+_PREFIX_CONDITIONS = [[f"{column} = ?" for column in NAMESPACE_COLUMNS[:depth]]
+                      for depth in range(len(NAMESPACE_COLUMNS) + 1)]
+
+_OPERATORS = {"$eq": "=", "$ne": "!=", "$gt": ">", "$gte": ">=", "$lt": "<", "$lte": "<="}
+
+
+def _timestamp(seconds: float) -> datetime:
+    return datetime.fromtimestamp(seconds, timezone.utc)
+
+
+def _namespace(namespace: Tuple[str, ...]) -> Tuple[str, str, str]:
+    if len(namespace) != len(NAMESPACE_COLUMNS):
+        raise ValueError(f"MaistroSqliteStore namespaces are {NAMESPACE_COLUMNS}, got {namespace!r}")
+    return namespace
+
+
+def _filter_sql(filter: Optional[Dict[str, Any]]) -> Tuple[List[str], list]:
+    """SQL conditions and parameters for a filter on top-level value fields, e.g. {"status": "done"}."""
+    conditions, params = [], []
+    for field, condition in (filter or {}).items():
+        operations = condition if isinstance(condition, dict) else {"$eq": condition}
+        for operator, operand in operations.items():
+            if operator not in _OPERATORS or isinstance(operand, (dict, list)):
+                raise ValueError(f"Unsupported filter {field!r}: {condition!r}")
+            conditions.append(f"json_extract(value, ?) {_OPERATORS[operator]} ?")
+            params += [f'$."{field}"', operand]
+    return conditions, params
+
+
+def _matches(namespace: Tuple[str, ...], condition: MatchCondition) -> bool:
+    path = tuple(condition.path)
+    if len(path) > len(namespace):
+        return False
+    part = namespace[:len(path)] if condition.match_type == "prefix" else namespace[len(namespace) - len(path):]
+    return all(p == "*" or p == n for p, n in zip(path, part))
+
+
+class MaistroSqliteStore(BaseStore):
+    """
+    BaseStore on a SQLite table laid out for the (memory_type, todo_category, user_id) namespaces.
+
+    The namespace parts are columns of a WITHOUT ROWID table whose primary key starts with
+    them, so a get, or a search of one user's memories or of any shorter prefix, is an index
+    range scan whatever the number of users. Search results come newest first from a
+    second index on updated_at. Values are stored as compact JSON text. The SQL text of each
+    statement is fixed, so that the connection's cache keeps it prepared. The writes of a
+    batch are applied in a single transaction, after its reads as in InMemoryStore. Search
+    ignores `query`: there is no vector index.
+
+    Args:
+        conn: Connection to use; see maistro_persistence.sqlite_connection()
+    """
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+        self.lock = threading.Lock()
+        self.is_setup = False
+
+    @classmethod
+    def from_path(cls, path: str) -> "MaistroSqliteStore":
+        """Open a store on a database file, in WAL mode, and create its table."""
+        from .maistro_persistence import sqlite_connection
+
+        store = cls(sqlite_connection(path))
+        store.setup()
+        return store
+
+    def setup(self) -> None:
+        """Create the table and indexes if they do not exist."""
+        with self.lock:
+            if not self.is_setup:
+                self.conn.executescript(_SCHEMA)
+                self.is_setup = True
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def _get(self, op: GetOp) -> Optional[Item]:
+        row = self.conn.execute(_GET, (*_namespace(op.namespace), op.key)).fetchone()
+        if row is None:
+            return None
+        key, value, created_at, updated_at = row
+        return Item(value=_loads(value), key=key, namespace=op.namespace,
+                    created_at=_timestamp(created_at), updated_at=_timestamp(updated_at))
+
+    def _search(self, op: SearchOp) -> List[SearchItem]:
+        prefix = tuple(op.namespace_prefix)
+        if len(prefix) > len(NAMESPACE_COLUMNS):
+            return []
+        # The SQL text only depends on the prefix length and the filter fields, so it is prepared once for each
+        filter_conditions, filter_params = _filter_sql(op.filter)
+        where = " AND ".join(_PREFIX_CONDITIONS[len(prefix)] + filter_conditions) or "1"
+        rows = self.conn.execute(_SEARCH.format(where=where),
+                                 (*prefix, *filter_params, op.limit, op.offset)).fetchall()
+        return [SearchItem(namespace=(memory_type, todo_category, user_id), key=key, value=_loads(value),
+                           created_at=_timestamp(created_at), updated_at=_timestamp(updated_at))
+                for memory_type, todo_category, user_id, key, value, created_at, updated_at in rows]
+
+    def _list_namespaces(self, op: ListNamespacesOp) -> List[Tuple[str, ...]]:
+        namespaces = {tuple(row) for row in self.conn.execute(_NAMESPACES)}
+        if op.match_conditions:
+            namespaces = {ns for ns in namespaces if all(_matches(ns, c) for c in op.match_conditions)}
+        if op.max_depth is not None:
+            namespaces = {ns[:op.max_depth] for ns in namespaces}
+        return sorted(namespaces)[op.offset:op.offset + op.limit]
+
+    def _write(self, puts: Dict[Tuple[Tuple[str, ...], str], PutOp]) -> None:
+        now = time.time()
+        upserts = [(*_namespace(op.namespace), op.key, _dumps(op.value), now, now)
+                   for op in puts.values() if op.value is not None]
+        deletes = [(*_namespace(op.namespace), op.key) for op in puts.values() if op.value is None]
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            if upserts:
+                self.conn.executemany(_UPSERT, upserts)
+            if deletes:
+                self.conn.executemany(_DELETE, deletes)
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+
+    def batch(self, ops: Iterable[Op]) -> List[Result]:
+        if not self.is_setup:
+            self.setup()
+        results: List[Result] = []
+        # The last put of a (namespace, key) wins, as in InMemoryStore
+        puts: Dict[Tuple[Tuple[str, ...], str], PutOp] = {}
+        with self.lock:
+            for op in ops:
+                if isinstance(op, GetOp):
+                    results.append(self._get(op))
+                elif isinstance(op, SearchOp):
+                    results.append(self._search(op))
+                elif isinstance(op, ListNamespacesOp):
+                    results.append(self._list_namespaces(op))
+                elif isinstance(op, PutOp):
+                    puts[(tuple(op.namespace), op.key)] = op
+                    results.append(None)
+                else:
+                    raise ValueError(f"Unknown operation type: {type(op)}")
+            if puts:
+                self._write(puts)
+        return results
+
+    async def abatch(self, ops: Iterable[Op]) -> List[Result]:
+        """Run batch() on a worker thread; sqlite3 has no async API."""
+        return await asyncio.to_thread(self.batch, list(ops))
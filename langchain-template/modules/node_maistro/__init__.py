@@ -6,38 +6,84 @@ These nodes implement the intelligent workflow that processes user interactions,
 and maintains persistent memory for user profiles, todos, and instructions.
 
 Workflow Overview:
+- manage_history: Keeps the chat history within history_token_budget, with a rolling summary
 - task_mAIstro: Main conversation node that processes user input and decides what to update
 - route_message: Conditional edge router that directs workflow based on update type
 - update_todos: Extracts and stores task information using Trustcall
 - update_profile: Extracts and stores user profile information using Trustcall
 - update_instructions: Updates user preferences for task management
+- route_update: Conditional edge that sends updates back to task_mAIstro, or to confirm_update
+- confirm_update: Reply after an update, when update_reply is "template" (the default, a fixed reply
+  without a model call) or "confirm" (one model call with a short prompt)
+
+The update nodes run their extraction through write_todos/write_profile/write_instructions. With
+memory_writes="background" they queue it to the shared MemoryWriter and answer the tool call at once.
+Each write function holds its namespace in maistro_locks.namespace_locks from read to write, so that
+concurrent turns of one user do not overwrite each other's updates.
+
+The nodes take their model and extractors from maistro_pool.maistro_models(): those of the TaskMaistro
+that built the graph, bound through their maistro argument, or the pooled ones of the model and
+temperature selected in the Configuration.
+
+The nodes call their models with invoke()/ainvoke() and the node's config. Under LangGraph's
+"messages" stream mode ("messages-tuple" over the API), the graph's callbacks make the chat model
+stream, so clients receive the task_mAIstro and confirm_update replies token by token, while the
+node still gets the complete AIMessage, tool calls included, for route_message.
+
+Each node has an async variant (atask_mAIstro, aupdate_todos, aupdate_profile, aupdate_instructions,
+aconfirm_update, amanage_history, aroute_message) that uses ainvoke() and the async store API, for graphs run under the LangGraph API server.
 
 Key Features:
 - Intelligent information extraction using Trustcall
-- Persistent memory storage with SQLite backend
+- Persistent memory in the LangGraph store injected by the API server, or in the backend given to TaskMaistro
 - Conditional workflow routing based on content analysis
 - Debug and logging capabilities for workflow inspection
 - Modular node design for easy testing and maintenance
 """
 
 # Import all workflow nodes
-from .node_task_mAIstro import task_mAIstro
-from .node_update_todos import update_todos
-from .node_update_profile import update_profile
-from .node_instructions import update_instructions
-from .cedge_route_message import route_message
+from .node_manage_history import manage_history, amanage_history
+from .node_task_mAIstro import task_mAIstro, atask_mAIstro
+from .node_update_todos import update_todos, aupdate_todos
+from .node_update_profile import update_profile, aupdate_profile
+from .node_instructions import update_instructions, aupdate_instructions
+from .node_confirm_update import confirm_update, aconfirm_update
+from .cedge_route_message import route_message, aroute_message, route_update
 
 # Main exports
 __all__ = [
+    'manage_history',
     'task_mAIstro',
     'update_todos',
     'update_profile',
     'update_instructions',
-    'route_message'
+    'route_message',
+    'route_update',
+    'confirm_update',
+    'amanage_history',
+    'atask_mAIstro',
+    'aupdate_todos',
+    'aupdate_profile',
+    'aupdate_instructions',
+    'aconfirm_update',
+    'aroute_message'
 ]
 
 # Node Descriptions
 __node_descriptions__ = {
+    'manage_history': {
+        'description': 'Entry node that bounds the chat history sent to the model',
+        'purpose': 'Trims the oldest turns once the history exceeds history_token_budget',
+        'inputs': 'TaskMaistroState with the chat history and summary, RunnableConfig',
+        'outputs': 'RemoveMessage updates for the trimmed turns and the extended summary',
+        'key_features': [
+            'Approximate token counting without a tokenizer call',
+            'Trims down to half the budget, so summarization runs once every few turns',
+            'Cuts only before human messages, keeping tool calls with their results',
+            'Rolling summary is added to the task_mAIstro system prompt'
+        ]
+    },
+
     'task_mAIstro': {
         'description': 'Main conversation processing node that handles user input and decides what memory to update',
         'purpose': 'Analyzes user messages and determines whether to update user profile, todos, or instructions',
@@ -104,14 +150,28 @@ __node_descriptions__ = {
             'Overwrites existing instructions with new preferences',
             'Improves task management based on user feedback'
         ]
+    },
+
+    'confirm_update': {
+        'description': 'Lightweight reply node used after memory updates when update_reply is "confirm" or "template"',
+        'purpose': 'Ends the turn with a fixed confirmation ("template"), one model call fewer than going back to task_mAIstro, or a short model reply ("confirm")',
+        'inputs': 'MessagesState with the tool results of the update nodes, RunnableConfig',
+        'outputs': 'MessagesState with the final AI response',
+        'key_features': [
+            'With "template", a turn that updates memory makes one model call fewer',
+            'With "confirm", the prompt holds only the last user message and the update results; the call count is that of "agent"',
+            'Does not read the store or re-send the memory prompt',
+            'Selected per request through the update_reply configuration field'
+        ]
     }
 }
 
 # Workflow Architecture
 __workflow_architecture__ = {
     'flow': [
-        'START → task_mAIstro → route_message → [update_todos|update_profile|update_instructions] → task_mAIstro',
-        'Each update node returns to task_mAIstro for continued conversation'
+        'START → manage_history → task_mAIstro → route_message → [update_todos|update_profile|update_instructions] → confirm_update → END',
+        'By default (update_reply="template") and with "confirm", each update node ends the turn through confirm_update',
+        'With update_reply="agent": [update_todos|update_profile|update_instructions] → task_mAIstro for continued conversation'
     ],
     'memory_types': {
         'profile': 'User personal information (name, location, job, connections, interests)',
@@ -119,7 +179,7 @@ __workflow_architecture__ = {
         'instructions': 'User preferences for task management behavior'
     },
     'storage': {
-        'backend': 'SQLite via LangGraph checkpoint store',
+        'backend': 'Store injected by the LangGraph API server, or TaskMaistro(persistence="memory"|"sqlite"|"postgres")',
         'namespacing': 'Organized by (memory_type, todo_category, user_id)',
         'persistence': 'Long-term memory across conversation sessions'
     }
@@ -2,32 +2,55 @@
 Conditional edge for the Maistro chatbot
 """
 
-from typing import Literal
+from typing import Literal, Union
 from langgraph.graph import END
+from langgraph.types import Send
 from langgraph.graph.message import MessagesState
 from langchain_core.runnables import RunnableConfig
 from langgraph.store.base import BaseStore
+from .. import configuration
 from ..debug_langgraph import debug_conditional_edge
 
 
-def route_message(state: MessagesState, config: RunnableConfig, store: BaseStore) -> Literal[END, "update_todos", "update_instructions", "update_profile"]:
-    """Reflect on the memories and chat history to decide whether to update the memory collection."""
+# Update node for each UpdateMemory update_type
+UPDATE_NODES = {
+    "user": "update_profile",
+    "todo": "update_todos",
+    "instructions": "update_instructions",
+}
+
+
+def route_message(state: MessagesState, config: RunnableConfig, store: BaseStore) -> Union[Literal[END], list[Send]]:
+    """Reflect on the memories and chat history to decide whether to update the memory collection.
+
+    Every update type requested in the last message gets its own Send, so that the update nodes
+    run concurrently in one superstep; each node answers the tool calls of its own type.
+    """
     message = state['messages'][-1]
     if len(message.tool_calls) == 0:
         return END
-    else:
-        tool_call = message.tool_calls[0]
-        if tool_call['args']['update_type'] == "user":
-            debug_conditional_edge("route_message", "update_profile", message)
-            return "update_profile"
-        elif tool_call['args']['update_type'] == "todo":
-            debug_conditional_edge("route_message", "update_todos", message)
-            return "update_todos"
-        elif tool_call['args']['update_type'] == "instructions":
-            debug_conditional_edge(
-                "route_message", "update_instructions", message)
-            return "update_instructions"
-        else:
+    sends = []
+    for update_type in dict.fromkeys(tool_call['args']['update_type'] for tool_call in message.tool_calls):
+        node = UPDATE_NODES.get(update_type)
+        if node is None:
             debug_conditional_edge("route_message", "END",
                                    "Unknown update type -> raise ValueError")
-            raise ValueError
+            raise ValueError(f"Unknown update type: {update_type!r}")
+        debug_conditional_edge("route_message", node, message)
+        sends.append(Send(node, state))
+    return sends
+
+
+async def aroute_message(state: MessagesState, config: RunnableConfig, store: BaseStore) -> Union[Literal[END], list[Send]]:
+    """Async version of route_message(); routing never touches the store or the model."""
+    return route_message(state, config, store)
+
+
+def route_update(state: MessagesState, config: RunnableConfig) -> Literal["task_mAIstro", "confirm_update"]:
+    """After a memory update, reply through task_mAIstro or confirm_update, per the update_reply setting."""
+    configurable = configuration.Configuration.from_runnable_config(config)
+    if configurable.update_reply in ("confirm", "template"):
+        debug_conditional_edge("route_update", "confirm_update", configurable.update_reply)
+        return "confirm_update"
+    debug_conditional_edge("route_update", "task_mAIstro", configurable.update_reply)
+    return "task_mAIstro"
@@ -0,0 +1,75 @@
+"""
+Node definitions for the Maistro chatbot
+"""
+
+from typing import Optional
+from langgraph.graph import MessagesState
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+from langchain_core.runnables import RunnableConfig
+from .. import configuration
+from ..maistro_prompt import CONFIRM_UPDATE_MESSAGE, CONFIRM_TODO_REPLY, CONFIRM_MEMORY_REPLY
+from ..debug_langgraph import debug_messages, debug_response
+from ..maistro_abstract import AbstractMaistro
+from ..maistro_pool import maistro_models
+
+
+def _turn(state: MessagesState):
+    """Return the user's last message, the update types requested and the update results of this turn."""
+    user_message, update_types, updates = None, [], []
+    for message in reversed(state["messages"]):
+        if isinstance(message, ToolMessage):
+            updates.append(str(message.content))
+        elif isinstance(message, AIMessage) and message.tool_calls:
+            update_types += [tool_call["args"].get("update_type") for tool_call in message.tool_calls]
+        elif isinstance(message, HumanMessage):
+            user_message = message
+            break
+    return user_message, update_types, list(reversed(updates))
+
+
+def _prepare(state: MessagesState, configurable: configuration.Configuration):
+    """Build the confirmation prompt from the user's last message and the update results."""
+    user_message, _, updates = _turn(state)
+    system_msg = CONFIRM_UPDATE_MESSAGE.format(
+        task_maistro_role=configurable.task_maistro_role, updates="\n".join(updates))
+    messages = [SystemMessage(content=system_msg)] + ([user_message] if user_message else [])
+
+    debug_messages("confirm_update", {"messages": messages})
+    return messages
+
+
+def _template_reply(state: MessagesState) -> AIMessage:
+    """Fixed reply that only mentions ToDo updates, following the rules of MODEL_SYSTEM_MESSAGE."""
+    _, update_types, _ = _turn(state)
+    return AIMessage(content=CONFIRM_TODO_REPLY if "todo" in update_types else CONFIRM_MEMORY_REPLY)
+
+
+def confirm_update(state: MessagesState, config: RunnableConfig,
+                   maistro: Optional[AbstractMaistro] = None):
+    """
+    Reply to the user after a memory update: with a fixed reply for update_reply="template", or with
+    one model call whose prompt holds only the last user message and the update results for "confirm".
+    """
+    configurable = configuration.Configuration.from_runnable_config(config)
+
+    if configurable.update_reply == "template":
+        response = _template_reply(state)
+    else:
+        response = maistro_models(configurable, maistro).model.invoke(_prepare(state, configurable), config)
+
+    debug_response("confirm_update", response)
+    return {"messages": [response]}
+
+
+async def aconfirm_update(state: MessagesState, config: RunnableConfig,
+                          maistro: Optional[AbstractMaistro] = None):
+    """Async version of confirm_update()."""
+    configurable = configuration.Configuration.from_runnable_config(config)
+
+    if configurable.update_reply == "template":
+        response = _template_reply(state)
+    else:
+        response = await maistro_models(configurable, maistro).model.ainvoke(_prepare(state, configurable), config)
+
+    debug_response("confirm_update", response)
+    return {"messages": [response]}
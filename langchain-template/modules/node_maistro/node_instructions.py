@@ -1,49 +1,166 @@
 """
 Node definitions for the Maistro chatbot
 """
-from langchain_core.messages import HumanMessage, SystemMessage
+from typing import Optional
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
 from langgraph.graph import MessagesState
 from langchain_core.runnables import RunnableConfig
 from langgraph.store.base import BaseStore
 from .. import configuration
 from ..maistro_prompt import CREATE_INSTRUCTIONS
+from ..utils_tool import update_tool_call_ids
 from ..debug_langgraph import debug_messages, debug_response
-from ..core_instance import get_instance
+from ..maistro_abstract import AbstractMaistro
+from ..maistro_pool import maistro_models
+from ..maistro_cache import memory_cache, instructions_cache
+from ..maistro_background import memory_writer, MEMORY_UPDATE_QUEUED
+from ..maistro_locks import namespace_locks
 
+INSTRUCTIONS_KEY = "user_instructions"
+UPDATE_TYPE = "instructions"
 
-def update_instructions(state: MessagesState, config: RunnableConfig, store: BaseStore):
-    """Reflect on the chat history and update the memory collection."""
-
-    # Get the user ID from the config
-    configurable = configuration.Configuration.from_runnable_config(config)
-    user_id = configurable.user_id
-    todo_category = configurable.todo_category
-
-    namespace = ("instructions", todo_category, user_id)
-
-    existing_memory = store.get(namespace, "user_instructions")
 
+def _prepare(messages: list[BaseMessage], existing_memory):
+    """Format the memory in the system prompt."""
     debug_messages("update_instructions", {
         "existing_memory": existing_memory,
     })
 
-    # Format the memory in the system prompt
     system_msg = CREATE_INSTRUCTIONS.format(
         current_instructions=existing_memory.value if existing_memory else None)
-    new_memory = get_instance("task_maistro").model.invoke([SystemMessage(content=system_msg)]+state['messages'][:-1] + [
-        HumanMessage(content="Please update the instructions based on the conversation")])
+    return [SystemMessage(content=system_msg)] + messages + [
+        HumanMessage(content="Please update the instructions based on the conversation")]
 
-    debug_messages("update_instructions", {
-        "new_memory": new_memory,
-    })
-
-    # Overwrite the existing memory in the store
-    key = "user_instructions"
-    store.put(namespace, key, {"memory": new_memory.content})
-    tool_calls = state['messages'][-1].tool_calls
 
-    # Return tool message with update verification
+def _response(state: MessagesState, content: str):
+    """Return a tool message with update verification for each instructions update requested."""
     return_msg = {"messages": [
-        {"role": "tool", "content": "updated instructions", "tool_call_id": tool_calls[0]['id']}]}
+        {"role": "tool", "content": content, "tool_call_id": tool_call_id}
+        for tool_call_id in update_tool_call_ids(state['messages'][-1], UPDATE_TYPE)]}
     debug_response("update_instructions", return_msg)
     return return_msg
+
+
+def _current_instructions(existing_memory) -> Optional[str]:
+    """Text of the stored instructions, None if there are none yet."""
+    return existing_memory.value.get("memory") if existing_memory else None
+
+
+def _cached(messages: list[BaseMessage], configurable: configuration.Configuration,
+            current: Optional[str]) -> tuple[Optional[str], Optional[str]]:
+    """Return the cache key and the cached rewrite for these inputs, (None, None) with the cache off."""
+    if not configurable.cache_instructions:
+        return None, None
+    key = instructions_cache.key(configurable.todo_category, configurable.user_id, current, messages)
+    return key, instructions_cache.get(key)
+
+
+def _unchanged(current: Optional[str], instructions: str) -> bool:
+    """Whether the rewrite equals the stored instructions, so the store write can be skipped."""
+    if instructions != current:
+        return False
+    instructions_cache.record_unchanged()
+    debug_messages("update_instructions", {"unchanged": True})
+    return True
+
+
+def write_instructions(messages: list[BaseMessage], configurable: configuration.Configuration, store: BaseStore,
+                       maistro: Optional[AbstractMaistro] = None) -> str:
+    """Rewrite the ToDo list instructions from the chat history and save them to the store."""
+
+    namespace = ("instructions", configurable.todo_category, configurable.user_id)
+
+    # Hold the namespace, so that a concurrent turn of the same user rewrites this turn's instructions
+    with namespace_locks.hold(namespace):
+        existing_memory = store.get(namespace, INSTRUCTIONS_KEY)
+        current = _current_instructions(existing_memory)
+
+        # This user's instructions were rewritten before for the same turn: reuse the result
+        key, instructions = _cached(messages, configurable, current)
+        if instructions is None:
+            new_memory = maistro_models(configurable, maistro).model.invoke(
+                _prepare(messages, existing_memory))
+
+            debug_messages("update_instructions", {
+                "new_memory": new_memory,
+            })
+            instructions = new_memory.content
+            if key is not None:
+                instructions_cache.put(key, instructions)
+
+        if _unchanged(current, instructions):
+            return "instructions unchanged"
+
+        # Overwrite the existing memory in the store
+        store.put(namespace, INSTRUCTIONS_KEY, {"memory": instructions})
+        memory_cache.invalidate(store, configurable.todo_category, configurable.user_id)
+        return "updated instructions"
+
+
+async def awrite_instructions(messages: list[BaseMessage], configurable: configuration.Configuration, store: BaseStore,
+                              maistro: Optional[AbstractMaistro] = None) -> str:
+    """Async version of write_instructions()."""
+
+    namespace = ("instructions", configurable.todo_category, configurable.user_id)
+
+    # Hold the namespace, so that a concurrent turn of the same user rewrites this turn's instructions
+    async with namespace_locks.ahold(namespace):
+        existing_memory = await store.aget(namespace, INSTRUCTIONS_KEY)
+        current = _current_instructions(existing_memory)
+
+        # This user's instructions were rewritten before for the same turn: reuse the result
+        key, instructions = _cached(messages, configurable, current)
+        if instructions is None:
+            new_memory = await maistro_models(configurable, maistro).model.ainvoke(
+                _prepare(messages, existing_memory))
+
+            debug_messages("update_instructions", {
+                "new_memory": new_memory,
+            })
+            instructions = new_memory.content
+            if key is not None:
+                instructions_cache.put(key, instructions)
+
+        if _unchanged(current, instructions):
+            return "instructions unchanged"
+
+        # Overwrite the existing memory in the store
+        await store.aput(namespace, INSTRUCTIONS_KEY, {"memory": instructions})
+        memory_cache.invalidate(store, configurable.todo_category, configurable.user_id)
+        return "updated instructions"
+
+
+def update_instructions(state: MessagesState, config: RunnableConfig, store: BaseStore,
+                        maistro: Optional[AbstractMaistro] = None):
+    """Reflect on the chat history and update the memory collection."""
+
+    # Get the user ID from the config
+    configurable = configuration.Configuration.from_runnable_config(config)
+
+    # The chat history without the tool call being answered
+    messages = state["messages"][:-1]
+
+    if configurable.memory_writes == "background":
+        memory_writer.submit(configurable.todo_category, configurable.user_id,
+                             write_instructions, messages, configurable, store, maistro)
+        return _response(state, MEMORY_UPDATE_QUEUED)
+
+    return _response(state, write_instructions(messages, configurable, store, maistro))
+
+
+async def aupdate_instructions(state: MessagesState, config: RunnableConfig, store: BaseStore,
+                               maistro: Optional[AbstractMaistro] = None):
+    """Async version of update_instructions()."""
+
+    # Get the user ID from the config
+    configurable = configuration.Configuration.from_runnable_config(config)
+
+    # The chat history without the tool call being answered
+    messages = state["messages"][:-1]
+
+    if configurable.memory_writes == "background":
+        memory_writer.submit(configurable.todo_category, configurable.user_id,
+                             write_instructions, messages, configurable, store, maistro)
+        return _response(state, MEMORY_UPDATE_QUEUED)
+
+    return _response(state, await awrite_instructions(messages, configurable, store, maistro))
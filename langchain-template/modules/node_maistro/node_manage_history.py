@@ -0,0 +1,97 @@
+"""
+Node definitions for the Maistro chatbot
+"""
+
+from typing import Optional
+from langchain_core.messages import BaseMessage, HumanMessage, RemoveMessage, get_buffer_string
+from langchain_core.runnables import RunnableConfig
+from .. import configuration
+from ..maistro_prompt import CREATE_SUMMARY, EXTEND_SUMMARY
+from ..maistro_schema import TaskMaistroState
+from ..utils_token import approx_tokens
+from ..debug_langgraph import debug_messages, debug_response
+from ..maistro_abstract import AbstractMaistro
+from ..maistro_pool import maistro_models
+
+
+def _split(messages: list[BaseMessage], budget: int) -> tuple[list[BaseMessage], list[BaseMessage]]:
+    """Split the history into the turns to trim and the turns to keep.
+
+    Nothing is trimmed while the history fits the budget. Past it, the newest turns that fit
+    in half the budget are kept, so trimming happens once every few turns rather than on
+    each one. The cut is always made before a human message, so tool calls stay with their
+    tool messages, and the current turn is always kept.
+    """
+    if budget <= 0 or approx_tokens(messages) <= budget:
+        return [], messages
+    cut, kept_tokens = len(messages), 0
+    for i in range(len(messages) - 1, -1, -1):
+        kept_tokens += approx_tokens(messages[i])
+        if kept_tokens > budget // 2 and cut < len(messages):
+            break
+        if isinstance(messages[i], HumanMessage):
+            cut = i
+    return messages[:cut], messages[cut:]
+
+
+def _prepare(summary: str, trimmed: list[BaseMessage], budget: int) -> list[BaseMessage]:
+    """Summarization prompt: a transcript of the newest trimmed messages that fit the budget, then the instruction.
+
+    A transcript rather than the messages themselves, so that tool calls cut off at the window
+    start cannot make the request invalid.
+    """
+    messages, tokens = [], 0
+    for message in reversed(trimmed):
+        tokens += approx_tokens(message)
+        if tokens > budget and messages:
+            break
+        messages.append(message)
+    instruction = EXTEND_SUMMARY.format(summary=summary) if summary else CREATE_SUMMARY
+    return [HumanMessage(content=get_buffer_string(list(reversed(messages))) + "\n\n" + instruction)]
+
+
+def _response(trimmed: list[BaseMessage], summary: Optional[str] = None):
+    """Remove the trimmed messages from the state, and store the new summary if there is one."""
+    return_msg = {"messages": [RemoveMessage(id=m.id) for m in trimmed]}
+    if summary is not None:
+        return_msg["summary"] = summary
+    debug_response("manage_history", return_msg)
+    return return_msg
+
+
+def manage_history(state: TaskMaistroState, config: RunnableConfig,
+                   maistro: Optional[AbstractMaistro] = None):
+    """Keep the chat history within the token budget, folding trimmed turns into the summary."""
+
+    configurable = configuration.Configuration.from_runnable_config(config)
+    trimmed, kept = _split(state["messages"], configurable.history_token_budget)
+    if not trimmed:
+        return {}
+
+    debug_messages("manage_history", {"trimmed": len(trimmed), "kept": len(kept)})
+
+    if not configurable.summarize_history:
+        return _response(trimmed)
+
+    summary = maistro_models(configurable, maistro).model.invoke(
+        _prepare(state.get("summary", ""), trimmed, configurable.history_token_budget))
+    return _response(trimmed, summary.content)
+
+
+async def amanage_history(state: TaskMaistroState, config: RunnableConfig,
+                          maistro: Optional[AbstractMaistro] = None):
+    """Async version of manage_history()."""
+
+    configurable = configuration.Configuration.from_runnable_config(config)
+    trimmed, kept = _split(state["messages"], configurable.history_token_budget)
+    if not trimmed:
+        return {}
+
+    debug_messages("manage_history", {"trimmed": len(trimmed), "kept": len(kept)})
+
+    if not configurable.summarize_history:
+        return _response(trimmed)
+
+    summary = await maistro_models(configurable, maistro).model.ainvoke(
+        _prepare(state.get("summary", ""), trimmed, configurable.history_token_budget))
+    return _response(trimmed, summary.content)
@@ -2,58 +2,97 @@
 Node definitions for the Maistro chatbot
 """
 
-from langgraph.graph import MessagesState
+from typing import Optional
 from langchain_core.runnables import RunnableConfig
-from langchain_core.messages import SystemMessage
+from langchain_core.messages import BaseMessage, SystemMessage
 from langgraph.store.base import BaseStore
-from ..maistro_prompt import MODEL_SYSTEM_MESSAGE
-from ..maistro_schema import UpdateMemory
+from ..maistro_prompt import MODEL_SYSTEM_MESSAGE, CONVERSATION_SUMMARY
+from ..maistro_schema import TaskMaistroState
+from ..maistro_memory import MemorySnapshot, load_memory, aload_memory
+from ..maistro_cache import memory_cache
+from ..maistro_prompt_builder import prompt_builder
+from ..utils_todo import todos_in_context
+from ..todo_index import retrieve_todos, aretrieve_todos
 from ..debug_langgraph import debug_messages, debug_response
 from .. import configuration
-from ..core_instance import get_instance
+from ..maistro_abstract import AbstractMaistro
+from ..maistro_pool import maistro_models
 
 
-def task_mAIstro(state: MessagesState, config: RunnableConfig, store: BaseStore):
+def _prompt(configurable: configuration.Configuration, memory: MemorySnapshot, state: TaskMaistroState,
+            retrieved: list) -> list[BaseMessage]:
+    """Format the memory snapshot, with only the relevant todos, and the history summary into the prompt."""
+    todos = todos_in_context(memory.todos, configurable, state["messages"], retrieved)
+    summary = state.get("summary", "")
+    if configurable.prompt_token_budget > 0:
+        system_msg, history = prompt_builder.build(
+            memory, todos, state["messages"], configurable.task_maistro_role,
+            configurable.prompt_token_budget, summary)
+        return [SystemMessage(content=system_msg)] + history
+    system_msg = MODEL_SYSTEM_MESSAGE.format(
+        task_maistro_role=configurable.task_maistro_role, user_profile=memory.profile, todo=memory.format_todos(todos), instructions=memory.instructions)
+    if summary:
+        system_msg += CONVERSATION_SUMMARY.format(summary=summary)
+    return [SystemMessage(content=system_msg)] + state["messages"]
+
+
+def task_mAIstro(state: TaskMaistroState, config: RunnableConfig, store: BaseStore,
+                 maistro: Optional[AbstractMaistro] = None):
     """Load memories from the store and use them to personalize the chatbot's response."""
 
     # Get the user ID from the config
     configurable = configuration.Configuration.from_runnable_config(config)
     user_id = configurable.user_id
     todo_category = configurable.todo_category
-    task_maistro_role = configurable.task_maistro_role
-
-   # Retrieve profile memory from the store
-    namespace = ("profile", todo_category, user_id)
-    memories = store.search(namespace)
-    if memories:
-        user_profile = memories[0].value
-    else:
-        user_profile = None
-
-    # Retrieve people memory from the store
-    namespace = ("todo", todo_category, user_id)
-    memories = store.search(namespace)
-    todo = "\n".join(f"{mem.value}" for mem in memories)
-
-    # Retrieve custom instructions
-    namespace = ("instructions", todo_category, user_id)
-    memories = store.search(namespace)
-    if memories:
-        instructions = memories[0].value
-    else:
-        instructions = ""
 
-    system_msg = MODEL_SYSTEM_MESSAGE.format(
-        task_maistro_role=task_maistro_role, user_profile=user_profile, todo=todo, instructions=instructions)
+    # Retrieve the profile, ToDo list and custom instructions in one store round trip,
+    # unless they are still cached from a previous turn
+    memory = memory_cache.get_or_load(
+        store, todo_category, user_id, configurable.todo_fetch_limit,
+        lambda: load_memory(store, todo_category, user_id, configurable.todo_fetch_limit))
+
+    # The todos most similar to the request, also among those beyond the snapshot's fetch limit
+    retrieved = retrieve_todos(store, configurable, state["messages"], memory.todos)
+
+    prompt = _prompt(configurable, memory, state, retrieved)
+
+    debug_messages("task_mAIstro", {
+        "prompt": prompt,
+    })
+
+    # Respond using memory as well as the chat history. Under the "messages" stream mode, the
+    # graph's callbacks in config receive the reply token by token
+    response = maistro_models(configurable, maistro).memory_model.invoke(prompt, config)
+
+    debug_response("task_mAIstro", response)
+
+    return {"messages": [response]}
+
+
+async def atask_mAIstro(state: TaskMaistroState, config: RunnableConfig, store: BaseStore,
+                        maistro: Optional[AbstractMaistro] = None):
+    """Async version of task_mAIstro()."""
+
+    # Get the user ID from the config
+    configurable = configuration.Configuration.from_runnable_config(config)
+    user_id = configurable.user_id
+    todo_category = configurable.todo_category
+
+    # Retrieve the memory snapshot without blocking the event loop
+    memory = await memory_cache.aget_or_load(
+        store, todo_category, user_id, configurable.todo_fetch_limit,
+        lambda: aload_memory(store, todo_category, user_id, configurable.todo_fetch_limit))
+
+    retrieved = await aretrieve_todos(store, configurable, state["messages"], memory.todos)
+
+    prompt = _prompt(configurable, memory, state, retrieved)
 
     debug_messages("task_mAIstro", {
-        "system_msg": system_msg,
-        "state['messages']": state["messages"],
+        "prompt": prompt,
     })
 
     # Respond using memory as well as the chat history
-    response = get_instance("task_maistro").model.bind_tools([UpdateMemory], parallel_tool_calls=False).invoke(
-        [SystemMessage(content=system_msg)]+state["messages"])
+    response = await maistro_models(configurable, maistro).memory_model.ainvoke(prompt, config)
 
     debug_response("task_mAIstro", response)
 
@@ -2,35 +2,29 @@
 Node definitions for the Maistro chatbot
 """
 
-import uuid
-from datetime import datetime
+from typing import Optional
 from langgraph.graph import MessagesState
 from langchain_core.runnables import RunnableConfig
 from langgraph.store.base import BaseStore
-from langchain_core.messages import SystemMessage, merge_message_runs
+from langchain_core.messages import BaseMessage, SystemMessage, merge_message_runs
 from ..debug_langgraph import debug_messages, debug_response, debug_result
-from ..maistro_prompt import TRUSTCALL_INSTRUCTION
-from ..core_instance import get_instance
+from ..maistro_prompt import TRUSTCALL_INSTRUCTION, prompt_time
+from ..utils_tool import update_tool_call_ids
+from ..utils_store import plan_writes, apply_writes, aapply_writes
+from ..maistro_abstract import AbstractMaistro
+from ..maistro_pool import maistro_models
+from ..maistro_cache import memory_cache
+from ..maistro_background import memory_writer, MEMORY_UPDATE_QUEUED
+from ..maistro_locks import namespace_locks
 from .. import configuration
 
+TOOL_NAME = "Profile"
+UPDATE_TYPE = "user"
 
-def update_profile(state: MessagesState, config: RunnableConfig, store: BaseStore):
-    """Reflect on the chat history and update the memory collection."""
-
-    # Get the user ID from the config
-    configurable = configuration.Configuration.from_runnable_config(config)
-    user_id = configurable.user_id
-    todo_category = configurable.todo_category
-
-    # Define the namespace for the memories
-    namespace = ("profile", todo_category, user_id)
 
-    # Retrieve the most recent memories for context
-    existing_items = store.search(namespace)
-
-    # Format the existing memories for the Trustcall extractor
-    tool_name = "Profile"
-    existing_memories = ([(existing_item.key, tool_name, existing_item.value)
+def _prepare(messages: list[BaseMessage], existing_items):
+    """Format the existing memories and the chat history for the Trustcall extractor."""
+    existing_memories = ([(existing_item.key, TOOL_NAME, existing_item.value)
                           for existing_item in existing_items]
                          if existing_items
                          else None
@@ -38,32 +32,112 @@ def update_profile(state: MessagesState, config: RunnableConfig, store: BaseStor
 
     # Merge the chat history and the instruction
     TRUSTCALL_INSTRUCTION_FORMATTED = TRUSTCALL_INSTRUCTION.format(
-        time=datetime.now().isoformat())
+        time=prompt_time())
     updated_messages = list(merge_message_runs(messages=[SystemMessage(
-        content=TRUSTCALL_INSTRUCTION_FORMATTED)] + state["messages"][:-1]))
+        content=TRUSTCALL_INSTRUCTION_FORMATTED)] + messages))
 
     debug_messages("update_profile", {
-        "state['messages']": state["messages"],
+        "messages": messages,
         "updated_messages": updated_messages,
         "existing_memories": existing_memories,
     })
+    return updated_messages, existing_memories
 
-    # Invoke the extractor
-    result = get_instance("task_maistro").profile_extractor.invoke({"messages": updated_messages,
-                                                                    "existing": existing_memories})
-
-    debug_result("update_profile", "profile_extractor.invoke", result)
-
-    # Save save the memories from Trustcall to the store
-    for r, rmeta in zip(result["responses"], result["response_metadata"]):
-        store.put(namespace,
-                  rmeta.get("json_doc_id", str(uuid.uuid4())),
-                  r.model_dump(mode="json"),
-                  )
-    tool_calls = state['messages'][-1].tool_calls
 
-    # Return tool message with update verification
+def _response(state: MessagesState, content: str):
+    """Return a tool message with update verification for each profile update requested."""
     return_msg = {"messages": [
-        {"role": "tool", "content": "updated profile", "tool_call_id": tool_calls[0]['id']}]}
+        {"role": "tool", "content": content, "tool_call_id": tool_call_id}
+        for tool_call_id in update_tool_call_ids(state['messages'][-1], UPDATE_TYPE)]}
     debug_response("update_profile", return_msg)
     return return_msg
+
+
+def write_profile(messages: list[BaseMessage], configurable: configuration.Configuration, store: BaseStore,
+                  maistro: Optional[AbstractMaistro] = None) -> str:
+    """Extract the user profile from the chat history and save it to the store."""
+
+    # Define the namespace for the memories
+    namespace = ("profile", configurable.todo_category, configurable.user_id)
+
+    # Hold the namespace, so that a concurrent turn of the same user extracts from this turn's writes
+    with namespace_locks.hold(namespace):
+        # Retrieve the most recent memories for context
+        existing_items = store.search(namespace)
+        updated_messages, existing_memories = _prepare(messages, existing_items)
+
+        # Invoke the extractor
+        result = maistro_models(configurable, maistro).profile_extractor.invoke({"messages": updated_messages,
+                                                                           "existing": existing_memories})
+
+        debug_result("update_profile", "profile_extractor.invoke", result)
+
+        # Save the changed memories from Trustcall to the store, in one batch
+        plan = apply_writes(store, plan_writes(namespace, result, existing_items))
+        debug_messages("update_profile", {"writes": plan.counts()})
+        if plan.puts:
+            memory_cache.invalidate(store, configurable.todo_category, configurable.user_id)
+    return "updated profile"
+
+
+async def awrite_profile(messages: list[BaseMessage], configurable: configuration.Configuration, store: BaseStore,
+                         maistro: Optional[AbstractMaistro] = None) -> str:
+    """Async version of write_profile()."""
+
+    # Define the namespace for the memories
+    namespace = ("profile", configurable.todo_category, configurable.user_id)
+
+    # Hold the namespace, so that a concurrent turn of the same user extracts from this turn's writes
+    async with namespace_locks.ahold(namespace):
+        # Retrieve the most recent memories for context
+        existing_items = await store.asearch(namespace)
+        updated_messages, existing_memories = _prepare(messages, existing_items)
+
+        # Invoke the extractor
+        result = await maistro_models(configurable, maistro).profile_extractor.ainvoke({"messages": updated_messages,
+                                                                                  "existing": existing_memories})
+
+        debug_result("update_profile", "profile_extractor.ainvoke", result)
+
+        # Save the changed memories from Trustcall to the store, in one batch
+        plan = await aapply_writes(store, plan_writes(namespace, result, existing_items))
+        debug_messages("update_profile", {"writes": plan.counts()})
+        if plan.puts:
+            memory_cache.invalidate(store, configurable.todo_category, configurable.user_id)
+    return "updated profile"
+
+
+def update_profile(state: MessagesState, config: RunnableConfig, store: BaseStore,
+                   maistro: Optional[AbstractMaistro] = None):
+    """Reflect on the chat history and update the memory collection."""
+
+    # Get the user ID from the config
+    configurable = configuration.Configuration.from_runnable_config(config)
+
+    # The chat history without the tool call being answered
+    messages = state["messages"][:-1]
+
+    if configurable.memory_writes == "background":
+        memory_writer.submit(configurable.todo_category, configurable.user_id,
+                             write_profile, messages, configurable, store, maistro)
+        return _response(state, MEMORY_UPDATE_QUEUED)
+
+    return _response(state, write_profile(messages, configurable, store, maistro))
+
+
+async def aupdate_profile(state: MessagesState, config: RunnableConfig, store: BaseStore,
+                          maistro: Optional[AbstractMaistro] = None):
+    """Async version of update_profile()."""
+
+    # Get the user ID from the config
+    configurable = configuration.Configuration.from_runnable_config(config)
+
+    # The chat history without the tool call being answered
+    messages = state["messages"][:-1]
+
+    if configurable.memory_writes == "background":
+        memory_writer.submit(configurable.todo_category, configurable.user_id,
+                             write_profile, messages, configurable, store, maistro)
+        return _response(state, MEMORY_UPDATE_QUEUED)
+
+    return _response(state, await awrite_profile(messages, configurable, store, maistro))
@@ -2,39 +2,32 @@
 Node definitions for the Maistro chatbot
 """
 
-import uuid
-from datetime import datetime
+from typing import Optional
 from langgraph.graph import MessagesState
 from langgraph.store.base import BaseStore
-from trustcall import create_extractor
-from langchain_core.messages import SystemMessage, merge_message_runs
+from langchain_core.messages import BaseMessage, SystemMessage, merge_message_runs
 from langchain_core.runnables import RunnableConfig
 from .. import configuration
 from ..debug_langgraph import debug_messages, debug_response, debug_result
-from ..maistro_prompt import TRUSTCALL_INSTRUCTION
-from ..maistro_schema import ToDo
+from ..maistro_prompt import TRUSTCALL_INSTRUCTION, prompt_time
 from ..utils_spy import Spy
-from ..utils_tool import extract_tool_info
-from ..core_instance import get_instance
-
-
-def update_todos(state: MessagesState, config: RunnableConfig, store: BaseStore):
-    """Reflect on the chat history and update the memory collection."""
-
-    # Get the user ID from the config
-    configurable = configuration.Configuration.from_runnable_config(config)
-    user_id = configurable.user_id
-    todo_category = configurable.todo_category
-
-    # Define the namespace for the memories
-    namespace = ("todo", todo_category, user_id)
-
-    # Retrieve the most recent memories for context
-    existing_items = store.search(namespace)
-
-    # Format the existing memories for the Trustcall extractor
-    tool_name = "ToDo"
-    existing_memories = ([(existing_item.key, tool_name, existing_item.value)
+from ..utils_tool import extract_tool_info, update_tool_call_ids
+from ..utils_store import plan_writes, apply_writes, aapply_writes
+from ..maistro_abstract import AbstractMaistro
+from ..maistro_pool import maistro_models
+from ..maistro_cache import memory_cache
+from ..maistro_background import memory_writer, MEMORY_UPDATE_QUEUED
+from ..maistro_locks import namespace_locks
+from ..utils_todo import todos_in_context
+from ..todo_index import todo_indexes, retrieve_todos, aretrieve_todos
+
+TOOL_NAME = "ToDo"
+UPDATE_TYPE = "todo"
+
+
+def _prepare(messages: list[BaseMessage], existing_items):
+    """Format the existing memories and the chat history for the Trustcall extractor."""
+    existing_memories = ([(existing_item.key, TOOL_NAME, existing_item.value)
                           for existing_item in existing_items]
                          if existing_items
                          else None
@@ -42,46 +35,145 @@ def update_todos(state: MessagesState, config: RunnableConfig, store: BaseStore)
 
     # Merge the chat history and the instruction
     TRUSTCALL_INSTRUCTION_FORMATTED = TRUSTCALL_INSTRUCTION.format(
-        time=datetime.now().isoformat())
+        time=prompt_time())
     updated_messages = list(merge_message_runs(messages=[SystemMessage(
-        content=TRUSTCALL_INSTRUCTION_FORMATTED)] + state["messages"][:-1]))
-
-    # Initialize the spy for visibility into the tool calls made by Trustcall
-    spy = Spy()
-
-    # Create the Trustcall extractor for updating the ToDo list
-    todo_extractor = create_extractor(
-        get_instance("task_maistro").model,
-        tools=[ToDo],
-        tool_choice=tool_name,
-        enable_inserts=True
-    ).with_listeners(on_end=spy)
+        content=TRUSTCALL_INSTRUCTION_FORMATTED)] + messages))
 
     debug_messages("update_todos", {
         "updated_messages": updated_messages,
         "existing_memories": existing_memories,
     })
+    return updated_messages, existing_memories
 
-    # Invoke the extractor
-    result = todo_extractor.invoke({"messages": updated_messages,
-                                    "existing": existing_memories})
-
-    debug_result("update_todos", "todo_extractor.invoke", result)
 
-    # Save save the memories from Trustcall to the store
-    for r, rmeta in zip(result["responses"], result["response_metadata"]):
-        store.put(namespace,
-                  rmeta.get("json_doc_id", str(uuid.uuid4())),
-                  r.model_dump(mode="json"),
-                  )
+def _todo_extractor(models, spy: Spy):
+    """Attach the spy to the prebuilt Trustcall extractor for this call only."""
+    return models.todo_extractor.with_listeners(on_end=spy)
 
-    # Respond to the tool call made in task_mAIstro, confirming the update
-    tool_calls = state['messages'][-1].tool_calls
-
-    # Extract the changes made by Trustcall and add the the ToolMessage returned to task_mAIstro
-    todo_update_msg = extract_tool_info(spy.called_tools, tool_name)
 
+def _response(state: MessagesState, content: str):
+    """Respond to each ToDo tool call made in task_mAIstro, confirming the update."""
     return_msg = {"messages": [
-        {"role": "tool", "content": todo_update_msg, "tool_call_id": tool_calls[0]['id']}]}
+        {"role": "tool", "content": content, "tool_call_id": tool_call_id}
+        for tool_call_id in update_tool_call_ids(state['messages'][-1], UPDATE_TYPE)]}
     debug_response("update_todos", return_msg)
     return return_msg
+
+
+def _index_todo(store: BaseStore, todo_category: str, user_id: str, key: str, value: dict) -> None:
+    """Keep the user's TodoIndex, if one is in memory, in step with the store."""
+    index = todo_indexes.peek(store, todo_category, user_id)
+    if index is not None:
+        index.upsert(key, value)
+
+
+def write_todos(messages: list[BaseMessage], configurable: configuration.Configuration, store: BaseStore,
+                maistro: Optional[AbstractMaistro] = None) -> str:
+    """Extract ToDo changes from the chat history, save them to the store and describe them."""
+    user_id = configurable.user_id
+    todo_category = configurable.todo_category
+
+    # Define the namespace for the memories
+    namespace = ("todo", todo_category, user_id)
+
+    # Hold the namespace, so that a concurrent turn of the same user extracts from this turn's writes
+    with namespace_locks.hold(namespace):
+        # Retrieve the most recent memories for context
+        existing_items = store.search(namespace, limit=configurable.todo_fetch_limit)
+        retrieved = retrieve_todos(store, configurable, messages, existing_items)
+        existing_items = todos_in_context(existing_items, configurable, messages, retrieved)
+        updated_messages, existing_memories = _prepare(messages, existing_items)
+
+        # Initialize the spy for visibility into the tool calls made by Trustcall
+        spy = Spy()
+
+        # Invoke the extractor
+        result = _todo_extractor(maistro_models(configurable, maistro), spy).invoke(
+            {"messages": updated_messages, "existing": existing_memories})
+
+        debug_result("update_todos", "todo_extractor.invoke", result)
+
+        # Save the changed memories from Trustcall to the store, in one batch
+        plan = apply_writes(store, plan_writes(namespace, result, existing_items))
+        debug_messages("update_todos", {"writes": plan.counts()})
+        for put in plan.puts:
+            _index_todo(store, todo_category, user_id, put.key, put.value)
+        if plan.puts:
+            memory_cache.invalidate(store, todo_category, user_id)
+
+    # Extract the changes made by Trustcall for the ToolMessage returned to task_mAIstro
+    return extract_tool_info(spy.called_tools, TOOL_NAME)
+
+
+async def awrite_todos(messages: list[BaseMessage], configurable: configuration.Configuration, store: BaseStore,
+                       maistro: Optional[AbstractMaistro] = None) -> str:
+    """Async version of write_todos()."""
+    user_id = configurable.user_id
+    todo_category = configurable.todo_category
+
+    # Define the namespace for the memories
+    namespace = ("todo", todo_category, user_id)
+
+    # Hold the namespace, so that a concurrent turn of the same user extracts from this turn's writes
+    async with namespace_locks.ahold(namespace):
+        # Retrieve the most recent memories for context
+        existing_items = await store.asearch(namespace, limit=configurable.todo_fetch_limit)
+        retrieved = await aretrieve_todos(store, configurable, messages, existing_items)
+        existing_items = todos_in_context(existing_items, configurable, messages, retrieved)
+        updated_messages, existing_memories = _prepare(messages, existing_items)
+
+        # Initialize the spy for visibility into the tool calls made by Trustcall
+        spy = Spy()
+
+        # Invoke the extractor
+        result = await _todo_extractor(maistro_models(configurable, maistro), spy).ainvoke(
+            {"messages": updated_messages, "existing": existing_memories})
+
+        debug_result("update_todos", "todo_extractor.ainvoke", result)
+
+        # Save the changed memories from Trustcall to the store, in one batch
+        plan = await aapply_writes(store, plan_writes(namespace, result, existing_items))
+        debug_messages("update_todos", {"writes": plan.counts()})
+        for put in plan.puts:
+            _index_todo(store, todo_category, user_id, put.key, put.value)
+        if plan.puts:
+            memory_cache.invalidate(store, todo_category, user_id)
+
+    # Extract the changes made by Trustcall for the ToolMessage returned to task_mAIstro
+    return extract_tool_info(spy.called_tools, TOOL_NAME)
+
+
+def update_todos(state: MessagesState, config: RunnableConfig, store: BaseStore,
+                 maistro: Optional[AbstractMaistro] = None):
+    """Reflect on the chat history and update the memory collection."""
+
+    # Get the user ID from the config
+    configurable = configuration.Configuration.from_runnable_config(config)
+
+    # The chat history without the tool call being answered
+    messages = state["messages"][:-1]
+
+    if configurable.memory_writes == "background":
+        memory_writer.submit(configurable.todo_category, configurable.user_id,
+                             write_todos, messages, configurable, store, maistro)
+        return _response(state, MEMORY_UPDATE_QUEUED)
+
+    return _response(state, write_todos(messages, configurable, store, maistro))
+
+
+async def aupdate_todos(state: MessagesState, config: RunnableConfig, store: BaseStore,
+                        maistro: Optional[AbstractMaistro] = None):
+    """Async version of update_todos()."""
+
+    # Get the user ID from the config
+    configurable = configuration.Configuration.from_runnable_config(config)
+
+    # The chat history without the tool call being answered
+    messages = state["messages"][:-1]
+
+    if configurable.memory_writes == "background":
+        memory_writer.submit(configurable.todo_category, configurable.user_id,
+                             write_todos, messages, configurable, store, maistro)
+        return _response(state, MEMORY_UPDATE_QUEUED)
+
+    return _response(state, await awrite_todos(messages, configurable, store, maistro))
@@ -1,82 +1,137 @@
-from trustcall import create_extractor
-from langchain_openai import ChatOpenAI
-from langchain_core.runnables import Runnable
-from langgraph.graph import StateGraph, MessagesState, START
+import functools
+import os
+from typing import Optional, Union
+from langchain_core.language_models import BaseChatModel
+from langgraph.graph import StateGraph, START, END
 from langgraph.graph.state import CompiledStateGraph
-from .core_instance import register_instance, get_instance
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from langgraph.store.base import BaseStore
+from .core_instance import register_factory, get_instance
 from .debug_langgraph import set_debug_mode
 from . import configuration
-from .node_maistro.cedge_route_message import route_message
-from .node_maistro.node_task_mAIstro import task_mAIstro
-from .node_maistro.node_update_todos import update_todos
-from .node_maistro.node_update_profile import update_profile
-from .node_maistro.node_instructions import update_instructions
+from .node_maistro.cedge_route_message import route_message, aroute_message, route_update, UPDATE_NODES
+from .node_maistro.node_task_mAIstro import task_mAIstro, atask_mAIstro
+from .node_maistro.node_update_todos import update_todos, aupdate_todos
+from .node_maistro.node_update_profile import update_profile, aupdate_profile
+from .node_maistro.node_instructions import update_instructions, aupdate_instructions
+from .node_maistro.node_confirm_update import confirm_update, aconfirm_update
+from .node_maistro.node_manage_history import manage_history, amanage_history
 from .maistro_abstract import AbstractMaistro
-from .maistro_schema import Profile
+from .maistro_persistence import Persistence, create_persistence, MAISTRO_PERSISTENCE
+from .maistro_pool import MaistroModels, chat_model
+from .maistro_schema import TaskMaistroState
 
 
 # Task Maistro class
-class TaskMaistro(AbstractMaistro):
+class TaskMaistro(MaistroModels, AbstractMaistro):
     """Task Maistro"""
 
     # In Python, a single underscore prefix (e.g., _model) is a convention for a "protected" property,
     # while a double underscore prefix (e.g., __model) is for "private" name-mangled properties.
     # The following are "protected" by convention, not truly private:
-    _model: ChatOpenAI
-    _profile_extractor: Runnable
     _graph: CompiledStateGraph
-    _enable_debug: bool = True
-
-    def __init__(self, model: str, temperature: float = 0):
-        # Initialize the model
-        self._model = ChatOpenAI(model=model, temperature=temperature)
-        # Create the Trustcall extractors for updating the user profile and ToDo list
-        self._profile_extractor = create_extractor(
-            self._model,
-            tools=[Profile],
-            tool_choice="Profile",
-        )
+    _persistence: Optional[Persistence]
+    # Debug logging is off in production; set this (or DEBUG_LANGGRAPH_MESSAGES=true) to enable it
+    _enable_debug: bool = False
+
+    def __init__(self, model: Union[str, BaseChatModel], temperature: float = 0, use_async: Optional[bool] = None,
+                 persistence: Union[str, Persistence, None] = None, store: Optional[BaseStore] = None,
+                 checkpointer: Optional[BaseCheckpointSaver] = None):
+        """
+        Args:
+            model: OpenAI model name, or a chat model instance to use as is
+            temperature: Sampling temperature when the model is given by name
+            use_async: Wire the async node implementations, which only run under ainvoke()/astream()
+                       as the LangGraph API server does. Defaults to the TASK_MAISTRO_ASYNC_NODES
+                       environment variable.
+            persistence: Backend of the store and checkpointer compiled into the graph: a name
+                         passed to maistro_persistence.create_persistence() ("memory", "sqlite",
+                         "postgres"), or a Persistence. Defaults to the MAISTRO_PERSISTENCE
+                         environment variable; without one the graph is compiled without a store
+                         and checkpointer, for the LangGraph API server to inject its own.
+            store: Store to use instead of the backend's
+            checkpointer: Checkpointer to use instead of the backend's
+        """
+        if use_async is None:
+            use_async = os.environ.get(
+                "TASK_MAISTRO_ASYNC_NODES", "False").lower() == "true"
+
+        # Initialize the model, its bound tools and the Trustcall extractors
+        MaistroModels.__init__(self, chat_model(model, temperature) if isinstance(model, str) else model)
 
         # Enable debug mode
-        set_debug_mode(self._enable_debug)
+        if self._enable_debug:
+            set_debug_mode(True)
 
         # Create the graph + all nodes
         builder = StateGraph(
-            MessagesState, config_schema=configuration.Configuration)
+            TaskMaistroState, config_schema=configuration.Configuration)
 
-        # Define the flow of the memory extraction process
-        builder.add_node(task_mAIstro)
-        builder.add_node(update_todos)
-        builder.add_node(update_profile)
-        builder.add_node(update_instructions)
+        # Define the flow of the memory extraction process. The nodes are bound to this instance,
+        # so that they use its model and extractors rather than the registered task_maistro's
+        nodes = {
+            "manage_history": amanage_history if use_async else manage_history,
+            "task_mAIstro": atask_mAIstro if use_async else task_mAIstro,
+            "update_todos": aupdate_todos if use_async else update_todos,
+            "update_profile": aupdate_profile if use_async else update_profile,
+            "update_instructions": aupdate_instructions if use_async else update_instructions,
+            "confirm_update": aconfirm_update if use_async else confirm_update,
+        }
+        for name, node in nodes.items():
+            builder.add_node(name, functools.partial(node, maistro=self))
 
         # Define the flow
-        builder.add_edge(START, "task_mAIstro")
-        builder.add_conditional_edges("task_mAIstro", route_message)
-        builder.add_edge("update_todos", "task_mAIstro")
-        builder.add_edge("update_profile", "task_mAIstro")
-        builder.add_edge("update_instructions", "task_mAIstro")
+        builder.add_edge(START, "manage_history")
+        builder.add_edge("manage_history", "task_mAIstro")
+        builder.add_conditional_edges(
+            "task_mAIstro", aroute_message if use_async else route_message,
+            [*UPDATE_NODES.values(), END])
+        builder.add_conditional_edges("update_todos", route_update)
+        builder.add_conditional_edges("update_profile", route_update)
+        builder.add_conditional_edges("update_instructions", route_update)
+        builder.add_edge("confirm_update", END)
+
+        # Long-term store and checkpointer, for running the graph outside the LangGraph API server
+        if persistence is None and MAISTRO_PERSISTENCE:
+            persistence = MAISTRO_PERSISTENCE
+        if isinstance(persistence, str):
+            persistence = create_persistence(persistence)
+        self._persistence = persistence
+        if persistence is not None:
+            if use_async and not persistence.supports_async:
+                raise ValueError(f"The {persistence.backend} backend has no async API; "
+                                 "use the sync nodes (use_async=False) or the memory backend")
+            store = store if store is not None else persistence.store
+            checkpointer = checkpointer if checkpointer is not None else persistence.checkpointer
 
         # Compile the graph
-        self._graph = builder.compile()
+        self._graph = builder.compile(store=store, checkpointer=checkpointer)
 
     @property
     def graph(self):
         return self._graph
 
     @property
-    def model(self):
-        return self._model
+    def persistence(self) -> Optional[Persistence]:
+        return self._persistence
+
+    def close(self) -> None:
+        """Close the connections of the persistence backend, if there is one."""
+        if self._persistence is not None:
+            self._persistence.close()
 
-    @property
-    def profile_extractor(self):
-        return self._profile_extractor
 
+# Register a factory instead of an instance: the default TaskMaistro (model client, extractors and
+# compiled graph) is built on first use rather than as a side effect of importing this module
+register_factory("task_maistro", lambda: TaskMaistro(model="gpt-4o", temperature=0))
 
-# Register the instance
-register_instance("task_maistro", TaskMaistro(model="gpt-4o", temperature=0))
 
-# Get the instance
-task_maistro = get_instance("task_maistro")
-graph = task_maistro.graph
-model = task_maistro.model
+def __getattr__(name: str):
+    """Lazily resolve task_maistro, graph and model, e.g. for langgraph.json's modules.task_maistro:graph"""
+    if name == "task_maistro":
+        return get_instance("task_maistro")
+    if name == "graph":
+        return get_instance("task_maistro").graph
+    if name == "model":
+        return get_instance("task_maistro").model
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
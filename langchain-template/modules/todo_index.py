@@ -0,0 +1,326 @@
+"""
+Local vector index over ToDo text, for retrieving the todos relevant to the conversation
+
+Runs offline on the CPU: texts are embedded with a hashing vectorizer by default (or any
+function that maps a list of texts to a 2-D array), and vectors are kept in a NumPy matrix
+that is updated incrementally as todos change.
+
+The index of a user is loaded once with all of their todos, by a paged store scan, and then
+follows the writes of update_todos, so that retrieval covers todos beyond the todo_fetch_limit
+of the memory snapshot without listing them again every turn.
+"""
+
+import itertools
+import os
+import threading
+import time
+import weakref
+import zlib
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from langgraph.store.base import BaseStore, GetOp, Item
+
+from .utils_todo import latest_user_text, todo_text, tokenize
+
+# Dimension of the default hashing embedding
+HASHING_DIM = 1024
+
+# Number of per-user indexes kept in memory
+TODO_INDEX_MAXSIZE = 256
+
+# Seconds a loaded index is used before it is loaded from the store again, to pick up todos
+# written by other processes; this process's writes are applied as they happen. Overridable
+# through the environment
+TODO_INDEX_TTL = float(os.environ.get("MAISTRO_TODO_INDEX_TTL", "300"))
+
+# Page size of the store scan that loads an index
+TODO_INDEX_PAGE = 1000
+
+
+def is_available() -> bool:
+    """The index needs NumPy; without it, callers fall back to lexical ranking."""
+    return np is not None
+
+
+def hashing_embed(texts: List[str], dim: int = HASHING_DIM) -> "np.ndarray":
+    """
+    Embed texts with signed feature hashing of words, word bigrams and character trigrams.
+
+    Returns:
+        L2-normalized float32 array of shape (len(texts), dim)
+    """
+    vectors = np.zeros((len(texts), dim), dtype=np.float32)
+    for row, text in enumerate(texts):
+        tokens = tokenize(text)
+        # Words and word pairs, plus down-weighted character trigrams so that
+        # variants such as "renew"/"renewal" still overlap
+        features = [(token, 1.0) for token in tokens]
+        features += [(f"{a} {b}", 1.0) for a, b in zip(tokens, tokens[1:])]
+        features += [(f"#{token[i:i + 3]}", 0.3) for token in tokens for i in range(len(token) - 2)]
+        for feature, weight in features:
+            digest = zlib.crc32(feature.encode("utf-8"))
+            vectors[row, digest % dim] += weight if digest & 0x80000000 else -weight
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    np.divide(vectors, norms, out=vectors, where=norms > 0)
+    return vectors
+
+
+class TodoIndex:
+    """
+    Vector index of one user's todos, keyed by store item key.
+
+    Args:
+        embed: Function mapping a list of texts to an array of row vectors (default: hashing_embed)
+    """
+
+    def __init__(self, embed: Optional[Callable[[List[str]], "np.ndarray"]] = None):
+        if np is None:
+            raise ImportError("TodoIndex requires numpy")
+        self._embed = embed or hashing_embed
+        self._keys: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._texts: Dict[str, str] = {}
+        self._matrix: Optional["np.ndarray"] = None
+        # Sequence number of the last upsert of each key, so that a load does not revert a
+        # write made while its store scan ran
+        self._upserted: Dict[str, int] = {}
+        self._seq = 0
+        # Monotonic time of the last load from the store, None until the first one
+        self.loaded_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def _grow(self, needed: int, dim: int) -> None:
+        if self._matrix is None:
+            self._matrix = np.zeros((max(needed, 16), dim), dtype=np.float32)
+        elif needed > self._matrix.shape[0]:
+            grown = np.zeros((max(needed, self._matrix.shape[0] * 2), dim), dtype=np.float32)
+            grown[:len(self._keys)] = self._matrix[:len(self._keys)]
+            self._matrix = grown
+
+    def _upsert_many(self, entries: List[Tuple[str, str]]) -> None:
+        if not entries:
+            return
+        vectors = self._embed([text for _, text in entries])
+        self._grow(len(self._keys) + len(entries), vectors.shape[1])
+        for (key, text), vector in zip(entries, vectors):
+            row = self._rows.get(key)
+            if row is None:
+                row = self._rows[key] = len(self._keys)
+                self._keys.append(key)
+            self._matrix[row] = vector
+            self._texts[key] = text
+
+    def _remove(self, key: str) -> None:
+        self._upserted.pop(key, None)
+        row = self._rows.pop(key, None)
+        if row is None:
+            return
+        del self._texts[key]
+        # Move the last row into the freed slot
+        last = len(self._keys) - 1
+        if row != last:
+            moved = self._keys[last]
+            self._keys[row] = moved
+            self._rows[moved] = row
+            self._matrix[row] = self._matrix[last]
+        self._keys.pop()
+
+    def upsert(self, key: str, value: dict) -> None:
+        """Add or update one todo, e.g. right after update_todos wrote it."""
+        text = todo_text(value)
+        with self._lock:
+            self._seq += 1
+            self._upserted[key] = self._seq
+            if self._texts.get(key) != text:
+                self._upsert_many([(key, text)])
+
+    def remove(self, key: str) -> None:
+        """Remove one todo."""
+        with self._lock:
+            self._remove(key)
+
+    def mark(self) -> int:
+        """Sequence number of the last upsert, to pass to sync() for items listed after this call."""
+        with self._lock:
+            return self._seq
+
+    def sync(self, items, since: Optional[int] = None) -> None:
+        """
+        Make the index match a list of store items, embedding only new or changed text.
+
+        Args:
+            items: All of the user's todos
+            since: mark() taken before the items were listed; keys upserted after it are kept as they are
+        """
+        current = {item.key: todo_text(item.value) for item in items}
+        with self._lock:
+            fresh = set() if since is None else {key for key, seq in self._upserted.items() if seq > since}
+            for key in [key for key in self._rows if key not in current and key not in fresh]:
+                self._remove(key)
+            self._upsert_many([(key, text) for key, text in current.items()
+                               if key not in fresh and self._texts.get(key) != text])
+
+    def query(self, text: str, k: int) -> List[Tuple[str, float]]:
+        """Return up to k (key, cosine similarity) pairs, most similar first."""
+        query = self._embed([text])[0]
+        with self._lock:
+            size = len(self._keys)
+            if size == 0 or k <= 0 or not query.any():
+                return []
+            scores = self._matrix[:size] @ query
+            k = min(k, size)
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top], kind="stable")]
+            return [(self._keys[row], float(scores[row])) for row in top if scores[row] > 0]
+
+
+class TodoIndexRegistry:
+    """
+    Process-local LRU of TodoIndex objects keyed by store, todo_category and user_id.
+
+    Args:
+        maxsize: Maximum number of per-user indexes kept in memory
+        embed: Embedding function passed to every TodoIndex
+    """
+
+    def __init__(self, maxsize: int = TODO_INDEX_MAXSIZE,
+                 embed: Optional[Callable[[List[str]], "np.ndarray"]] = None):
+        self.maxsize = maxsize
+        self.embed = embed
+        self._indexes: "OrderedDict[Tuple[int, str, str], TodoIndex]" = OrderedDict()
+        # Store -> token, so that keys neither keep stores alive nor match a new store at a reused id()
+        self._stores: "weakref.WeakKeyDictionary[Any, int]" = weakref.WeakKeyDictionary()
+        self._store_tokens = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def _key(self, store: Any, todo_category: str, user_id: str) -> Tuple[int, str, str]:
+        """Key of a user's index; called with the lock held."""
+        token = self._stores.get(store)
+        if token is None:
+            token = self._stores[store] = next(self._store_tokens)
+        return token, todo_category, user_id
+
+    def get(self, store: Any, todo_category: str, user_id: str) -> TodoIndex:
+        """Return the user's index, creating an empty one if needed."""
+        with self._lock:
+            key = self._key(store, todo_category, user_id)
+            index = self._indexes.get(key)
+            if index is None:
+                index = self._indexes[key] = TodoIndex(self.embed)
+                while len(self._indexes) > self.maxsize:
+                    self._indexes.popitem(last=False)
+            else:
+                self._indexes.move_to_end(key)
+            return index
+
+    def peek(self, store: Any, todo_category: str, user_id: str) -> Optional[TodoIndex]:
+        """Return the user's index if it is in memory."""
+        with self._lock:
+            return self._indexes.get(self._key(store, todo_category, user_id))
+
+
+# Shared indexes used by the node_maistro nodes
+todo_indexes = TodoIndexRegistry()
+
+
+def _stale(index: TodoIndex) -> bool:
+    return index.loaded_at is None or time.monotonic() - index.loaded_at > TODO_INDEX_TTL
+
+
+def _loaded(index: TodoIndex, items: List[Item], since: int) -> TodoIndex:
+    index.sync(items, since)
+    index.loaded_at = time.monotonic()
+    return index
+
+
+def load_index(store: BaseStore, todo_category: str, user_id: str) -> TodoIndex:
+    """The user's index, loaded with all of their todos if it is not in memory or is stale."""
+    index = todo_indexes.get(store, todo_category, user_id)
+    if not _stale(index):
+        return index
+    since, items = index.mark(), []
+    while True:
+        page = store.search(("todo", todo_category, user_id), limit=TODO_INDEX_PAGE, offset=len(items))
+        items += page
+        if len(page) < TODO_INDEX_PAGE:
+            return _loaded(index, items, since)
+
+
+async def aload_index(store: BaseStore, todo_category: str, user_id: str) -> TodoIndex:
+    """Async version of load_index()."""
+    index = todo_indexes.get(store, todo_category, user_id)
+    if not _stale(index):
+        return index
+    since, items = index.mark(), []
+    while True:
+        page = await store.asearch(("todo", todo_category, user_id), limit=TODO_INDEX_PAGE, offset=len(items))
+        items += page
+        if len(page) < TODO_INDEX_PAGE:
+            return _loaded(index, items, since)
+
+
+def _query(configurable, messages) -> str:
+    """The retrieval query of a turn, empty when semantic retrieval is off or unavailable."""
+    if configurable.semantic_todo_top_k <= 0 or not is_available():
+        return ""
+    return latest_user_text(messages)
+
+
+def _missing_ops(configurable, keys: List[str], known: Dict[str, Item]) -> List[GetOp]:
+    namespace = ("todo", configurable.todo_category, configurable.user_id)
+    return [GetOp(namespace, key) for key in keys if key not in known]
+
+
+def _retrieved(index: TodoIndex, keys: List[str], known: Dict[str, Item],
+               ops: List[GetOp], fetched: List[Optional[Item]]) -> List[Item]:
+    for op, item in zip(ops, fetched):
+        if item is None:
+            # Deleted by another process since the index was loaded
+            index.remove(op.key)
+        else:
+            known[op.key] = item
+    return [known[key] for key in keys if key in known]
+
+
+def retrieve_todos(store: BaseStore, configurable, messages, items: List[Item]) -> List[Item]:
+    """
+    The semantic_todo_top_k todos most similar to the latest user message, most similar first.
+
+    The user's index covers all of their todos; the hits that are not among the already loaded
+    items are fetched by key, in one store round trip.
+
+    Args:
+        store: Store holding the todos
+        configurable: Configuration of the run
+        messages: Conversation so far
+        items: Todos already loaded this turn, e.g. the memory snapshot's
+    """
+    query = _query(configurable, messages)
+    if not query:
+        return []
+    index = load_index(store, configurable.todo_category, configurable.user_id)
+    keys = [key for key, _ in index.query(query, configurable.semantic_todo_top_k)]
+    known = {item.key: item for item in items}
+    ops = _missing_ops(configurable, keys, known)
+    return _retrieved(index, keys, known, ops, store.batch(ops) if ops else [])
+
+
+async def aretrieve_todos(store: BaseStore, configurable, messages, items: List[Item]) -> List[Item]:
+    """Async version of retrieve_todos()."""
+    query = _query(configurable, messages)
+    if not query:
+        return []
+    index = await aload_index(store, configurable.todo_category, configurable.user_id)
+    keys = [key for key, _ in index.query(query, configurable.semantic_todo_top_k)]
+    known = {item.key: item for item in items}
+    ops = _missing_ops(configurable, keys, known)
+    return _retrieved(index, keys, known, ops, await store.abatch(ops) if ops else [])
@@ -0,0 +1,102 @@
+"""
+Plan the store writes of a Trustcall result, so that unchanged documents are not written again
+"""
+
+import hashlib
+import json
+import threading
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional
+
+from langgraph.store.base import BaseStore, Item, PutOp
+
+from .debug_langgraph import register_stats
+
+
+def value_hash(value: Any) -> str:
+    """Hash of a JSON value that does not depend on key order."""
+    payload = json.dumps(value, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class WritePlan:
+    """The puts a Trustcall result needs, and how many of its documents were left as they are."""
+    namespace: tuple
+    puts: List[PutOp] = field(default_factory=list)
+    skipped: int = 0
+
+    def counts(self) -> Dict[str, int]:
+        """Documents written and skipped, and store.batch calls made, for this plan."""
+        return {"written": len(self.puts), "skipped": self.skipped, "batched": 1 if self.puts else 0}
+
+
+def plan_writes(namespace: tuple, result: dict, existing_items: Optional[Iterable[Item]]) -> WritePlan:
+    """
+    Compare each Trustcall response with the stored document it patches and keep the changed ones.
+
+    Args:
+        namespace: Store namespace of the documents
+        result: Trustcall extractor result, with "responses" and "response_metadata"
+        existing_items: The items that were passed to the extractor as existing documents
+    """
+    existing = {item.key: value_hash(item.value) for item in existing_items or []}
+    plan = WritePlan(namespace)
+    for r, rmeta in zip(result["responses"], result["response_metadata"]):
+        key = rmeta.get("json_doc_id", str(uuid.uuid4()))
+        value = r.model_dump(mode="json")
+        if existing.get(key) == value_hash(value):
+            plan.skipped += 1
+            continue
+        plan.puts.append(PutOp(namespace, key, value))
+    return plan
+
+
+class WriteCounters:
+    """Running totals of the write plans applied in this process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.written = 0
+        self.skipped = 0
+        self.batches = 0
+
+    def record(self, plan: WritePlan) -> None:
+        counts = plan.counts()
+        with self._lock:
+            self.written += counts["written"]
+            self.skipped += counts["skipped"]
+            self.batches += counts["batched"]
+
+    def clear(self) -> None:
+        """Reset the counters."""
+        with self._lock:
+            self.written = self.skipped = self.batches = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Return the counters."""
+        with self._lock:
+            return {"written": self.written, "skipped": self.skipped, "batches": self.batches}
+
+
+def apply_writes(store: BaseStore, plan: WritePlan) -> WritePlan:
+    """Send the planned puts in a single store.batch call, if there are any."""
+    if plan.puts:
+        store.batch(plan.puts)
+    write_counters.record(plan)
+    return plan
+
+
+async def aapply_writes(store: BaseStore, plan: WritePlan) -> WritePlan:
+    """Async version of apply_writes()."""
+    if plan.puts:
+        await store.abatch(plan.puts)
+    write_counters.record(plan)
+    return plan
+
+
+# Totals of the update nodes' writes
+write_counters = WriteCounters()
+
+register_stats("store_writes", write_counters.stats)
@@ -0,0 +1,127 @@
+"""
+Select the ToDo items that are sent to the model, so that prompts stay bounded as the list grows
+"""
+
+import math
+import re
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Optional
+
+from langchain_core.messages import BaseMessage, HumanMessage
+from langgraph.store.base import Item
+
+# Statuses left out of the prompt unless include_done is set
+CLOSED_STATUSES = ("done", "archived")
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from i in is it me my of on or please the to with you your".split())
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercase word tokens without stopwords."""
+    return [token for token in _TOKEN.findall(text.lower()) if token not in _STOPWORDS]
+
+
+def todo_text(value: dict) -> str:
+    """The searchable text of a ToDo: its task and solutions."""
+    return " ".join([str(value.get("task") or "")] + [str(s) for s in value.get("solutions") or []])
+
+
+def latest_user_text(messages: list[BaseMessage]) -> str:
+    """Content of the most recent human message, used as the relevance query."""
+    for message in reversed(messages):
+        if isinstance(message, HumanMessage) and isinstance(message.content, str):
+            return message.content
+    return ""
+
+
+def _timestamp(value) -> Optional[float]:
+    if not value:
+        return None
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    if not isinstance(value, datetime):
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def lexical_scores(items: list[Item], query: str) -> list[float]:
+    """BM25-style relevance of each ToDo to the query, computed locally."""
+    query_terms = set(tokenize(query))
+    if not query_terms or not items:
+        return [0.0] * len(items)
+    documents = [Counter(tokenize(todo_text(item.value))) for item in items]
+    average_length = sum(sum(doc.values()) for doc in documents) / len(documents) or 1.0
+    document_frequency = Counter(term for doc in documents for term in query_terms & doc.keys())
+    scores = []
+    for doc in documents:
+        length = sum(doc.values())
+        score = 0.0
+        for term in query_terms & doc.keys():
+            idf = math.log(1 + (len(documents) - document_frequency[term] + 0.5) / (document_frequency[term] + 0.5))
+            tf = doc[term]
+            score += idf * tf * 2.2 / (tf + 1.2 * (0.25 + 0.75 * length / average_length))
+        scores.append(score)
+    return scores
+
+
+def select_todos(items: list[Item], max_todos: int, include_done: bool = False,
+                 query: Optional[str] = None) -> list[Item]:
+    """
+    Choose the ToDo items to show the model.
+
+    Closed items are dropped unless include_done is set. The rest are ranked by relevance to
+    the query (when one is given), then by earliest deadline, then by most recent update, and
+    the first max_todos are returned (all of them when max_todos <= 0).
+
+    Args:
+        items: ToDo items from the store
+        max_todos: Maximum number of items to return
+        include_done: Keep items whose status is done or archived
+        query: Text to rank by lexical similarity, e.g. the latest user message
+    """
+    if not include_done:
+        items = [item for item in items if item.value.get("status") not in CLOSED_STATUSES]
+    scores = lexical_scores(items, query) if query else [0.0] * len(items)
+
+    def rank(pair):
+        item, score = pair
+        deadline = _timestamp(item.value.get("deadline"))
+        updated = _timestamp(item.updated_at) or 0.0
+        return (-score, deadline is None, deadline or 0.0, -updated)
+
+    ranked = [item for item, _ in sorted(zip(items, scores), key=rank)]
+    return ranked[:max_todos] if max_todos > 0 else ranked
+
+
+def todos_in_context(items: list[Item], configurable, messages: list[BaseMessage],
+                     retrieved: Optional[list[Item]] = None) -> list[Item]:
+    """
+    Apply select_todos() with the settings of a Configuration and the conversation so far.
+
+    Args:
+        items: ToDo items loaded from the store
+        configurable: Configuration of the run
+        messages: Conversation so far
+        retrieved: Todos retrieved through the TodoIndex (todo_index.retrieve_todos), put first
+                   in their order of similarity
+    """
+    query = latest_user_text(messages) if configurable.rank_todos_by_similarity else None
+    if retrieved:
+        # Rank the rest first so that the todos not retrieved keep their deadline/recency order
+        keys = {item.key for item in retrieved}
+        ranked = select_todos([item for item in items if item.key not in keys], 0,
+                              include_done=configurable.include_done_todos, query=query)
+        if not configurable.include_done_todos:
+            retrieved = [item for item in retrieved if item.value.get("status") not in CLOSED_STATUSES]
+        ranked = retrieved + ranked
+        return ranked[:configurable.max_todos_in_context] if configurable.max_todos_in_context > 0 else ranked
+    return select_todos(items, configurable.max_todos_in_context,
+                        include_done=configurable.include_done_todos, query=query)
@@ -0,0 +1,47 @@
+"""
+Approximate token counts of chat messages, for budgeting prompts without a tokenizer round trip
+"""
+
+from typing import Sequence, Union
+
+from langchain_core.messages import AIMessage, BaseMessage
+
+# About four characters per token for English text with OpenAI tokenizers
+CHARS_PER_TOKEN = 4
+
+# Tokens the chat format adds per message (role and separators)
+MESSAGE_OVERHEAD = 4
+
+
+def approx_tokens(content: Union[str, BaseMessage, Sequence[BaseMessage]]) -> int:
+    """Estimate the number of tokens of a string, a message or a list of messages.
+
+    Tool-call arguments count towards the message they belong to.
+    """
+    if isinstance(content, str):
+        return (len(content) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+    if isinstance(content, BaseMessage):
+        text = content.content if isinstance(content.content, str) else str(content.content)
+        tokens = MESSAGE_OVERHEAD + approx_tokens(text)
+        if isinstance(content, AIMessage):
+            tokens += sum(approx_tokens(str(tool_call["args"])) for tool_call in content.tool_calls)
+        return tokens
+    return sum(approx_tokens(message) for message in content)
+
+
+# Appended to text cut by truncate_to_tokens()
+TRUNCATION_MARKER = " …[truncated]"
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut text to about max_tokens tokens at a word boundary, marking the cut.
+
+    Deterministic: the same text and budget always give the same result.
+    """
+    if approx_tokens(text) <= max_tokens:
+        return text
+    limit = max_tokens * CHARS_PER_TOKEN - len(TRUNCATION_MARKER)
+    if limit <= 0:
+        return ""
+    cut = text.rfind(" ", 0, limit + 1)
+    return text[:cut if cut > 0 else limit].rstrip() + TRUNCATION_MARKER
@@ -58,3 +58,14 @@ def extract_tool_info(tool_calls, schema_name="Memory"):
             )
 
     return "\n\n".join(result_parts)
+
+
+def update_tool_call_ids(message, update_type):
+    """IDs of the UpdateMemory tool calls in a message that request the given update type.
+
+    Args:
+        message: AI message with the tool calls made by task_mAIstro
+        update_type: Memory type requested through UpdateMemory ("user", "todo" or "instructions")
+    """
+    return [tool_call['id'] for tool_call in message.tool_calls
+            if tool_call['args'].get('update_type') == update_type]